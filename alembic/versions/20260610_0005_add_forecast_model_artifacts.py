@@ -0,0 +1,39 @@
+"""add forecast_model_artifacts table (shared model registry)
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-06-10 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'forecast_model_artifacts',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('medication_id', sa.Integer(), sa.ForeignKey('medications.id', ondelete='CASCADE'), nullable=False, index=True),
+        sa.Column('model_type', sa.String(length=30), nullable=False),
+        sa.Column('series_hash', sa.String(length=32), nullable=False),
+        sa.Column('parameters', sa.JSON(), nullable=True),
+        sa.Column('artifact', sa.LargeBinary(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('medication_id', 'model_type', 'series_hash', name='uq_forecast_model_artifacts_key'),
+    )
+    op.create_index(
+        'ix_forecast_model_artifacts_latest',
+        'forecast_model_artifacts',
+        ['medication_id', 'model_type', 'created_at'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_forecast_model_artifacts_latest', table_name='forecast_model_artifacts')
+    op.drop_table('forecast_model_artifacts')
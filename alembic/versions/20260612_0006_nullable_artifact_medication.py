@@ -0,0 +1,23 @@
+"""allow catalog-wide artifacts (NULL medication_id) in forecast_model_artifacts
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-06-12 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column('forecast_model_artifacts', 'medication_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM forecast_model_artifacts WHERE medication_id IS NULL")
+    op.alter_column('forecast_model_artifacts', 'medication_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,30 @@
+"""add months_back/series_hash to forecast_runs (result cache key)
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-06-14 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('forecast_runs', sa.Column('months_back', sa.Integer(), nullable=True))
+    op.add_column('forecast_runs', sa.Column('series_hash', sa.String(length=32), nullable=True))
+    op.create_index(
+        'ix_forecast_runs_result_key',
+        'forecast_runs',
+        ['medication_id', 'model_type', 'horizon_days', 'months_back', 'series_hash'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_forecast_runs_result_key', table_name='forecast_runs')
+    op.drop_column('forecast_runs', 'series_hash')
+    op.drop_column('forecast_runs', 'months_back')
@@ -0,0 +1,38 @@
+"""add fitted_horizon_days to forecast_runs; result key without horizon
+
+Los runs se ajustan hasta el horizonte maximo y los horizontes menores se
+sirven recortando, asi que la clave de la cache de resultados ya no
+incluye horizon_days.
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-06-16 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('forecast_runs', sa.Column('fitted_horizon_days', sa.Integer(), nullable=True))
+    op.drop_index('ix_forecast_runs_result_key', table_name='forecast_runs')
+    op.create_index(
+        'ix_forecast_runs_result_key',
+        'forecast_runs',
+        ['medication_id', 'model_type', 'months_back', 'series_hash'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_forecast_runs_result_key', table_name='forecast_runs')
+    op.create_index(
+        'ix_forecast_runs_result_key',
+        'forecast_runs',
+        ['medication_id', 'model_type', 'horizon_days', 'months_back', 'series_hash'],
+    )
+    op.drop_column('forecast_runs', 'fitted_horizon_days')
@@ -0,0 +1,28 @@
+"""add forecast_watermarks (change tracking for scheduled refreshes)
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-06-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c9d0e1f2a3b4'
+down_revision = 'b8c9d0e1f2a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'forecast_watermarks',
+        sa.Column('medication_id', sa.Integer(), sa.ForeignKey('medications.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sa.Column('forecasted_at', sa.DateTime(), nullable=True),
+        sa.Column('forecast_run_id', sa.Integer(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('forecast_watermarks')
@@ -0,0 +1,45 @@
+"""add daily_consumption (daily movement rollup per medication)
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-06-20 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd0e1f2a3b4c5'
+down_revision = 'c9d0e1f2a3b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_consumption',
+        sa.Column('medication_id', sa.Integer(), sa.ForeignKey('medications.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('out_quantity', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('out_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('in_quantity', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('in_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # Backfill desde movements (el hook ORM mantiene el rollup a partir de aqui)
+    op.execute(
+        """
+        INSERT INTO daily_consumption (medication_id, day, out_quantity, out_count, in_quantity, in_count)
+        SELECT
+            medication_id,
+            CAST(date AS DATE),
+            COALESCE(SUM(CASE WHEN type = 'OUT' THEN quantity ELSE 0 END), 0),
+            SUM(CASE WHEN type = 'OUT' THEN 1 ELSE 0 END),
+            COALESCE(SUM(CASE WHEN type = 'IN' THEN quantity ELSE 0 END), 0),
+            SUM(CASE WHEN type = 'IN' THEN 1 ELSE 0 END)
+        FROM movements
+        GROUP BY medication_id, CAST(date AS DATE)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_consumption')
@@ -0,0 +1,47 @@
+"""add composite and partial indexes for the hot query paths
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-06-22 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e1f2a3b4c5d6'
+down_revision = 'd0e1f2a3b4c5'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, opciones) -- mismo orden que __table_args__ de los modelos
+INDEXES = [
+    # Recalculo del rollup diario y movimientos recientes: (medicamento, rango de fechas).
+    # type y quantity van en INCLUDE (Postgres) para agregar con index-only scan.
+    ('ix_movements_medication_date', 'movements', ['medication_id', 'date'],
+     {'postgresql_include': ['type', 'quantity']}),
+    ('ix_predictions_medication_date', 'predictions', ['medication_id', 'date'], {}),
+    ('ix_predictions_created_at', 'predictions', ['created_at'], {}),
+    # Parcial: el informe de alertas solo lee filas con desabastecimiento
+    ('ix_predictions_shortage_date', 'predictions', ['date'],
+     {'postgresql_where': sa.text('shortage'), 'sqlite_where': sa.text('shortage = 1')}),
+    ('ix_forecast_runs_medication_model_created', 'forecast_runs',
+     ['medication_id', 'model_type', 'created_at'], {}),
+    ('ix_forecast_runs_medication_created', 'forecast_runs', ['medication_id', 'created_at'], {}),
+    ('ix_orders_status_created', 'orders', ['status', 'created_at'], {}),
+    ('ix_orders_medication_created', 'orders', ['medication_id', 'created_at'], {}),
+    ('ix_orders_created_at', 'orders', ['created_at'], {}),
+    ('ix_deliveries_status_created', 'deliveries', ['status', 'created_at'], {}),
+    ('ix_deliveries_created_at', 'deliveries', ['created_at'], {}),
+    ('ix_lots_status_created', 'lots', ['status', 'created_at'], {}),
+    ('ix_lots_created_at', 'lots', ['created_at'], {}),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns, options in INDEXES:
+        op.create_index(name, table, columns, unique=False, **options)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,27 @@
+"""add forecast_runs.packed_points (forecast points packed as float32 arrays)
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-06-24 00:00:00
+
+Los runs existentes conservan sus filas en forecast_points (los lectores
+aceptan ambos formatos); scripts/pack_forecast_points.py los convierte
+por lotes sin bloquear la tabla.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f2a3b4c5d6e7'
+down_revision = 'e1f2a3b4c5d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('forecast_runs', sa.Column('packed_points', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    # Ejecutar antes scripts/pack_forecast_points.py --unpack: los puntos
+    # empaquetados se perderian al borrar la columna
+    op.drop_column('forecast_runs', 'packed_points')
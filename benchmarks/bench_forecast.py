@@ -0,0 +1,219 @@
+"""
+Benchmark de extremo a extremo de los modelos de ForecastModelFactory.
+
+Genera un catalogo sintetico (``benchmarks/catalog.py``) y, para cada
+modelo registrado, mide por medicamento la carga de la serie, el ajuste,
+la validacion y la persistencia (``save_forecast``), igual que el lote
+programado.  Cada modelo corre en un proceso nuevo con cache de modelos
+vacia, de modo que el pico de RSS es el del modelo y el ajuste es en frio.
+
+Informa por modelo y perfil: tiempo de pared (media/p50/max), pico de RSS
+y WMAPE frente a los ``horizon_days`` reservados.  ``--output`` guarda el
+detalle (incluidas las etapas de ``parameters["timings"]``) y
+``--compare`` muestra la variacion frente a un JSON anterior.
+
+Uso:
+    python benchmarks/bench_forecast.py --medications 30 --models arima sba croston
+    python benchmarks/bench_forecast.py --database-url postgresql://.../bench --output base.json
+    python benchmarks/bench_forecast.py --compare base.json
+
+Con Postgres usa una base dedicada: el catalogo sintetico no se borra.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _rss_mb(usage) -> float:
+    # ru_maxrss: KB en Linux, bytes en macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+
+def _bench_model(model_type: str, catalog: list, horizon_days: int, months_back: int) -> dict:
+    """Ejecuta ``model_type`` sobre el catalogo (en un proceso dedicado)."""
+    import resource
+
+    from sqlmodel import Session
+
+    from benchmarks.catalog import holdout_wmape
+    from src.core.database import engine
+    from src.core.factory import ForecastModelFactory
+    from src.services.forecast_service import fit_horizon, save_forecast
+
+    engine.echo = False  # el eco SQL (fuera de produccion) distorsiona los tiempos
+    fn = ForecastModelFactory.create(model_type)
+    import_rss = _rss_mb(resource.getrusage(resource.RUSAGE_SELF))
+    started = time.perf_counter()
+    train_s = None
+    rows = []
+    with Session(engine) as db:
+        if model_type == "global":
+            from src.services.global_forecast_service import train_global_model
+
+            t0 = time.perf_counter()
+            train_global_model(db, months_back, medication_ids=[m.medication_id for m in catalog])
+            train_s = round(time.perf_counter() - t0, 4)
+
+        for item in catalog:
+            row = {"medication_id": item.medication_id, "profile": item.profile}
+            t0 = time.perf_counter()
+            try:
+                result = fn(db, item.medication_id, fit_horizon(horizon_days), months_back)
+                save_forecast(db, item.medication_id, result, months_back=months_back, horizon_days=horizon_days)
+            except Exception as e:
+                db.rollback()
+                row["error"] = f"{type(e).__name__}: {e}"[:200]
+            else:
+                row["wmape"] = round(holdout_wmape(result, item), 2)
+                row["stages"] = (result.get("parameters") or {}).get("timings", {}).get("stages", {})
+            row["wall_s"] = round(time.perf_counter() - t0, 4)
+            rows.append(row)
+
+    return {
+        "model": model_type,
+        "total_s": round(time.perf_counter() - started, 4),
+        "train_s": train_s,
+        "import_rss_mb": import_rss,
+        "peak_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_SELF)),
+        "children_peak_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_CHILDREN)),
+        "medications": rows,
+    }
+
+
+def _nanmean(values: List[float]) -> Optional[float]:
+    values = [v for v in values if v is not None and not math.isnan(v)]
+    return round(float(np.mean(values)), 2) if values else None
+
+
+def summarize(report: dict) -> Dict[str, dict]:
+    """Resumen por ``modelo/perfil`` (y ``modelo/all``) de un informe."""
+    summary = {}
+    for model in report["models"]:
+        groups: Dict[str, list] = {"all": model["medications"]}
+        for row in model["medications"]:
+            groups.setdefault(row["profile"], []).append(row)
+        for profile, rows in groups.items():
+            ok = [r for r in rows if "error" not in r]
+            walls = np.array([r["wall_s"] for r in ok]) if ok else np.array([np.nan])
+            summary[f"{model['model']}/{profile}"] = {
+                "ok": len(ok),
+                "errors": len(rows) - len(ok),
+                "wall_mean_s": round(float(np.mean(walls)), 4),
+                "wall_p50_s": round(float(np.median(walls)), 4),
+                "wall_max_s": round(float(np.max(walls)), 4),
+                "wmape": _nanmean([r.get("wmape") for r in ok]),
+                "peak_rss_mb": model["peak_rss_mb"],
+            }
+    return summary
+
+
+def _delta(new, old) -> str:
+    if new is None or old is None or old == 0 or (isinstance(new, float) and math.isnan(new)):
+        return ""
+    return f" ({(new - old) / old * 100:+.0f}%)"
+
+
+def print_summary(summary: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None) -> None:
+    baseline = baseline or {}
+    header = f"{'modelo/perfil':<28}{'ok':>4}{'err':>5}{'media s':>16}{'p50 s':>10}{'max s':>10}{'WMAPE %':>18}{'RSS MB':>16}"
+    print(header)
+    print("-" * len(header))
+    for key, s in summary.items():
+        b = baseline.get(key, {})
+        wmape = "-" if s["wmape"] is None else f"{s['wmape']:.1f}"
+        print(
+            f"{key:<28}{s['ok']:>4}{s['errors']:>5}"
+            f"{s['wall_mean_s']:>8.3f}{_delta(s['wall_mean_s'], b.get('wall_mean_s')):>8}"
+            f"{s['wall_p50_s']:>10.3f}{s['wall_max_s']:>10.3f}"
+            f"{wmape:>10}{_delta(s['wmape'], b.get('wmape')):>8}"
+            f"{s['peak_rss_mb']:>8.0f}{_delta(s['peak_rss_mb'], b.get('peak_rss_mb')):>8}"
+        )
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark de los modelos de forecasting")
+    parser.add_argument("--database-url", default=None,
+                        help="Base para el catalogo (defecto: SQLite temporal)")
+    parser.add_argument("--medications", type=int, default=12, help="Tamaño del catalogo sintetico")
+    parser.add_argument("--history-days", type=int, default=540, help="Dias de historico por medicamento")
+    parser.add_argument("--horizon", type=int, default=30, help="Dias reservados para el WMAPE")
+    parser.add_argument("--profiles", nargs="+", default=None,
+                        help="Perfiles: smooth intermittent trend_shift (defecto: todos)")
+    parser.add_argument("--models", nargs="+", default=None, help="Modelos (defecto: todos los registrados)")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--output", default=None, help="Guarda el informe completo en JSON")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecucion anterior para comparar")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="forecast_bench_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "forecast-benchmark")
+    os.environ["FORECAST_CACHE_DIR"] = os.path.join(workdir, "models")  # ajustes en frio
+
+    from sqlmodel import SQLModel, Session
+
+    import src.models  # noqa: F401  (registra todas las tablas)
+    from benchmarks.catalog import PROFILES, build_catalog
+    from src.core.database import engine
+    from src.core.factory import ForecastModelFactory
+
+    engine.echo = False
+    try:
+        SQLModel.metadata.create_all(engine)
+        months_back = math.ceil(args.history_days / 30) + 1
+        t0 = time.perf_counter()
+        with Session(engine) as db:
+            catalog = build_catalog(
+                db, args.medications, args.history_days, args.horizon,
+                profiles=args.profiles or PROFILES, seed=args.seed,
+            )
+        print(f"Catalogo: {len(catalog)} medicamentos, {args.history_days} dias "
+              f"({time.perf_counter() - t0:.1f}s)\n")
+        engine.dispose()  # los procesos hijos abren su propio pool
+
+        models = args.models or ForecastModelFactory.available_models()
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "models": [],
+        }
+        for model_type in models:
+            print(f"  {model_type}...", flush=True)
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(_bench_model, model_type, catalog, args.horizon, months_back).result()
+            report["models"].append(result)
+
+        report["summary"] = summarize(report)
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f).get("summary")
+        print()
+        print_summary(report["summary"], baseline)
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nInforme guardado en {args.output}")
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Catalogo sintetico para los benchmarks de forecasting.
+
+Reutiliza el generador de ``scripts/seed_daily_movements.py`` (consumo
+base por categoria, factores semanal/mensual, tendencia y ruido) y añade
+dos perfiles que estresan a los modelos:
+
+- ``smooth``        serie diaria del seed tal cual.
+- ``intermittent``  demanda solo ~30% de los dias, en lotes enteros
+                    (mismo consumo medio).
+- ``trend_shift``   cambio de nivel (+60%) al 70% del historico que se
+                    mantiene en el horizonte evaluado.
+
+Cada medicamento guarda ``history_days`` dias de salidas hasta ayer y
+reserva los ``horizon_days`` siguientes como verdad para el WMAPE.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from scripts.seed_daily_movements import BASE_DAILY, MONTHLY_FACTOR, WEEKLY_FACTOR, generate_daily_series
+from src.models.medication import Medication
+from src.models.movement import Movement, MovementType
+from src.repositories import DailyConsumptionRepository
+
+PROFILES = ("smooth", "intermittent", "trend_shift")
+
+_DEMAND_PROBABILITY = 0.3
+_SHIFT_AT = 0.7
+_SHIFT_FACTOR = 1.6
+
+
+@dataclass
+class SyntheticMedication:
+    """Medicamento del catalogo con su perfil y el consumo reservado."""
+
+    medication_id: int
+    profile: str
+    category: str
+    holdout_start: datetime
+    holdout: np.ndarray
+
+
+def synthetic_series(profile: str, category: str, days: int, start: datetime, rng: np.random.Generator) -> np.ndarray:
+    """
+    Serie diaria de ``days`` dias para ``profile`` a partir de ``start``.
+
+    ``generate_daily_series`` usa el generador global de numpy: la
+    reproducibilidad la da ``np.random.seed`` en ``build_catalog``.
+    """
+    base = BASE_DAILY[category] * rng.uniform(0.8, 1.2)
+    monthly = MONTHLY_FACTOR.get(category, MONTHLY_FACTOR["default"])
+    values = np.array(generate_daily_series(base, WEEKLY_FACTOR, monthly, days=days, start=start))
+
+    if profile == "intermittent":
+        hits = rng.random(days) < _DEMAND_PROBABILITY
+        values = np.where(hits, np.ceil(values / _DEMAND_PROBABILITY), 0.0)
+    elif profile == "trend_shift":
+        shift = int(days * _SHIFT_AT)
+        values[shift:] *= _SHIFT_FACTOR
+    elif profile != "smooth":
+        raise ValueError(f"Perfil desconocido: {profile} (disponibles: {', '.join(PROFILES)})")
+    return np.round(values, 2)
+
+
+def build_catalog(
+    db: Session,
+    n_medications: int,
+    history_days: int = 540,
+    horizon_days: int = 30,
+    profiles: Sequence[str] = PROFILES,
+    seed: int = 2024,
+) -> List[SyntheticMedication]:
+    """
+    Crea ``n_medications`` medicamentos (perfiles en rotacion) con sus
+    movimientos de salida diarios y devuelve el consumo reservado.
+
+    Los movimientos se insertan con un INSERT en lote (sin ORM) para que
+    catalogos grandes se generen en segundos; despues se reconstruye su
+    rollup diario.
+    """
+    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=history_days)
+    categories = [c for c in BASE_DAILY if c != "default"]
+    now = datetime.utcnow()
+
+    catalog: List[SyntheticMedication] = []
+    for i in range(n_medications):
+        profile = profiles[i % len(profiles)]
+        category = categories[i % len(categories)]
+        values = synthetic_series(profile, category, history_days + horizon_days, start, rng)
+        history, holdout = values[:history_days], values[history_days:]
+        # La serie de consumo termina en el ultimo dia con salidas: se fuerza
+        # consumo ayer para que el horizonte empiece justo tras el historico.
+        history[-1] = max(history[-1], 1.0)
+
+        med = Medication(
+            name=f"Bench {profile} {i:04d}",
+            description=f"Sintetico ({category})",
+            stock=int(math.ceil(holdout.sum())),
+            unit="units",
+            price=1.0,
+        )
+        db.add(med)
+        db.flush()
+        rows = [
+            {
+                "medication_id": med.id,
+                "date": start + timedelta(days=d),
+                "type": MovementType.OUT,
+                "quantity": float(qty),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for d, qty in enumerate(history)
+            if qty > 0
+        ]
+        db.execute(insert(Movement), rows)
+        catalog.append(SyntheticMedication(med.id, profile, category, today, holdout))
+    db.commit()
+    # El INSERT en lote no pasa por el hook ORM que mantiene el rollup diario
+    DailyConsumptionRepository(db).rebuild([item.medication_id for item in catalog])
+    return catalog
+
+
+def holdout_wmape(result: dict, item: SyntheticMedication) -> float:
+    """
+    WMAPE (%) del pronostico frente al consumo reservado, en los dias del
+    horizonte que cubre el resultado.
+    """
+    truth: Dict[pd.Timestamp, float] = {
+        pd.Timestamp(item.holdout_start + timedelta(days=d)): float(v) for d, v in enumerate(item.holdout)
+    }
+    pairs = [
+        (truth[pd.Timestamp(date).normalize()], float(value))
+        for date, value in zip(result["dates"], result["values"])
+        if pd.Timestamp(date).normalize() in truth
+    ]
+    if not pairs:
+        return float("nan")
+    actual, predicted = np.array(pairs).T
+    denominator = np.abs(actual).sum()
+    if denominator == 0:
+        return float("nan")
+    return float(np.abs(actual - predicted).sum() / denominator * 100)
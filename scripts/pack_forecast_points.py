@@ -0,0 +1,51 @@
+"""
+Convierte los puntos de forecast guardados como filas (forecast_points) al
+formato empaquetado de ForecastRun.packed_points, por lotes.
+
+Los lectores aceptan ambos formatos, asi que puede ejecutarse con la API
+en marcha; cada lote es una transaccion.  ``--unpack`` hace la conversion
+inversa (necesaria antes de revertir la migracion 0012).
+
+Uso:
+    docker compose exec api python scripts/pack_forecast_points.py [--batch-size 500] [--unpack]
+"""
+import argparse
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.database import SessionLocal
+from src.repositories import ForecastRepository
+
+
+def convert(batch_size=500, unpack=False):
+    db = SessionLocal()
+    try:
+        repo = ForecastRepository(db)
+        step = repo.unpack_to_rows if unpack else repo.pack_row_points
+        started = time.perf_counter()
+        total = 0
+        while True:
+            converted = step(batch_size)
+            if not converted:
+                break
+            total += converted
+            print(f"  {total} runs convertidos...")
+        print(f"  {total} runs convertidos en {time.perf_counter() - started:.1f}s")
+        return total
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Empaqueta los puntos de forecast existentes")
+    parser.add_argument("--batch-size", type=int, default=500, help="Runs por transaccion")
+    parser.add_argument("--unpack", action="store_true",
+                        help="Conversion inversa: puntos empaquetados -> filas de forecast_points")
+    args = parser.parse_args()
+
+    print("=== Pack forecast points ===\n")
+    convert(args.batch_size, args.unpack)
+    print("\nListo.")
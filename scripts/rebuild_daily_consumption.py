@@ -0,0 +1,42 @@
+"""
+Reconstruye el rollup diario de movimientos (tabla daily_consumption).
+
+El rollup se mantiene solo al escribir movimientos por el ORM; tras cargas
+por SQL directo, restauraciones o correcciones manuales hay que
+reconstruirlo.
+
+Uso:
+    docker compose exec api python scripts/rebuild_daily_consumption.py [--medication-id ID ...]
+"""
+import argparse
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.database import SessionLocal
+from src.repositories import DailyConsumptionRepository
+
+
+def rebuild(medication_ids=None):
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rows = DailyConsumptionRepository(db).rebuild(medication_ids)
+        scope = f"{len(set(medication_ids))} medicamentos" if medication_ids else "todo el catalogo"
+        print(f"  {rows} dias reconstruidos ({scope}) en {time.perf_counter() - started:.1f}s")
+        return rows
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye daily_consumption desde movements")
+    parser.add_argument("--medication-id", type=int, nargs="+", default=None,
+                        help="Solo estos medicamentos (defecto: todo el catalogo)")
+    args = parser.parse_args()
+
+    print("=== Rebuild daily_consumption ===\n")
+    rebuild(args.medication_id)
+    print("\nListo.")
@@ -2,65 +2,73 @@
 Re-ejecuta el forecast ensemble para todos los medicamentos activos.
 
 Uso:
-    docker compose exec api python scripts/rerun_forecasts.py
+    docker compose exec api python scripts/rerun_forecasts.py [--workers N] [--changed-only]
 
-Limpia el cache joblib y recalcula todos los runs con WMAPE.
+Limpia el cache joblib y recalcula todos los runs con WMAPE. Los medicamentos
+se procesan en paralelo (un proceso por nucleo, o --workers N). Con
+--changed-only solo se recalculan los medicamentos con movimientos nuevos
+desde su ultimo forecast (o con un forecast antiguo) y se conserva el cache.
 """
+import argparse
 import sys
 import os
-import shutil
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.core.database import SessionLocal
 from src.models.medication import Medication
-from src.core.factory import ForecastModelFactory
-from src.services.forecast_service import save_forecast
-
-CACHE_DIR = os.environ.get("FORECAST_CACHE_DIR", "/tmp/forecast_models")
+from src.core.model_cache import model_cache
+from src.services.forecast_batch_service import medications_to_refresh, run_batch_local, summarize_batch
 
 
 def clear_cache():
-    if os.path.exists(CACHE_DIR):
-        shutil.rmtree(CACHE_DIR)
-        os.makedirs(CACHE_DIR)
-        print(f"  Cache limpiado: {CACHE_DIR}")
-    else:
-        print(f"  Cache no existia: {CACHE_DIR}")
+    removed = model_cache.clear()
+    print(f"  Cache limpiado: {model_cache.directory} ({removed} modelos)")
 
 
-def rerun_all(horizon_days=30, months_back=18):
+def rerun_all(horizon_days=30, months_back=18, workers=None, changed_only=False):
     db = SessionLocal()
-    fn = ForecastModelFactory.create("ensemble")
-
     try:
         # El seed usa "Activo" (no "active") — tomamos todos los medicamentos
-        medications = db.query(Medication).all()
-        print(f"\nMedicamentos encontrados: {len(medications)}\n")
-
-        ok, fail = 0, 0
+        names = {med.id: med.name for med in db.query(Medication).all()}
+        if changed_only:
+            selected = set(medications_to_refresh(db))
+            names = {med_id: name for med_id, name in names.items() if med_id in selected}
+    finally:
+        db.close()
 
-        for med in medications:
-            try:
-                result = fn(db, med.id, horizon_days, months_back)
-                run = save_forecast(db, med.id, result)
-                mape = result["metrics"].get("mape", "?")
-                print(f"  OK  [{med.id:>3}] {med.name:<30}  WMAPE={mape:.1f}%  alerta={run.alert_level}")
-                ok += 1
-            except Exception as e:
-                print(f"  ERR [{med.id:>3}] {med.name:<30}  {e}")
-                fail += 1
+    print(f"\nMedicamentos encontrados: {len(names)}\n")
 
-        print(f"\nResumen: {ok} OK, {fail} errores")
+    def _report(status):
+        med_id = status["medication_id"]
+        name = names.get(med_id, "?")
+        if status["status"] == "success":
+            mape = status.get("mape")
+            mape_txt = f"{mape:.1f}%" if mape is not None else "?"
+            print(f"  OK  [{med_id:>3}] {name:<30}  WMAPE={mape_txt}  alerta={status['risk_level']}")
+        else:
+            print(f"  ERR [{med_id:>3}] {name:<30}  {status['error']}")
 
-    finally:
-        db.close()
+    results = run_batch_local(
+        names.keys(), "ensemble", horizon_days, months_back,
+        max_workers=workers, on_result=_report,
+    )
+    summary = summarize_batch(results)
+    print(f"\nResumen: {summary['success']} OK, {summary['failed']} errores")
+    return results
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-ejecuta el forecast ensemble de todo el catalogo")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (defecto: nucleos)")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Solo medicamentos con movimientos nuevos o forecast antiguo (conserva el cache)")
+    args = parser.parse_args()
+
     print("=== Rerun Forecasts (WMAPE) ===\n")
-    print("Limpiando cache joblib...")
-    clear_cache()
+    if not args.changed_only:
+        print("Limpiando cache joblib...")
+        clear_cache()
     print("\nEjecutando forecasts ensemble...")
-    rerun_all()
+    rerun_all(workers=args.workers, changed_only=args.changed_only)
     print("\nListo. Recarga el dashboard para ver el WMAPE actualizado.")
@@ -73,6 +73,7 @@ def generate_daily_series(
     monthly: list,
     days: int = 730,
     noise_cv: float = 0.18,
+    start: datetime | None = None,
 ) -> list[float]:
     """
     Genera serie diaria con:
@@ -80,9 +81,12 @@ def generate_daily_series(
     - Estacionalidad anual (meses del ano)
     - Ruido gaussiano bajo (CV ~18%)
     - Trend ligero ascendente (1% acumulado por ano)
+
+    ``start`` es el primer dia de la serie (defecto: hace ``days`` dias).
     """
     series = []
-    start = datetime.utcnow() - timedelta(days=days)
+    if start is None:
+        start = datetime.utcnow() - timedelta(days=days)
     for d in range(days):
         date = start + timedelta(days=d)
         dow = date.weekday()          # 0=lunes
@@ -2,12 +2,17 @@
 Endpoints de forecasting de desabastecimiento de medicamentos.
 
 GET  /forecasts/{medication_id}          — ejecuta forecast y devuelve serie
+POST /forecasts/{medication_id}?async=true — encola el forecast en Celery (202 + job_id)
+     (ambos reutilizan un run con las mismas entradas si existe: cached=true)
+GET  /forecasts/jobs/{job_id}            — estado de un job asíncrono y run_id resultante
+GET  /forecasts/{medication_id}/latest   — último run, recortable a un horizonte menor
 GET  /forecasts/{medication_id}/history  — historial de runs para un medicamento
 GET  /forecasts/summary                  — resumen de riesgo para todos los meds
+GET  /forecasts/performance/timings      — histogramas de tiempos por modelo y etapa
 DELETE /forecasts/{run_id}               — borra un run (solo admin)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Response
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -18,12 +23,18 @@ from src.core.database import get_db
 from src.dependencies.auth import get_current_user
 from src.models.user import User
 from src.models.medication import Medication
-from src.models.forecast import ForecastRun, ForecastPoint, ForecastFullResponse
+from src.models.forecast import ForecastRun, ForecastFullResponse
+from src.repositories import ForecastRepository
 from src.core.factory import ForecastModelFactory
+from src.exceptions import ForecastQueueFullError
+from src.services.forecast_request_service import compute_forecast
 from src.services.forecast_service import (
-    save_forecast,
+    get_cached_forecast,
     get_forecast_summary,
     get_model_performance,
+    get_timing_metrics,
+    run_risk,
+    serve_run,
 )
 
 logger = logging.getLogger(__name__)
@@ -40,19 +51,31 @@ router = APIRouter()
     summary="Ejecutar forecast de desabastecimiento",
     tags=["forecasts"],
     responses={
-        200: {"description": "Forecast generado y persistido"},
+        200: {"description": "Forecast generado y persistido (o reutilizado: cached=true)"},
+        202: {"description": "Forecast encolado (async=true); consultar /forecasts/jobs/{job_id}"},
         404: {"description": "Medicamento no encontrado"},
         422: {"description": "Datos insuficientes para el modelo"},
+        503: {"description": "Cola de forecasting llena (ver Retry-After)"},
     },
 )
 async def run_forecast(
+    response: Response,
     medication_id: int = Path(..., gt=0),
     model: str = Query(
         default="ensemble",
-        description="Modelo a usar: 'arima', 'prophet', 'ensemble'",
+        description=(
+            "Modelo a usar: 'arima', 'prophet', 'ensemble', 'auto' (el mas barato "
+            "que cumple el objetivo de WMAPE) o uno ligero "
+            "('croston', 'sba', 'tsb', 'holt_winters', 'seasonal_naive')"
+        ),
     ),
     horizon_days: int = Query(default=30, ge=7, le=180),
     months_back: int = Query(default=24, ge=6, le=60),
+    run_async: bool = Query(
+        default=False,
+        alias="async",
+        description="Si es true, encola el forecast en Celery y responde 202 con el job_id",
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Dict[str, Any]:
@@ -64,13 +87,22 @@ async def run_forecast(
 
     try:
         # Patrón Factory: ForecastModelFactory.create() resuelve y valida el modelo
-        fn = ForecastModelFactory.create(model)
+        ForecastModelFactory.create(model)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
     try:
-        result = fn(db, medication_id, horizon_days, months_back)
-        run = save_forecast(db, medication_id, result)
+        if run_async:
+            # Un run reciente con las mismas entradas se devuelve sin encolar nada
+            run, result, _ = get_cached_forecast(db, medication_id, model, horizon_days, months_back)
+            if run is None:
+                return _enqueue_forecast(response, medication_id, model, horizon_days, months_back)
+            source = "cached"
+        else:
+            # Cache de resultados + single-flight + ajuste en el pool de procesos
+            run, result, source = await compute_forecast(
+                db, medication_id, model, horizon_days, months_back,
+            )
 
         # Construir respuesta
         points = [
@@ -96,14 +128,22 @@ async def run_forecast(
             "horizon_days": horizon_days,
             "metrics": result["metrics"],
             "parameters": result.get("parameters", {}),
-            "stock_at_forecast": run.stock_at_forecast,
-            "days_until_shortage": run.days_until_shortage,
-            "shortage_probability": run.shortage_probability,
-            "alert_level": run.alert_level,
+            # Riesgo del horizonte pedido (el run puede cubrir uno mayor)
+            **result["risk"],
             "created_at": run.created_at.isoformat(),
+            "cached": source == "cached",
+            "source": source,
             "points": points,
         }
 
+    except HTTPException:
+        raise
+    except ForecastQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
@@ -114,6 +154,72 @@ async def run_forecast(
         )
 
 
+def _enqueue_forecast(
+    response: Response,
+    medication_id: int,
+    model: str,
+    horizon_days: int,
+    months_back: int,
+) -> Dict[str, Any]:
+    """Encola el forecast en Celery y responde 202 con el job_id."""
+    from src.tasks.tasks import run_forecast_job
+
+    try:
+        job = run_forecast_job.delay(medication_id, model, horizon_days, months_back)
+    except Exception as e:
+        logger.error("No se pudo encolar el forecast: %s", str(e))
+        raise HTTPException(status_code=503, detail="Cola de tareas no disponible")
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {
+        "job_id": job.id,
+        "status": "queued",
+        "medication_id": medication_id,
+        "model_type": model,
+        "horizon_days": horizon_days,
+        "status_url": f"/api/v1/forecasts/jobs/{job.id}",
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GET — estado de un job asíncrono (async=true)
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Estados de Celery -> estados expuestos por la API
+_JOB_STATES = {
+    "PENDING": "queued",
+    "RECEIVED": "queued",
+    "RETRY": "queued",
+    "STARTED": "running",
+    "SUCCESS": "done",
+    "FAILURE": "failed",
+    "REVOKED": "failed",
+}
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=Dict[str, Any],
+    summary="Estado de un forecast asíncrono",
+    tags=["forecasts"],
+)
+async def get_forecast_job(
+    job_id: str = Path(..., min_length=1),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+
+    from src.tasks.celery_config import celery_app
+
+    job = celery_app.AsyncResult(job_id)
+    job_status = _JOB_STATES.get(job.state, "queued")
+
+    body: Dict[str, Any] = {"job_id": job_id, "status": job_status, "run_id": None}
+    if job_status == "done":
+        body.update(job.result or {})
+    elif job_status == "failed":
+        body["error"] = str(job.result)
+    return body
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # GET — historial de runs para un medicamento
 # ─────────────────────────────────────────────────────────────────────────────
@@ -128,10 +234,18 @@ async def get_forecast_history(
     medication_id: int = Path(..., gt=0),
     limit: int = Query(default=10, ge=1, le=50),
     model: Optional[str] = Query(default=None),
+    horizon_days: Optional[int] = Query(
+        default=None, ge=1, le=365,
+        description=(
+            "Recorta cada run a este horizonte y recalcula el riesgo (por defecto, el del run); "
+            "solo se listan los runs ajustados al menos a ese horizonte"
+        ),
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Dict[str, Any]:
 
+    from sqlalchemy import func
     from sqlmodel import select
 
     medication = db.get(Medication, medication_id)
@@ -146,28 +260,42 @@ async def get_forecast_history(
     )
     if model:
         stmt = stmt.where(ForecastRun.model_type == model)
+    if horizon_days:
+        fitted = func.coalesce(ForecastRun.fitted_horizon_days, ForecastRun.horizon_days)
+        stmt = stmt.where(fitted >= horizon_days)
 
     runs = db.exec(stmt).all()
 
+    rows = []
+    for r in runs:
+        horizon = horizon_days or r.horizon_days
+        if horizon == r.horizon_days:
+            risk = run_risk(r)
+        else:
+            # Riesgo del recorte, como en /latest (sin modificar el run)
+            try:
+                _, result = serve_run(db, r, horizon, refresh=False)
+            except ValueError:
+                continue  # run sin puntos suficientes (p.ej. puntos borrados)
+            risk = result["risk"]
+        rows.append({
+            "run_id": r.id,
+            "model_type": r.model_type,
+            "horizon_days": horizon,
+            "mae": r.mae,
+            "mape": r.mape,
+            "rmse": r.rmse,
+            "alert_level": risk["alert_level"],
+            "days_until_shortage": risk["days_until_shortage"],
+            "shortage_probability": risk["shortage_probability"],
+            "created_at": r.created_at.isoformat(),
+        })
+
     return {
         "medication_id": medication_id,
         "medication_name": medication.name,
-        "total": len(runs),
-        "runs": [
-            {
-                "run_id": r.id,
-                "model_type": r.model_type,
-                "horizon_days": r.horizon_days,
-                "mae": r.mae,
-                "mape": r.mape,
-                "rmse": r.rmse,
-                "alert_level": r.alert_level,
-                "days_until_shortage": r.days_until_shortage,
-                "shortage_probability": r.shortage_probability,
-                "created_at": r.created_at.isoformat(),
-            }
-            for r in runs
-        ],
+        "total": len(rows),
+        "runs": rows,
     }
 
 
@@ -184,6 +312,10 @@ async def get_forecast_history(
 async def get_latest_forecast(
     medication_id: int = Path(..., gt=0),
     model: Optional[str] = Query(default=None),
+    horizon_days: Optional[int] = Query(
+        default=None, ge=1, le=365,
+        description="Recorta el run a este horizonte y recalcula el riesgo (por defecto, el del run)",
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Dict[str, Any]:
@@ -209,27 +341,27 @@ async def get_latest_forecast(
             detail="No hay forecasts previos para este medicamento. Ejecuta POST primero.",
         )
 
-    points_stmt = (
-        select(ForecastPoint)
-        .where(ForecastPoint.forecast_run_id == run.id)
-        .order_by(ForecastPoint.date)
-    )
-    points = db.exec(points_stmt).all()
+    points = ForecastRepository(db).get_run_points(run)
+
+    # El run guarda puntos hasta el horizonte ajustado: se sirve recortado
+    horizon = horizon_days or run.horizon_days
+    try:
+        _, result = serve_run(db, run, horizon, points, refresh=False)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    points = points[:horizon]
 
     return {
         "run_id": run.id,
         "medication_id": medication_id,
         "medication_name": medication.name,
         "model_type": run.model_type,
-        "horizon_days": run.horizon_days,
+        "horizon_days": horizon,
         "mae": run.mae,
         "mape": run.mape,
         "rmse": run.rmse,
         "r2": run.r2,
-        "alert_level": run.alert_level,
-        "days_until_shortage": run.days_until_shortage,
-        "shortage_probability": run.shortage_probability,
-        "stock_at_forecast": run.stock_at_forecast,
+        **result["risk"],
         "parameters": run.parameters,
         "created_at": run.created_at.isoformat(),
         "points": [
@@ -261,6 +393,43 @@ async def model_performance(
     return get_model_performance(db)
 
 
+@router.get(
+    "/performance/timings",
+    response_model=Dict[str, Any],
+    summary="Histogramas de tiempos por etapa (carga, ajuste, validación, cache, persistencia)",
+    tags=["forecasts"],
+)
+async def timing_metrics(
+    hours: int = Query(default=24, ge=1, le=24 * 30),
+    model: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    return get_timing_metrics(db, hours=hours, model_type=model)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GET — estado de la cache de modelos (solo admin)
+# ─────────────────────────────────────────────────────────────────────────────
+
+@router.get(
+    "/cache/stats",
+    response_model=Dict[str, Any],
+    summary="Uso y contadores de la cache de modelos de forecasting",
+    tags=["forecasts"],
+)
+async def model_cache_stats(
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    from src.models.user import Role
+    from src.core.model_cache import model_cache
+
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Solo administradores")
+    # Los contadores son del proceso de la API; el uso de disco es global
+    return model_cache.stats()
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # GET — resumen de riesgo para todos los medicamentos
 # ─────────────────────────────────────────────────────────────────────────────
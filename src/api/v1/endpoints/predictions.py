@@ -21,8 +21,9 @@ from src.models.prediction import (
 )
 
 # Forecasting (ARIMA / Prophet / Ensemble — reemplaza Random Forest)
-from src.core.factory import ForecastModelFactory
-from src.services.forecast_service import save_forecast
+from src.core.forecast_executor import forecast_executor
+from src.exceptions import ForecastQueueFullError
+from src.services.forecast_request_service import compute_forecast
 
 # SQLAlchemy
 from sqlalchemy import func
@@ -271,13 +272,13 @@ async def predict_shortage(
                 detail=f"No se encontró el medicamento con ID {medicamento_id}",
             )
 
-        # Usar el modelo ensemble (ARIMA + Prophet) via Factory
-        fn = ForecastModelFactory.create("ensemble")
-        forecast_data = fn(db, medicamento_id, dias_prediccion, 24)
-        run = save_forecast(db, medicamento_id, forecast_data)
+        # Modelo ensemble (ARIMA + Prophet) en el pool de forecasting; reutiliza un run
+        # reciente con las mismas entradas o el ajuste en curso de otra peticion
+        run, forecast_data, _ = await compute_forecast(db, medicamento_id, "ensemble", dias_prediccion, 24)
 
         # Construir PredictionResponse compatible con el esquema existente
         metrics = forecast_data.get("metrics", {})
+        risk = forecast_data["risk"]
         daily_avg = float(sum(forecast_data["values"]) / max(len(forecast_data["values"]), 1))
         lower_0 = float(forecast_data["lower_ci"][0]) if len(forecast_data["lower_ci"]) else 0.0
         upper_0 = float(forecast_data["upper_ci"][0]) if len(forecast_data["upper_ci"]) else daily_avg * 2
@@ -291,11 +292,11 @@ async def predict_shortage(
             "stock": float(medication.stock),
             "month_of_year": datetime.utcnow().month,
             "regional_demand": 0.0,
-            "shortage": (run.days_until_shortage or 999) <= 7,
-            "probability": run.shortage_probability or 0.0,
+            "shortage": (risk["days_until_shortage"] or 999) <= 7,
+            "probability": risk["shortage_probability"] or 0.0,
             "confidence_interval_lower": lower_0,
             "confidence_interval_upper": upper_0,
-            "alert_level": run.alert_level or "low",
+            "alert_level": risk["alert_level"] or "low",
             "trend": "up" if daily_avg > 0 else "stable",
             "seasonality_coefficient": 1.0,
             "created_at": datetime.utcnow(),
@@ -307,6 +308,12 @@ async def predict_shortage(
 
     except HTTPException:
         raise
+    except ForecastQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     except Exception as e:
@@ -772,11 +779,8 @@ async def evaluate_model(
                 detail=f"No se encontró el medicamento con ID {medicamento_id}"
             )
 
-        # Ejecutar ensemble y devolver sus métricas de walk-forward validation
-        from src.core.factory import ForecastModelFactory
-        from src.services.forecast_service import save_forecast as _save_fc
-        fn = ForecastModelFactory.create("ensemble")
-        forecast_data = fn(db, medicamento_id, 30, 18)
+        # Ejecutar ensemble en el pool de forecasting y devolver sus métricas walk-forward
+        forecast_data = await forecast_executor.run_model("ensemble", medicamento_id, 30, 18)
         metrics = forecast_data.get("metrics", {})
 
         return EvaluationResponse(
@@ -791,6 +795,12 @@ async def evaluate_model(
 
     except HTTPException:
         raise
+    except ForecastQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error("Error en la evaluación del modelo: %s", str(e), exc_info=True)
         raise HTTPException(
@@ -20,6 +20,19 @@ class Settings(BaseSettings):
 
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    FORECAST_EXECUTOR_WORKERS: int = 2
+    FORECAST_EXECUTOR_QUEUE_SIZE: int = 8
+    FORECAST_EXECUTOR_RETRY_AFTER: int = 30
+    # Procesos loky para los folds walk-forward de cada ajuste (1 = secuencial,
+    # -1 = todos los nucleos).  Los pools (executor, Celery, lotes) ya ejecutan
+    # varios ajustes a la vez y lo fijan a 1 en sus workers.
+    FORECAST_WF_N_JOBS: int = 1
+
+    FORECAST_SINGLE_FLIGHT_REDIS: bool = True
+    FORECAST_SINGLE_FLIGHT_LOCK_TTL: int = 900
+    FORECAST_SINGLE_FLIGHT_WAIT: int = 900
+    FORECAST_SINGLE_FLIGHT_RESULT_TTL: int = 120
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -18,6 +18,8 @@ from typing import Callable
 
 from sqlmodel import Session
 
+from src.core.tracing import traced_forecast
+
 
 # Tipo de las funciones de forecasting
 ForecastFn = Callable[..., dict]
@@ -36,6 +38,12 @@ class ForecastModelFactory:
     - ``"arima"``    : Auto-ARIMA con selección por AIC (pmdarima)
     - ``"prophet"``  : Facebook Prophet con estacionalidad semanal/anual
     - ``"ensemble"`` : Promedio ponderado por 1/RMSE de ARIMA + Prophet
+    - ``"croston"``, ``"sba"``, ``"tsb"``, ``"holt_winters"``, ``"seasonal_naive"`` :
+      modelos ligeros vectorizados (``lightweight_forecast_service``)
+    - ``"auto"``     : Modelo ligero según el perfil de la serie; escala a
+      ARIMA/ensemble solo si su WMAPE supera el objetivo
+    - ``"global"``   : Gradient boosting único para todo el catálogo,
+      entrenado cada noche (``global_forecast_service``)
 
     Raises
     ------
@@ -59,7 +67,8 @@ class ForecastModelFactory:
         Returns
         -------
         ForecastFn
-            Función con firma ``(db, medication_id, horizon_days, months_back) -> dict``.
+            Función con firma ``(db, medication_id, horizon_days, months_back) -> dict``,
+            instrumentada con ``traced_forecast``.
 
         Raises
         ------
@@ -77,7 +86,8 @@ class ForecastModelFactory:
                 f"Modelo '{model_type}' no registrado. "
                 f"Opciones disponibles: {available}"
             )
-        return fn
+        # Tiempos por etapa en result["parameters"]["timings"] (src.core.tracing)
+        return traced_forecast(model_type, fn)
 
     @classmethod
     def available_models(cls) -> list[str]:
@@ -94,11 +104,18 @@ class ForecastModelFactory:
             run_prophet_forecast,
             run_ensemble_forecast,
         )
+        from src.services.auto_forecast_service import run_auto_forecast
+        from src.services.global_forecast_service import run_global_forecast
+        from src.services.lightweight_forecast_service import register_lightweight_models
+
         cls._registry = {
             "arima":    run_arima_forecast,
             "prophet":  run_prophet_forecast,
             "ensemble": run_ensemble_forecast,
+            "auto":     run_auto_forecast,
+            "global":   run_global_forecast,
         }
+        register_lightweight_models()
 
     @classmethod
     def register(cls, name: str, fn: ForecastFn) -> None:
@@ -114,4 +131,7 @@ class ForecastModelFactory:
         fn : ForecastFn
             Función de forecasting con la firma estándar.
         """
+        # Sin esto, registrar antes del primer create() ocultaría los modelos base
+        if not cls._registry:
+            cls._init_registry()
         cls._registry[name] = fn
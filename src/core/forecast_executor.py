@@ -0,0 +1,164 @@
+"""
+Executor dedicado para el forecasting (CPU-bound).
+
+auto_arima y Prophet tardan decenas de segundos por medicamento.  Si se
+ejecutan dentro de un handler ``async def`` bloquean el event loop del
+worker de uvicorn y congelan el resto de peticiones (login, catálogo...).
+
+ForecastExecutor envía cada ajuste a un pool de procesos acotado y el
+handler solo espera (``await``) el resultado.  El número de trabajos en
+curso está limitado a ``workers + queue_size``; si se supera, ``run()``
+lanza ForecastQueueFullError y el endpoint responde 503 con Retry-After.
+
+Uso
+---
+    result = await forecast_executor.run_model("ensemble", med_id, 30, 24)
+    run = save_forecast(db, med_id, result)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from src.core.config import settings
+from src.exceptions import ForecastQueueFullError
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(max_workers: int) -> None:
+    """
+    Inicializador de cada proceso del pool.
+
+    Con varios workers ya hay varios ajustes en paralelo: los folds
+    walk-forward se ejecutan secuencialmente para no abrir un pool loky
+    por ajuste.  Con un solo worker se respeta FORECAST_WF_N_JOBS.
+    """
+    if max_workers > 1:
+        os.environ["FORECAST_WF_N_JOBS"] = "1"
+
+
+def _run_model_job(model_type: str, medication_id: int, horizon_days: int, months_back: int) -> dict:
+    """
+    Ejecuta un modelo del ForecastModelFactory dentro del proceso worker.
+
+    La sesión de BD no es serializable, así que cada trabajo abre la suya.
+    El resultado (arrays NumPy + DatetimeIndex) vuelve al proceso de la API,
+    donde se persiste con ``save_forecast``.
+    """
+    from src.core.database import SessionLocal
+    from src.core.factory import ForecastModelFactory
+
+    fn = ForecastModelFactory.create(model_type)
+    db = SessionLocal()
+    try:
+        return fn(db, medication_id, horizon_days, months_back)
+    finally:
+        db.close()
+
+
+class ForecastExecutor:
+    """
+    Pool de procesos acotado para trabajos de forecasting.
+
+    Parameters
+    ----------
+    max_workers : int
+        Procesos dedicados al ajuste de modelos.
+    queue_size : int
+        Trabajos que pueden esperar cuando todos los procesos están ocupados.
+    retry_after : int
+        Segundos sugeridos al cliente (cabecera Retry-After) al rechazar.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, retry_after: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def in_flight(self) -> int:
+        """Trabajos en ejecución o en espera."""
+        return self._in_flight
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Creación diferida: los tests y los scripts que no hacen forecasting
+        # no arrancan procesos. "spawn" evita heredar el estado de hilos de uvicorn.
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.max_workers,),
+                )
+                logger.info("ForecastExecutor: pool creado (workers=%d)", self.max_workers)
+            return self._pool
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.queue_size:
+                raise ForecastQueueFullError(self.retry_after)
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecuta ``fn(*args)`` en el pool y espera su resultado sin bloquear el loop.
+
+        ``fn`` y sus argumentos deben ser serializables (funciones de módulo).
+
+        Raises
+        ------
+        ForecastQueueFullError
+            Si ya hay ``workers + queue_size`` trabajos en curso.
+        """
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            # Un worker murió (OOM, segfault de Stan...): se recrea en el próximo trabajo
+            logger.error("ForecastExecutor: pool roto, se recreará")
+            with self._lock:
+                self._pool = None
+            raise RuntimeError("El proceso de forecasting terminó inesperadamente")
+        finally:
+            self._release()
+
+    async def run_model(
+        self,
+        model_type: str,
+        medication_id: int,
+        horizon_days: int,
+        months_back: int,
+    ) -> dict:
+        """Ejecuta un modelo del ForecastModelFactory en el pool."""
+        return await self.run(_run_model_job, model_type, medication_id, horizon_days, months_back)
+
+    def shutdown(self) -> None:
+        """Detiene el pool (llamado al apagar la aplicación)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+forecast_executor = ForecastExecutor(
+    max_workers=settings.FORECAST_EXECUTOR_WORKERS,
+    queue_size=settings.FORECAST_EXECUTOR_QUEUE_SIZE,
+    retry_after=settings.FORECAST_EXECUTOR_RETRY_AFTER,
+)
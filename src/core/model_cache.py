@@ -0,0 +1,271 @@
+"""
+Cache acotada de modelos de forecasting (FORECAST_CACHE_DIR).
+
+Cada serie nueva genera un artefacto ``{modelo}_med{id}_{hash}.joblib``;
+sin límites el directorio crece indefinidamente.  ModelCache aplica:
+
+- Escritura atómica (archivo temporal + ``os.replace``): un lector nunca
+  ve un artefacto a medio escribir, aunque haya varios workers.
+- Política keep-latest-K por (modelo, medicamento).
+- Límite global de archivos y de bytes con expulsión LRU (la fecha de
+  modificación se actualiza en cada lectura).
+- Tier caliente en memoria (LRU) para los modelos usados recientemente.
+- Contadores de hits/misses/expulsiones (por proceso).
+
+Uso
+---
+    path = model_cache.path(med_id, "arima", s_hash)
+    model = model_cache.get(path)          # None si no está en cache
+    if model is None:
+        model = fit(...)
+        model_cache.save(path, model)
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+_ARTIFACT_RE = re.compile(r"^(?P<model>[a-z_]+)_med(?P<med>\d+)_(?P<hash>\w+)\.joblib$")
+
+
+def _mtime(path: str) -> float:
+    """mtime tolerante a archivos borrados por otro proceso entretanto."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class ModelCache:
+    """
+    Gestor de artefactos de modelos en disco con tier caliente en memoria.
+
+    Parameters
+    ----------
+    directory : str
+        Directorio de artefactos.
+    max_bytes : int
+        Tamaño máximo total en disco.
+    max_files : int
+        Número máximo de artefactos en disco.
+    keep_per_medication : int
+        Artefactos conservados por (modelo, medicamento); los más antiguos se expulsan.
+    hot_size : int
+        Modelos mantenidos en memoria (0 desactiva el tier caliente).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        max_files: int,
+        keep_per_medication: int,
+        hot_size: int,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.keep_per_medication = max(1, keep_per_medication)
+        self.hot_size = max(0, hot_size)
+        self._hot: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hot_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "writes": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    # ── Rutas ──────────────────────────────────────────────────────────────
+
+    def path(self, medication_id: int, model_type: str, series_hash: str) -> str:
+        """Ruta del artefacto para (medicamento, modelo, hash de la serie)."""
+        return os.path.join(self.directory, f"{model_type}_med{medication_id}_{series_hash}.joblib")
+
+    def latest_hash(self, medication_id: int, model_type: str) -> Optional[str]:
+        """Hash de la serie del artefacto más reciente del medicamento, o None."""
+        paths = glob.glob(os.path.join(self.directory, f"{model_type}_med{medication_id}_*.joblib"))
+        if not paths:
+            return None
+        match = _ARTIFACT_RE.match(os.path.basename(max(paths, key=_mtime)))
+        return match.group("hash") if match else None
+
+    # ── Lectura / escritura ────────────────────────────────────────────────
+
+    def get(self, path: str, detach: bool = False) -> Any:
+        """
+        Devuelve el artefacto (memoria primero, luego disco) o None si no existe.
+
+        Parameters
+        ----------
+        detach : bool
+            Si el llamador va a modificar el objeto in-place (p.ej. ARIMA
+            ``update()``), se retira del tier caliente para que el cambio no
+            contamine la entrada asociada a la serie original.
+        """
+        with self._lock:
+            if path in self._hot:
+                self._counters["hot_hits"] += 1
+                if detach:
+                    return self._hot.pop(path)
+                self._hot.move_to_end(path)
+                return self._hot[path]
+
+        try:
+            obj = joblib.load(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning("Artefacto ilegible, se descarta: %s (%s)", path, e)
+            with self._lock:
+                self._counters["misses"] += 1
+            self._remove(path)
+            return None
+
+        with self._lock:
+            self._counters["disk_hits"] += 1
+        try:
+            os.utime(path)  # marca de uso para la expulsión LRU
+        except OSError:
+            pass
+        if not detach:
+            self._remember(path, obj)
+        return obj
+
+    def save(self, path: str, obj: Any, hot: bool = True) -> None:
+        """
+        Escribe el artefacto de forma atómica y aplica los límites de la cache.
+
+        Con ``hot=False`` no se guarda en memoria (el llamador modificará el objeto).
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                joblib.dump(obj, fh)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self._counters["writes"] += 1
+        if hot:
+            self._remember(path, obj)
+
+        match = _ARTIFACT_RE.match(os.path.basename(path))
+        if match:
+            self._enforce_per_medication(match.group("model"), int(match.group("med")), keep=path)
+        self._enforce_global_limits(keep=path)
+
+    # ── Expulsión ──────────────────────────────────────────────────────────
+
+    def _remember(self, path: str, obj: Any) -> None:
+        if self.hot_size == 0:
+            return
+        with self._lock:
+            self._hot[path] = obj
+            self._hot.move_to_end(path)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._hot.pop(path, None)
+            self._counters["evictions"] += 1
+
+    def _artifacts(self) -> list:
+        """(ruta, mtime, tamaño) de los artefactos en disco."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".joblib"):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((entry.path, st.st_mtime, st.st_size))
+        return entries
+
+    def _enforce_per_medication(self, model_type: str, medication_id: int, keep: str) -> None:
+        paths = glob.glob(os.path.join(self.directory, f"{model_type}_med{medication_id}_*.joblib"))
+        stale = sorted(
+            (p for p in paths if p != keep),
+            key=_mtime,
+            reverse=True,
+        )[self.keep_per_medication - 1:]
+        for p in stale:
+            self._remove(p)
+
+    def _enforce_global_limits(self, keep: str) -> None:
+        entries = sorted(self._artifacts(), key=lambda e: e[1])  # LRU primero
+        total_bytes = sum(e[2] for e in entries)
+        count = len(entries)
+        for path, _, size in entries:
+            if count <= self.max_files and total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            count -= 1
+            total_bytes -= size
+
+    def clear(self) -> int:
+        """Elimina todos los artefactos; devuelve cuántos se borraron."""
+        removed = 0
+        for path, _, _ in self._artifacts():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._hot.clear()
+        return removed
+
+    # ── Métricas ───────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """Uso de disco/memoria y contadores del proceso actual."""
+        entries = self._artifacts()
+        with self._lock:
+            counters = dict(self._counters)
+            hot_entries = len(self._hot)
+        lookups = counters["hot_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["hot_hits"] + counters["disk_hits"]
+        return {
+            "directory": self.directory,
+            "files": len(entries),
+            "bytes": sum(e[2] for e in entries),
+            "max_files": self.max_files,
+            "max_bytes": self.max_bytes,
+            "keep_per_medication": self.keep_per_medication,
+            "hot_entries": hot_entries,
+            "hot_size": self.hot_size,
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+model_cache = ModelCache(
+    directory=os.environ.get("FORECAST_CACHE_DIR", "/tmp/forecast_models"),
+    max_bytes=int(os.environ.get("FORECAST_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+    max_files=int(os.environ.get("FORECAST_CACHE_MAX_FILES", "5000")),
+    keep_per_medication=int(os.environ.get("FORECAST_CACHE_KEEP_PER_MED", "3")),
+    hot_size=int(os.environ.get("FORECAST_CACHE_HOT_SIZE", "32")),
+)
@@ -0,0 +1,185 @@
+"""
+Coalescencia de peticiones (single-flight) para trabajos costosos.
+
+Cuando varios farmacéuticos abren el mismo medicamento a la vez, cada
+petición dispararía su propio ajuste idéntico.  SingleFlight garantiza
+que, para una misma clave, solo un "líder" ejecuta el cálculo y el resto
+("seguidores") espera su resultado:
+
+- Dentro de un worker: un ``asyncio.Future`` por clave en curso.
+- Entre workers/réplicas: un lock en Redis (``SET NX PX``) y una clave de
+  resultado con TTL corto.  Los seguidores sondean la clave de resultado;
+  si el lock desaparece sin resultado (el líder falló o murió), o vence
+  la espera, calculan ellos mismos.
+
+Si Redis no está disponible se degrada a coalescencia solo en proceso
+(y se reintenta la conexión pasados unos segundos).
+
+Uso
+---
+    run_id, shared = await forecast_single_flight.run(key, compute)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Libera el lock solo si sigue perteneciendo al líder (pudo expirar y tomarlo otro)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Ejecuta un cálculo una sola vez por clave entre peticiones concurrentes.
+
+    Parameters
+    ----------
+    redis_url : str, optional
+        Redis compartido por los workers (None = solo en proceso).
+    lock_ttl : int
+        Segundos de vida del lock del líder (mayor que el cálculo más lento).
+    wait_timeout : int
+        Segundos máximos que un seguidor de otro worker espera al líder.
+    result_ttl : int
+        Segundos que se conserva el resultado para seguidores rezagados.
+    poll_interval : float
+        Intervalo de sondeo de la clave de resultado en Redis.
+    prefix : str
+        Prefijo de las claves en Redis.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str],
+        lock_ttl: int,
+        wait_timeout: int,
+        result_ttl: int,
+        poll_interval: float = 0.5,
+        prefix: str = "singleflight",
+    ) -> None:
+        self.redis_url = redis_url
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self._local: Dict[str, asyncio.Future] = {}
+        self._redis: Any = None
+        self._redis_retry_at = 0.0
+
+    # ── Redis ──────────────────────────────────────────────────────────────
+
+    def _get_redis(self) -> Any:
+        if not self.redis_url or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.Redis.from_url(
+                self.redis_url, socket_connect_timeout=1, socket_timeout=2,
+            )
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning("SingleFlight: Redis no disponible (%s); solo coalescencia en proceso", error)
+        self._redis_retry_at = time.monotonic() + 30
+
+    # ── API ────────────────────────────────────────────────────────────────
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Devuelve ``(resultado, compartido)``.
+
+        ``compartido`` es True si el resultado lo calculó otra petición.
+        El resultado debe ser serializable a JSON (se comparte vía Redis).
+        Los errores del líder se propagan a sus seguidores en proceso.
+        """
+        pending = self._local.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._local[key] = future
+        try:
+            result, shared = await self._run_distributed(key, compute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marcado como leído aunque no haya seguidores
+            raise
+        else:
+            future.set_result(result)
+            return result, shared
+        finally:
+            self._local.pop(key, None)
+
+    async def _run_distributed(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        redis = self._get_redis()
+        if redis is None:
+            return await compute(), False
+
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = uuid.uuid4().hex
+        try:
+            cached = await redis.get(result_key)
+            if cached is not None:
+                return json.loads(cached), True
+            acquired = await redis.set(lock_key, token, nx=True, px=self.lock_ttl * 1000)
+        except Exception as e:
+            self._redis_failed(e)
+            return await compute(), False
+
+        if acquired:
+            try:
+                result = await compute()
+                try:
+                    await redis.set(result_key, json.dumps(result), ex=self.result_ttl)
+                except Exception as e:
+                    self._redis_failed(e)
+                return result, False
+            finally:
+                try:
+                    await redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                except Exception:
+                    pass  # el lock expira solo
+
+        # Seguidor: otro worker está calculando
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while time.monotonic() < deadline:
+                cached = await redis.get(result_key)
+                if cached is not None:
+                    return json.loads(cached), True
+                if not await redis.exists(lock_key):
+                    break
+                await asyncio.sleep(self.poll_interval)
+        except Exception as e:
+            self._redis_failed(e)
+        logger.info("SingleFlight: el líder de %s no publicó resultado; se calcula localmente", key)
+        return await compute(), False
+
+
+forecast_single_flight = SingleFlight(
+    redis_url=settings.REDIS_URL if settings.FORECAST_SINGLE_FLIGHT_REDIS else None,
+    lock_ttl=settings.FORECAST_SINGLE_FLIGHT_LOCK_TTL,
+    wait_timeout=settings.FORECAST_SINGLE_FLIGHT_WAIT,
+    result_ttl=settings.FORECAST_SINGLE_FLIGHT_RESULT_TTL,
+    prefix="forecast:sf",
+)
@@ -0,0 +1,121 @@
+"""
+Trazas ligeras por etapa para el pipeline de forecasting.
+
+Un forecast lento puede deberse a la carga de la serie, al ajuste
+(auto_arima, Prophet), a la validación, a la E/S de joblib o a la
+persistencia de puntos.  ``ForecastTrace`` acumula la duración de cada
+etapa (spans con ``with span("arima.fit")``) y los aciertos/fallos de
+cache, y se guarda en ``ForecastRun.parameters["timings"]``:
+
+    {"total_s": 9.81,
+     "stages": {"load_series": 0.04, "arima.fit": 8.9, ...},
+     "calls": {"load_series": 2},          # solo etapas repetidas
+     "cache": {"arima": "local"}}          # local | registry | miss
+
+La traza activa vive en un ContextVar: ``span`` es un no-op (sin coste)
+fuera de un forecast, y los hilos que deban contribuir a la misma traza
+(miembros del ensemble) se lanzan con ``contextvars.copy_context().run``.
+Los modelos anidados (``auto`` -> ``arima``) acumulan en la traza del
+modelo externo.
+
+Uso
+---
+    fn = traced_forecast("arima", run_arima_forecast)
+    result = fn(db, med_id, 30, 24)          # result["parameters"]["timings"]
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+
+class ForecastTrace:
+    """Duraciones acumuladas por etapa y estado de cache de un forecast."""
+
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.cache: Dict[str, str] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def flag(self, name: str, value: str) -> None:
+        with self._lock:
+            self.cache[name] = value
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total_s": round(time.perf_counter() - self._started, 4),
+                "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                "calls": {k: n for k, n in self.calls.items() if n > 1},
+                "cache": dict(self.cache),
+            }
+
+
+_current: ContextVar[Optional[ForecastTrace]] = ContextVar("forecast_trace", default=None)
+
+
+def current_trace() -> Optional[ForecastTrace]:
+    """Traza activa en este contexto, o None."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Mide el bloque y lo suma a la etapa ``name`` de la traza activa."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+def cache_flag(name: str, value: str) -> None:
+    """Registra el resultado de una consulta a cache (``local``, ``registry``, ``miss``...)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.flag(name, value)
+
+
+def traced_forecast(model_type: str, fn: Callable[..., dict]) -> Callable[..., dict]:
+    """
+    Envuelve una función de forecasting para que abra una traza y deje el
+    resultado en ``result["parameters"]["timings"]``.
+
+    Si ya hay una traza activa (modelo anidado) no abre otra: sus etapas
+    se suman a la del llamador.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _current.get() is not None:
+            return fn(*args, **kwargs)
+        trace = ForecastTrace()
+        token = _current.set(trace)
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+        if isinstance(result, dict):
+            params = result.get("parameters")
+            if not isinstance(params, dict):
+                params = result["parameters"] = {}
+            params["timings"] = trace.as_dict()
+        return result
+
+    wrapper.model_type = model_type
+    return wrapper
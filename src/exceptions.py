@@ -61,3 +61,8 @@ class ValidationError(DomainError):
     def __init__(self, message: str):
         self.message = message
         super().__init__(message)
+
+class ForecastQueueFullError(DomainError):
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__("La cola de forecasting está llena, reintente más tarde")
@@ -8,6 +8,7 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from src.api.v1.router import api_router
 from src.core.database import engine, create_db_and_tables
+from src.core.forecast_executor import forecast_executor
 from src.core.limiter import limiter
 from src.core.logging import setup_logging
 from src.core.config import settings
@@ -26,6 +27,7 @@ origins = [o.strip() for o in settings.CORS_ORIGINS.split(",")]
 async def lifespan(app: FastAPI):
     create_db_and_tables()
     yield
+    forecast_executor.shutdown()
 
 
 app = FastAPI(
@@ -20,7 +20,7 @@ from .category import Category, CategoryCreate, CategoryUpdate, CategoryInDB
 from .condition import Condition, ConditionCreate, ConditionUpdate, ConditionInDB
 from .intake_type import IntakeType, IntakeTypeCreate, IntakeTypeUpdate, IntakeTypeInDB
 from .medication import Medication, MedicationCreate, MedicationUpdate, MedicationInDB
-from .movement import Movement, MovementCreate, MovementUpdate, MovementInDB, MovementType
+from .movement import Movement, MovementCreate, MovementUpdate, MovementInDB, MovementType, DailyConsumption
 from .prediction import (
     Prediction, PredictionCreate, PredictionUpdate, PredictionInDB, PredictionResponse,
     PredictionMetrics, PredictionMetricsCreate, PredictionMetricsUpdate, PredictionMetricsResponse
@@ -41,7 +41,8 @@ from .report import (
 )
 from .forecast import (
     ForecastRun, ForecastRunCreate, ForecastRunResponse,
-    ForecastPoint, ForecastPointResponse, ForecastFullResponse
+    ForecastPoint, ForecastPointResponse, ForecastFullResponse,
+    ForecastModelArtifact, ForecastWatermark
 )
 from .supplier import (
     Supplier, SupplierCreate, SupplierUpdate, SupplierInDB, SupplierStatus
@@ -72,7 +73,7 @@ __all__ = [
     'Condition', 'ConditionCreate', 'ConditionUpdate', 'ConditionInDB',
     'IntakeType', 'IntakeTypeCreate', 'IntakeTypeUpdate', 'IntakeTypeInDB',
     'Medication', 'MedicationCreate', 'MedicationUpdate', 'MedicationInDB',
-    'Movement', 'MovementCreate', 'MovementUpdate', 'MovementInDB', 'MovementType',
+    'Movement', 'MovementCreate', 'MovementUpdate', 'MovementInDB', 'MovementType', 'DailyConsumption',
     'Prediction', 'PredictionCreate', 'PredictionUpdate', 'PredictionInDB', 'PredictionResponse',
     'PredictionMetrics', 'PredictionMetricsCreate', 'PredictionMetricsUpdate', 'PredictionMetricsResponse',
     'MedicationConditionLink',
@@ -91,6 +92,7 @@ __all__ = [
     # Forecasts
     'ForecastRun', 'ForecastRunCreate', 'ForecastRunResponse',
     'ForecastPoint', 'ForecastPointResponse', 'ForecastFullResponse',
+    'ForecastModelArtifact', 'ForecastWatermark',
 
     # Logistics: Suppliers, Lots/Traceability, Audits, Deliveries
     'Supplier', 'SupplierCreate', 'SupplierUpdate', 'SupplierInDB', 'SupplierStatus',
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional, TYPE_CHECKING
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index
 
 if TYPE_CHECKING:
     from .supplier import Supplier
@@ -27,6 +27,10 @@ class DeliveryBase(SQLModel):
 
 class Delivery(DeliveryBase, table=True):
     __tablename__ = "deliveries"
+    __table_args__ = (
+        Index("ix_deliveries_status_created", "status", "created_at"),
+        Index("ix_deliveries_created_at", "created_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -4,11 +4,17 @@ Modelos para predicciones de series de tiempo con ARIMA y Prophet.
 ForecastRun   — representa una ejecución de forecasting para un medicamento
                con un modelo específico (arima / prophet / random_forest / ensemble).
 ForecastPoint — cada punto futuro de la serie: fecha, valor predicho e intervalo
-               de confianza al 95%.
+               de confianza al 95%.  Los runs nuevos los guardan empaquetados
+               en ``ForecastRun.packed_points`` (una sola fila por run).
+ForecastModelArtifact — registro compartido de modelos ajustados (blob comprimido)
+               para que todos los nodos de API y workers reutilicen el mismo ajuste.
+ForecastWatermark — marca de cambios por medicamento: cuándo cambiaron sus
+               movimientos y cuándo los consumió el último forecast del lote.
 """
 
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import ForeignKey, Index, Integer, LargeBinary, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship, Column, JSON
 
 if TYPE_CHECKING:
@@ -55,8 +61,26 @@ class ForecastRunBase(SQLModel):
 
 class ForecastRun(ForecastRunBase, table=True):
     __tablename__ = "forecast_runs"
+    __table_args__ = (
+        # Clave de la cache de resultados (ver forecast_service.get_cached_forecast)
+        Index(
+            "ix_forecast_runs_result_key",
+            "medication_id", "model_type", "months_back", "series_hash",
+        ),
+        # Ultimo run por (medicamento[, modelo]): ORDER BY created_at DESC
+        Index("ix_forecast_runs_medication_model_created", "medication_id", "model_type", "created_at"),
+        Index("ix_forecast_runs_medication_created", "medication_id", "created_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Entradas del run: ventana de historia y hash de la serie de consumo usada
+    months_back: Optional[int] = Field(default=None)
+    series_hash: Optional[str] = Field(default=None, max_length=32)
+    # Dias ajustados y guardados como puntos (>= horizon_days; los menores se sirven recortando)
+    fitted_horizon_days: Optional[int] = Field(default=None)
+    # Puntos empaquetados en float32 (ver forecast_repository.pack_points);
+    # None = runs antiguos con una fila por dia en forecast_points
+    packed_points: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary, nullable=True))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -104,6 +128,60 @@ class ForecastPointResponse(ForecastPointBase):
         from_attributes = True
 
 
+# ─── ForecastModelArtifact ──────────────────────────────────────────────────
+
+class ForecastModelArtifact(SQLModel, table=True):
+    """
+    Modelo ajustado serializado (joblib comprimido), identificado por
+    (medicamento, tipo de modelo, hash de la serie de entrenamiento).
+
+    Los modelos de catalogo (``global``) no pertenecen a un medicamento:
+    se guardan con ``medication_id = NULL`` y la version como hash.
+    """
+    __tablename__ = "forecast_model_artifacts"
+    __table_args__ = (
+        UniqueConstraint(
+            "medication_id", "model_type", "series_hash",
+            name="uq_forecast_model_artifacts_key",
+        ),
+        # Ultimo ajuste por (medicamento, modelo) (ver forecast_service._latest_model_hash)
+        Index("ix_forecast_model_artifacts_latest", "medication_id", "model_type", "created_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    medication_id: Optional[int] = Field(
+        default=None,
+        sa_column=Column(Integer, ForeignKey("medications.id", ondelete="CASCADE"), index=True, nullable=True),
+    )
+    model_type: str = Field(..., max_length=30)
+    series_hash: str = Field(..., max_length=32)
+    parameters: Optional[dict] = Field(default_factory=dict, sa_column=Column(JSON))
+    artifact: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    size_bytes: int = Field(default=0, ge=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ─── ForecastWatermark ──────────────────────────────────────────────────────
+
+class ForecastWatermark(SQLModel, table=True):
+    """
+    Seguimiento de cambios para el refresco programado del catálogo.
+
+    ``changed_at`` se actualiza al insertar, modificar o borrar movimientos
+    del medicamento (hook ``after_flush`` en src.models.movement);
+    ``forecasted_at`` es el instante en que el lote leyó la serie por
+    última vez.  El medicamento está "sucio" si ``changed_at`` es posterior.
+    """
+    __tablename__ = "forecast_watermarks"
+
+    medication_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("medications.id", ondelete="CASCADE"), primary_key=True)
+    )
+    changed_at: Optional[datetime] = Field(default=None)
+    forecasted_at: Optional[datetime] = Field(default=None)
+    forecast_run_id: Optional[int] = Field(default=None)
+
+
 # ─── Respuesta completa ──────────────────────────────────────────────────────
 
 class ForecastFullResponse(ForecastRunResponse):
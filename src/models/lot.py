@@ -1,7 +1,7 @@
 from datetime import datetime, date
 from enum import Enum
 from typing import Optional, List, TYPE_CHECKING
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index
 
 if TYPE_CHECKING:
     from .medication import Medication
@@ -31,6 +31,10 @@ class LotBase(SQLModel):
 
 class Lot(LotBase, table=True):
     __tablename__ = "lots"
+    __table_args__ = (
+        Index("ix_lots_status_created", "status", "created_at"),
+        Index("ix_lots_created_at", "created_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -1,7 +1,9 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from typing import Optional, TYPE_CHECKING
-from sqlmodel import SQLModel, Field, Relationship
+from typing import Optional, Set, Tuple, TYPE_CHECKING
+from sqlalchemy import Column, ForeignKey, Integer, event, inspect
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel, Field, Relationship, Index
 
 if TYPE_CHECKING:
     from .medication import Medication
@@ -24,6 +26,14 @@ class MovementBase(SQLModel):
 class Movement(MovementBase, table=True):
     """Movement model for database."""
     __tablename__ = "movements"
+    __table_args__ = (
+        # Recalculo del rollup diario y movimientos recientes: (medicamento, rango de fechas);
+        # en Postgres cubre type y quantity para agregar sin leer la tabla
+        Index(
+            "ix_movements_medication_date", "medication_id", "date",
+            postgresql_include=["type", "quantity"],
+        ),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -53,3 +63,94 @@ class MovementInDB(MovementBase):
     
     class Config:
         from_attributes = True
+
+
+class DailyConsumption(SQLModel, table=True):
+    """
+    Agregado diario de movimientos por medicamento (rollup).
+
+    Lo mantiene el hook ``after_flush`` de este módulo al insertar,
+    modificar o borrar movimientos, y se reconstruye con
+    ``scripts/rebuild_daily_consumption.py``.  Las series de consumo y los
+    reportes leen de aquí: O(días) en lugar de O(movimientos).
+    """
+    __tablename__ = "daily_consumption"
+
+    medication_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("medications.id", ondelete="CASCADE"), primary_key=True)
+    )
+    day: date = Field(primary_key=True)
+    out_quantity: float = Field(default=0.0, nullable=False)
+    out_count: int = Field(default=0, nullable=False)
+    in_quantity: float = Field(default=0.0, nullable=False)
+    in_count: int = Field(default=0, nullable=False)
+
+
+# ── Seguimiento de cambios ──────────────────────────────────────────────────
+
+def _changed_medication_ids(session) -> Set[int]:
+    """Medicamentos con movimientos insertados, modificados o borrados en el flush."""
+    from .medication import Medication
+
+    ids: Set[int] = set()
+    removed: Set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Medication) and obj in session.deleted:
+            removed.add(obj.id)
+        if not isinstance(obj, Movement):
+            continue
+        if obj.medication_id is not None:
+            ids.add(obj.medication_id)
+        # Un movimiento reasignado también cambia la serie del medicamento anterior
+        ids.update(m for m in inspect(obj).attrs.medication_id.history.deleted if m is not None)
+    return ids - removed
+
+
+def _day(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _changed_days(session) -> Set[Tuple[int, date]]:
+    """(medicamento, día) de los movimientos insertados, modificados o borrados en el flush."""
+    keys: Set[Tuple[int, date]] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, Movement):
+            continue
+        attrs = inspect(obj).attrs
+        # Un movimiento movido de medicamento o de día cambia también la celda anterior
+        medications = {obj.medication_id, *attrs.medication_id.history.deleted}
+        days = {_day(obj.date), *(_day(d) for d in attrs.date.history.deleted)}
+        keys.update((m, d) for m in medications for d in days if m is not None and d is not None)
+    return keys
+
+
+@event.listens_for(Movement.medication_id, "set", active_history=True)
+def _load_previous_medication(target, value, oldvalue, initiator) -> None:
+    """active_history: al reasignar un movimiento se conserva el medicamento anterior en el historial."""
+
+
+@event.listens_for(Movement.date, "set", active_history=True)
+def _load_previous_date(target, value, oldvalue, initiator) -> None:
+    """active_history: al cambiar la fecha se conserva el día anterior en el historial."""
+
+
+@event.listens_for(Session, "after_flush")
+def _track_movement_changes(session, flush_context) -> None:
+    """
+    Marca como sucios (ForecastWatermark) los medicamentos cuyos movimientos
+    cambiaron y recalcula sus días en DailyConsumption, en la misma
+    transacción.  Las escrituras por SQL directo (fuera del ORM) no pasan
+    por aquí: las cubre la edad máxima del refresco y deben reconstruir
+    el rollup (``DailyConsumptionRepository.rebuild``).
+    """
+    ids = _changed_medication_ids(session)
+    if ids:
+        from src.repositories.daily_consumption_repository import DailyConsumptionRepository
+        from src.repositories.forecast_watermark_repository import ForecastWatermarkRepository
+
+        connection = session.connection()
+        ForecastWatermarkRepository.mark_changed(connection, ids, datetime.utcnow())
+        DailyConsumptionRepository.refresh_days(
+            connection, [(m, d) for m, d in _changed_days(session) if m in ids]
+        )
+
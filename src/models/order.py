@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional, TYPE_CHECKING
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index
 
 if TYPE_CHECKING:
     from .user import User
@@ -27,6 +27,12 @@ class OrderBase(SQLModel):
 
 class Order(OrderBase, table=True):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Listados: por estado, por medicamento o todos, siempre por created_at desc
+        Index("ix_orders_status_created", "status", "created_at"),
+        Index("ix_orders_medication_created", "medication_id", "created_at"),
+        Index("ix_orders_created_at", "created_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -1,7 +1,8 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional, List, TYPE_CHECKING
-from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlalchemy import text
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON, Index
 from pydantic import validator, BaseModel
 
 if TYPE_CHECKING:
@@ -142,6 +143,15 @@ class PredictionBase(SQLModel):
 class Prediction(PredictionBase, table=True):
     """Prediction model for database."""
     __tablename__ = "predictions"
+    __table_args__ = (
+        Index("ix_predictions_medication_date", "medication_id", "date"),
+        Index("ix_predictions_created_at", "created_at"),
+        # Alertas: solo las filas con desabastecimiento, por fecha
+        Index(
+            "ix_predictions_shortage_date", "date",
+            postgresql_where=text("shortage"), sqlite_where=text("shortage = 1"),
+        ),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -10,10 +10,16 @@ from .base import BaseRepository
 from .medication_repository import MedicationRepository
 from .forecast_repository import ForecastRepository
 from .movement_repository import MovementRepository
+from .model_registry_repository import ModelRegistryRepository
+from .forecast_watermark_repository import ForecastWatermarkRepository
+from .daily_consumption_repository import DailyConsumptionRepository
 
 __all__ = [
     "BaseRepository",
     "MedicationRepository",
     "ForecastRepository",
     "MovementRepository",
+    "ModelRegistryRepository",
+    "ForecastWatermarkRepository",
+    "DailyConsumptionRepository",
 ]
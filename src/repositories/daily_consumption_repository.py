@@ -0,0 +1,182 @@
+"""
+Repositorio concreto para DailyConsumption (rollup diario de movimientos).
+
+El rollup lo mantiene el hook ``after_flush`` de Movement, que recalcula
+los días (medicamento, día) tocados en cada flush a partir de la tabla
+``movements``: recalcular en lugar de sumar deltas hace la operación
+idempotente y sin deriva.  ``rebuild`` lo reconstruye entero (o para
+unos medicamentos) tras cargas por SQL directo.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from src.models.movement import DailyConsumption, Movement, MovementType
+from .base import BaseRepository
+
+_COLUMNS = ["out_quantity", "out_count", "in_quantity", "in_count"]
+
+
+def _as_date(value) -> date:
+    # func.date() devuelve date en Postgres y 'YYYY-MM-DD' en SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _aggregates():
+    """Columnas agregadas por (medicamento, día) sobre ``movements``."""
+    is_out = Movement.type == MovementType.OUT
+    is_in = Movement.type == MovementType.IN
+    return [
+        func.coalesce(func.sum(case((is_out, Movement.quantity), else_=0.0)), 0.0),
+        func.sum(case((is_out, 1), else_=0)),
+        func.coalesce(func.sum(case((is_in, Movement.quantity), else_=0.0)), 0.0),
+        func.sum(case((is_in, 1), else_=0)),
+    ]
+
+
+def _upsert(connection, rows: List[dict]) -> None:
+    """INSERT ... ON CONFLICT (medication_id, day) DO UPDATE de los agregados."""
+    table = DailyConsumption.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["medication_id", "day"],
+            set_={c: getattr(stmt.excluded, c) for c in _COLUMNS},
+        )
+        connection.execute(stmt)
+        return
+
+    # Otros motores: UPDATE y luego INSERT de las filas que no existían
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(table.c.medication_id == row["medication_id"], table.c.day == row["day"])
+            .values({c: row[c] for c in _COLUMNS})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+
+class DailyConsumptionRepository(BaseRepository[DailyConsumption]):
+    """Repositorio del rollup diario de movimientos por medicamento."""
+
+    def __init__(self, db: Session) -> None:
+        super().__init__(DailyConsumption, db)
+
+    # ── Consultas específicas ───────────────────────────────────────────────
+
+    def get_totals_by_type(self) -> List[dict]:
+        """
+        Número de movimientos y cantidad total por tipo (IN/OUT) del
+        catálogo, sumando el rollup en lugar de ``movements``.
+        """
+        dc = DailyConsumption
+        row = self._db.exec(
+            select(
+                func.sum(dc.in_count), func.sum(dc.in_quantity),
+                func.sum(dc.out_count), func.sum(dc.out_quantity),
+            )
+        ).one()
+        in_count, in_quantity, out_count, out_quantity = row
+        totals = [
+            {"type": MovementType.IN, "count": int(in_count or 0), "total_quantity": float(in_quantity or 0)},
+            {"type": MovementType.OUT, "count": int(out_count or 0), "total_quantity": float(out_quantity or 0)},
+        ]
+        return [t for t in totals if t["count"]]
+
+    # ── Mantenimiento ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def refresh_days(connection, keys: Iterable[Tuple[int, date]]) -> None:
+        """
+        Recalcula las celdas ``(medication_id, día)`` desde ``movements``.
+
+        Recibe una conexión (no una sesión) porque se invoca desde el hook
+        ``after_flush`` de Movement, dentro de la transacción del cambio.
+        Las celdas que se quedan sin movimientos se borran.
+        """
+        by_medication: Dict[int, List[date]] = defaultdict(list)
+        for med_id, day in set(keys):
+            by_medication[med_id].append(day)
+        if not by_medication:
+            return
+
+        day = func.date(Movement.date).label("day")
+        stmt = (
+            select(Movement.medication_id, day, *_aggregates())
+            .where(
+                or_(*(
+                    and_(
+                        Movement.medication_id == med_id,
+                        Movement.date >= datetime.combine(min(days), time.min),
+                        Movement.date < datetime.combine(max(days) + timedelta(days=1), time.min),
+                    )
+                    for med_id, days in by_medication.items()
+                ))
+            )
+            .group_by(Movement.medication_id, day)
+        )
+        totals = {
+            (med_id, _as_date(d)): dict(zip(_COLUMNS, values))
+            for med_id, d, *values in connection.execute(stmt)
+        }
+
+        rows, emptied = [], []
+        for med_id, days in by_medication.items():
+            for d in days:
+                cell = totals.get((med_id, d))
+                if cell and (cell["out_count"] or cell["in_count"]):
+                    rows.append({"medication_id": med_id, "day": d, **cell})
+                else:
+                    emptied.append({"m": med_id, "d": d})
+        if rows:
+            _upsert(connection, rows)
+        if emptied:
+            table = DailyConsumption.__table__
+            connection.execute(
+                delete(table).where(table.c.medication_id == bindparam("m"), table.c.day == bindparam("d")),
+                emptied,
+            )
+
+    def rebuild(self, medication_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Reconstruye el rollup desde ``movements`` con un INSERT ... SELECT.
+
+        Parameters
+        ----------
+        medication_ids : iterable of int, optional
+            Medicamentos a reconstruir (None = todo el catálogo).
+
+        Returns
+        -------
+        int
+            Filas (medicamento, día) escritas.
+        """
+        table = DailyConsumption.__table__
+        day = func.date(Movement.date)
+        source = select(Movement.medication_id, day, *_aggregates()).group_by(Movement.medication_id, day)
+        clear = delete(table)
+        if medication_ids is not None:
+            ids = sorted(set(medication_ids))
+            if not ids:
+                return 0
+            source = source.where(Movement.medication_id.in_(ids))
+            clear = clear.where(table.c.medication_id.in_(ids))
+
+        self._db.execute(clear)
+        self._db.execute(insert(table).from_select(["medication_id", "day", *_COLUMNS], source))
+        count = select(func.count()).select_from(table)
+        if medication_ids is not None:
+            count = count.where(table.c.medication_id.in_(ids))
+        written = self._db.execute(count).scalar_one()
+        self._db.commit()
+        return written
@@ -3,17 +3,68 @@ Repositorio concreto para ForecastRun y ForecastPoint.
 
 Centraliza todas las consultas de forecasting, desacoplando
 la lógica de acceso a datos del servicio de predicción.
+
+Los puntos de un run se guardan de dos formas: empaquetados en
+``ForecastRun.packed_points`` (runs nuevos, una sola fila) o como filas
+de ``forecast_points`` (runs anteriores).  ``get_run_points`` y
+``get_point_values_for_runs`` leen ambas de forma transparente.
 """
 
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
 
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func
 from sqlmodel import Session, select
 
 from src.models.forecast import ForecastPoint, ForecastRun
 from .base import BaseRepository
 
+_EPOCH = datetime(1970, 1, 1)
+_NS_PER_DAY = 86_400 * 10**9
+
+
+class PackedPoint(NamedTuple):
+    """Punto desempaquetado, con los mismos atributos que ForecastPoint."""
+
+    forecast_run_id: int
+    date: datetime
+    predicted_value: float
+    lower_ci: Optional[float]
+    upper_ci: Optional[float]
+
+
+def pack_points(dates, values, lower_ci, upper_ci) -> bytes:
+    """
+    Empaqueta los puntos de un run en un blob float32 little-endian de
+    forma (4, n): dia (desde 1970-01-01), valor, IC inferior e IC superior.
+
+    Las fechas se guardan a resolucion diaria (float32 representa los
+    enteros exactamente); un IC ausente se guarda como NaN.
+    """
+    days = pd.DatetimeIndex(dates).normalize().asi8 // _NS_PER_DAY
+    matrix = np.vstack([
+        days,
+        np.asarray(values, dtype=float),
+        np.asarray([np.nan if v is None else v for v in lower_ci], dtype=float),
+        np.asarray([np.nan if v is None else v for v in upper_ci], dtype=float),
+    ])
+    return matrix.astype("<f4").tobytes()
+
+
+def unpack_points(blob: bytes) -> Tuple[List[datetime], np.ndarray, np.ndarray, np.ndarray]:
+    """Inversa de ``pack_points``: ``(fechas, valores, ic_inferior, ic_superior)``."""
+    matrix = np.frombuffer(blob, dtype="<f4").reshape(4, -1).astype(float)
+    dates = [_EPOCH + timedelta(days=int(d)) for d in matrix[0]]
+    return dates, matrix[1], matrix[2], matrix[3]
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
 
 class ForecastRepository(BaseRepository[ForecastRun]):
     """
@@ -43,6 +94,50 @@ class ForecastRepository(BaseRepository[ForecastRun]):
             stmt = stmt.where(ForecastRun.model_type == model_type)
         return self._db.exec(stmt).first()
 
+    def get_latest_for_models(
+        self,
+        medication_id: int,
+        model_types: List[str],
+    ) -> Optional[ForecastRun]:
+        """Devuelve el ForecastRun más reciente cuyo modelo esté en ``model_types``."""
+        stmt = (
+            select(ForecastRun)
+            .where(
+                ForecastRun.medication_id == medication_id,
+                ForecastRun.model_type.in_(model_types),
+            )
+            .order_by(ForecastRun.created_at.desc())
+        )
+        return self._db.exec(stmt).first()
+
+    def get_cached_run(
+        self,
+        medication_id: int,
+        model_type: str,
+        horizon_days: int,
+        months_back: int,
+        series_hash: str,
+        since: datetime,
+    ) -> Optional[ForecastRun]:
+        """
+        Run más reciente con las mismas entradas creado después de ``since``
+        que cubre al menos ``horizon_days`` días ajustados.
+        """
+        fitted = func.coalesce(ForecastRun.fitted_horizon_days, ForecastRun.horizon_days)
+        stmt = (
+            select(ForecastRun)
+            .where(
+                ForecastRun.medication_id == medication_id,
+                ForecastRun.model_type == model_type,
+                fitted >= horizon_days,
+                ForecastRun.months_back == months_back,
+                ForecastRun.series_hash == series_hash,
+                ForecastRun.created_at >= since,
+            )
+            .order_by(ForecastRun.created_at.desc())
+        )
+        return self._db.exec(stmt).first()
+
     def get_history_for_medication(
         self,
         medication_id: int,
@@ -61,7 +156,7 @@ class ForecastRepository(BaseRepository[ForecastRun]):
         return list(self._db.exec(stmt).all())
 
     def get_points_for_run(self, run_id: int) -> List[ForecastPoint]:
-        """Devuelve los ForecastPoints ordenados por fecha para un run."""
+        """Devuelve las filas de ``forecast_points`` ordenadas por fecha para un run."""
         stmt = (
             select(ForecastPoint)
             .where(ForecastPoint.forecast_run_id == run_id)
@@ -69,22 +164,164 @@ class ForecastRepository(BaseRepository[ForecastRun]):
         )
         return list(self._db.exec(stmt).all())
 
+    def get_run_points(self, run: ForecastRun) -> List[Union[ForecastPoint, PackedPoint]]:
+        """
+        Puntos de un run ordenados por fecha, esten empaquetados o en filas.
+
+        Los puntos empaquetados se devuelven como ``PackedPoint`` (tuplas
+        con los atributos de ForecastPoint, sin coste de ORM).
+        """
+        if run.packed_points is None:
+            return self.get_points_for_run(run.id)
+        dates, values, lower, upper = unpack_points(run.packed_points)
+        return [
+            PackedPoint(run.id, date, float(value), _optional(low), _optional(up))
+            for date, value, low, up in zip(dates, values, lower, upper)
+        ]
+
+    def get_latest_runs_by_model(self, medication_ids: List[int]) -> List[ForecastRun]:
+        """Último ForecastRun de cada (medicamento, modelo) para ``medication_ids``."""
+        if not medication_ids:
+            return []
+        latest_ids = (
+            select(func.max(ForecastRun.id))
+            .where(ForecastRun.medication_id.in_(medication_ids))
+            .group_by(ForecastRun.medication_id, ForecastRun.model_type)
+        )
+        stmt = select(ForecastRun).where(ForecastRun.id.in_(latest_ids))
+        return list(self._db.exec(stmt).all())
+
+    def get_point_values_for_runs(self, runs: Sequence[ForecastRun]) -> List[Tuple[int, float, float, float]]:
+        """
+        ``(run_id, predicted_value, lower_ci, upper_ci)`` de varios runs,
+        agrupados por run y ordenados por fecha (sin materializar ORM).
+
+        Los runs empaquetados se desempaquetan en memoria; los demas se leen
+        de ``forecast_points`` en una sola consulta.
+        """
+        row_ids = [r.id for r in runs if r.packed_points is None]
+        rows: List[Tuple[int, float, float, float]] = []
+        if row_ids:
+            stmt = (
+                select(
+                    ForecastPoint.forecast_run_id,
+                    ForecastPoint.predicted_value,
+                    ForecastPoint.lower_ci,
+                    ForecastPoint.upper_ci,
+                )
+                .where(ForecastPoint.forecast_run_id.in_(row_ids))
+                .order_by(ForecastPoint.forecast_run_id, ForecastPoint.date)
+            )
+            rows = [tuple(row) for row in self._db.exec(stmt).all()]
+        for run in runs:
+            if run.packed_points is not None:
+                _, values, lower, upper = unpack_points(run.packed_points)
+                rows += [
+                    (run.id, float(v), _optional(lo), _optional(up))
+                    for v, lo, up in zip(values, lower, upper)
+                ]
+        return rows
+
     def save_run_with_points(
         self,
         run: ForecastRun,
         points: List[ForecastPoint],
+        before_commit: Optional[Callable[[ForecastRun], None]] = None,
     ) -> ForecastRun:
         """
         Persiste un ForecastRun junto con todos sus ForecastPoints
         en una única transacción.
+
+        Con ``run.packed_points`` (y sin ``points``) es un único INSERT.
+        ``before_commit(run)`` se llama con los INSERT ya enviados (flush)
+        y antes del commit; lo que cambie del run va en la misma transacción.
         """
         self._db.add(run)
         self._db.flush()  # obtener run.id antes de los puntos
-
-        for pt in points:
-            pt.forecast_run_id = run.id
-            self._db.add(pt)
+        if points:
+            for pt in points:
+                pt.forecast_run_id = run.id
+            self._db.add_all(points)
+            self._db.flush()
+        if before_commit is not None:
+            before_commit(run)
 
         self._db.commit()
         self._db.refresh(run)
         return run
+
+    # ── Mantenimiento ───────────────────────────────────────────────────────
+
+    def pack_row_points(self, batch_size: int = 500) -> int:
+        """
+        Migra un lote de runs con puntos en ``forecast_points`` al formato
+        empaquetado: escribe ``packed_points`` y borra sus filas, en una
+        transaccion por lote.
+
+        Returns
+        -------
+        int
+            Runs convertidos (0 cuando no quedan).
+        """
+        pending = (
+            select(ForecastPoint.forecast_run_id)
+            .join(ForecastRun, ForecastRun.id == ForecastPoint.forecast_run_id)
+            .where(ForecastRun.packed_points.is_(None))
+            .distinct()
+            .order_by(ForecastPoint.forecast_run_id)
+            .limit(batch_size)
+        )
+        run_ids = list(self._db.exec(pending).all())
+        if not run_ids:
+            return 0
+
+        stmt = (
+            select(
+                ForecastPoint.forecast_run_id, ForecastPoint.date,
+                ForecastPoint.predicted_value, ForecastPoint.lower_ci, ForecastPoint.upper_ci,
+            )
+            .where(ForecastPoint.forecast_run_id.in_(run_ids))
+            .order_by(ForecastPoint.forecast_run_id, ForecastPoint.date)
+        )
+        frame = pd.DataFrame(
+            self._db.exec(stmt).all(), columns=["run_id", "date", "value", "lower", "upper"]
+        )
+        runs = {r.id: r for r in self._db.exec(select(ForecastRun).where(ForecastRun.id.in_(run_ids))).all()}
+        for run_id, group in frame.groupby("run_id", sort=False):
+            run = runs[int(run_id)]
+            run.packed_points = pack_points(group["date"], group["value"], group["lower"], group["upper"])
+            self._db.add(run)
+        self._db.execute(delete(ForecastPoint).where(ForecastPoint.forecast_run_id.in_(run_ids)))
+        self._db.commit()
+        return len(run_ids)
+
+    def unpack_to_rows(self, batch_size: int = 500) -> int:
+        """
+        Inversa de ``pack_row_points`` para un lote: vuelve a escribir los
+        puntos empaquetados como filas de ``forecast_points`` (antes de
+        revertir la migracion que añade ``packed_points``).
+
+        Returns
+        -------
+        int
+            Runs convertidos (0 cuando no quedan).
+        """
+        stmt = (
+            select(ForecastRun)
+            .where(ForecastRun.packed_points.is_not(None))
+            .order_by(ForecastRun.id)
+            .limit(batch_size)
+        )
+        runs = list(self._db.exec(stmt).all())
+        for run in runs:
+            self._db.add_all([
+                ForecastPoint(
+                    forecast_run_id=pt.forecast_run_id, date=pt.date, predicted_value=pt.predicted_value,
+                    lower_ci=pt.lower_ci, upper_ci=pt.upper_ci,
+                )
+                for pt in self.get_run_points(run)
+            ])
+            run.packed_points = None
+            self._db.add(run)
+        self._db.commit()
+        return len(runs)
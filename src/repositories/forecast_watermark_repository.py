@@ -0,0 +1,115 @@
+"""
+Repositorio concreto para ForecastWatermark (seguimiento de cambios).
+
+El refresco programado del catálogo solo re-pronostica los medicamentos
+cuyos movimientos cambiaron desde el último forecast del lote, o cuyo
+último forecast es más antiguo que una edad máxima.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastWatermark
+from src.models.medication import Medication
+from .base import BaseRepository
+
+
+def _upsert(connection, rows: List[dict], columns: List[str]) -> None:
+    """INSERT ... ON CONFLICT (medication_id) DO UPDATE de ``columns``."""
+    table = ForecastWatermark.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["medication_id"],
+            set_={c: getattr(stmt.excluded, c) for c in columns},
+        )
+        connection.execute(stmt)
+        return
+
+    # Otros motores: UPDATE y luego INSERT de las filas que no existían
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(table.c.medication_id == row["medication_id"])
+            .values({c: row[c] for c in columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+
+class ForecastWatermarkRepository(BaseRepository[ForecastWatermark]):
+    """
+    Repositorio de marcas de cambio por medicamento.
+
+    La clave primaria es ``medication_id``: ``get(medication_id)``
+    devuelve la marca del medicamento.
+    """
+
+    def __init__(self, db: Session) -> None:
+        super().__init__(ForecastWatermark, db)
+
+    # ── Escritura ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def mark_changed(connection, medication_ids: Iterable[int], changed_at: datetime) -> None:
+        """
+        Marca medicamentos como modificados.
+
+        Recibe una conexión (no una sesión) porque se invoca desde el hook
+        ``after_flush`` de Movement, dentro de la transacción del cambio.
+        """
+        rows = [{"medication_id": m, "changed_at": changed_at} for m in sorted(set(medication_ids))]
+        if rows:
+            _upsert(connection, rows, ["changed_at"])
+
+    def mark_forecasted(
+        self,
+        medication_id: int,
+        forecasted_at: datetime,
+        forecast_run_id: Optional[int] = None,
+    ) -> None:
+        """
+        Registra que el lote consumió la serie del medicamento en ``forecasted_at``.
+
+        Debe ser el instante previo a leer la serie: un movimiento que
+        llegue durante el ajuste deja el medicamento sucio.
+        """
+        row = {
+            "medication_id": medication_id,
+            "forecasted_at": forecasted_at,
+            "forecast_run_id": forecast_run_id,
+        }
+        _upsert(self._db.connection(), [row], ["forecasted_at", "forecast_run_id"])
+        self._db.commit()
+
+    # ── Consultas específicas ───────────────────────────────────────────────
+
+    def get_refresh_candidates(self, stale_before: datetime) -> List[int]:
+        """
+        Medicamentos a re-pronosticar: sin marca o sin forecast previo,
+        con movimientos posteriores a su último forecast, o cuyo último
+        forecast es anterior a ``stale_before``.
+        """
+        wm = ForecastWatermark
+        stmt = (
+            select(Medication.id)
+            .outerjoin(wm, wm.medication_id == Medication.id)
+            .where(
+                or_(
+                    wm.medication_id.is_(None),
+                    wm.forecasted_at.is_(None),
+                    wm.changed_at > wm.forecasted_at,
+                    wm.forecasted_at < stale_before,
+                )
+            )
+            .order_by(Medication.id)
+        )
+        return list(self._db.exec(stmt).all())
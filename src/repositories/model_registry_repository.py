@@ -0,0 +1,137 @@
+"""
+Repositorio concreto para ForecastModelArtifact (registro de modelos).
+
+Los modelos ajustados se guardan en la BD como blobs joblib comprimidos,
+de modo que cualquier réplica de la API o worker de Celery reutiliza un
+ajuste hecho por otro nodo en lugar de repetirlo.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import Any, Optional
+
+import joblib
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastModelArtifact
+from .base import BaseRepository
+
+
+class ModelRegistryRepository(BaseRepository[ForecastModelArtifact]):
+    """
+    Repositorio del registro compartido de modelos.
+
+    La clave natural es (medication_id, model_type, series_hash), igual
+    que la de la cache local en disco.
+    """
+
+    def __init__(self, db: Session) -> None:
+        super().__init__(ForecastModelArtifact, db)
+
+    # ── Serialización ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def _dumps(obj: Any) -> bytes:
+        buffer = io.BytesIO()
+        joblib.dump(obj, buffer, compress=3)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _loads(blob: bytes) -> Any:
+        return joblib.load(io.BytesIO(blob))
+
+    # ── Consultas específicas ───────────────────────────────────────────────
+
+    def get_by_key(
+        self,
+        medication_id: int,
+        model_type: str,
+        series_hash: str,
+    ) -> Optional[ForecastModelArtifact]:
+        """Devuelve el artefacto para la clave exacta, o None."""
+        stmt = select(ForecastModelArtifact).where(
+            ForecastModelArtifact.medication_id == medication_id,
+            ForecastModelArtifact.model_type == model_type,
+            ForecastModelArtifact.series_hash == series_hash,
+        )
+        return self._db.exec(stmt).first()
+
+    def get_latest_hash(self, medication_id: int, model_type: str) -> Optional[str]:
+        """Hash de la serie del artefacto más reciente del medicamento (sin cargar el blob)."""
+        stmt = (
+            select(ForecastModelArtifact.series_hash)
+            .where(
+                ForecastModelArtifact.medication_id == medication_id,
+                ForecastModelArtifact.model_type == model_type,
+            )
+            .order_by(ForecastModelArtifact.created_at.desc(), ForecastModelArtifact.id.desc())
+        )
+        return self._db.exec(stmt).first()
+
+    def load(self, medication_id: int, model_type: str, series_hash: str) -> Optional[Any]:
+        """Deserializa el modelo para la clave, o None si no está registrado."""
+        row = self.get_by_key(medication_id, model_type, series_hash)
+        return self._loads(row.artifact) if row is not None else None
+
+    def save(
+        self,
+        medication_id: int,
+        model_type: str,
+        series_hash: str,
+        obj: Any,
+        parameters: Optional[dict] = None,
+        keep: Optional[int] = None,
+    ) -> ForecastModelArtifact:
+        """
+        Registra un modelo (idempotente por clave).
+
+        Si otro nodo registró la misma clave en paralelo, se conserva el
+        existente. Con ``keep`` se eliminan los artefactos más antiguos del
+        medicamento para ese modelo, dejando solo los ``keep`` más recientes.
+        """
+        existing = self.get_by_key(medication_id, model_type, series_hash)
+        blob = self._dumps(obj)
+        if existing is not None:
+            existing.artifact = blob
+            existing.size_bytes = len(blob)
+            existing.parameters = parameters or {}
+            entity = existing
+        else:
+            entity = ForecastModelArtifact(
+                medication_id=medication_id,
+                model_type=model_type,
+                series_hash=series_hash,
+                parameters=parameters or {},
+                artifact=blob,
+                size_bytes=len(blob),
+            )
+        self._db.add(entity)
+        try:
+            self._db.commit()
+        except IntegrityError:
+            self._db.rollback()
+            entity = self.get_by_key(medication_id, model_type, series_hash)
+        if keep is not None:
+            self.prune(medication_id, model_type, keep)
+        return entity
+
+    def prune(self, medication_id: int, model_type: str, keep: int) -> int:
+        """Elimina los artefactos más antiguos más allá de ``keep``; devuelve cuántos."""
+        stmt = (
+            select(ForecastModelArtifact.id)
+            .where(
+                ForecastModelArtifact.medication_id == medication_id,
+                ForecastModelArtifact.model_type == model_type,
+            )
+            .order_by(ForecastModelArtifact.created_at.desc(), ForecastModelArtifact.id.desc())
+            .offset(max(1, keep))
+        )
+        stale_ids = list(self._db.exec(stmt).all())
+        if stale_ids:
+            # DELETE directo: evita cargar los blobs solo para borrarlos
+            self._db.exec(delete(ForecastModelArtifact).where(ForecastModelArtifact.id.in_(stale_ids)))
+            self._db.commit()
+        return len(stale_ids)
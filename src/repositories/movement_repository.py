@@ -9,14 +9,130 @@ a los modelos de forecasting.
 from __future__ import annotations
 
 from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Iterable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 from sqlmodel import Session, select
 
-from src.models.movement import Movement, MovementType
+from src.models.movement import DailyConsumption, Movement
 from .base import BaseRepository
 
 
+def _spread_sparse_rows(
+    values: np.ndarray,
+    dates: pd.DatetimeIndex,
+    first: np.ndarray,
+    last: np.ndarray,
+) -> np.ndarray:
+    """
+    Redistribuye mensual -> diario las filas con granularidad mensual.
+
+    ``values`` es una matriz (series x dias consecutivos ``dates``) y
+    ``first``/``last`` las columnas del primer y ultimo dia con datos de
+    cada fila (-1 si no tiene).  Una fila se redistribuye si menos del 15%
+    de los dias de su tramo tienen datos: cada dia del tramo recibe
+    ``total del mes / dias del mes`` y los meses sin consumo quedan en 0.
+    """
+    cols = np.arange(values.shape[1])
+    in_span = (cols >= first[:, None]) & (cols <= last[:, None])
+
+    # Deteccion de granularidad mensual
+    nonzero_count = ((values > 0) & in_span).sum(axis=1)
+    nonzero_pct = nonzero_count / np.maximum(last - first + 1, 1)
+    sparse = np.flatnonzero((nonzero_pct < 0.15) & (nonzero_count >= 3))
+    if not len(sparse):
+        return values
+
+    month_end = dates + pd.offsets.MonthEnd(0)
+    month_start = np.flatnonzero(np.r_[True, month_end[1:] != month_end[:-1]])
+    month_code = np.cumsum(np.r_[True, month_end[1:] != month_end[:-1]]) - 1
+    monthly = np.add.reduceat(values[sparse], month_start, axis=1)
+    rates = np.where(monthly > 0, monthly / month_end[month_start].day.to_numpy(), 0.0)
+
+    sparse = sparse[(monthly > 0).any(axis=1)]
+    rates = rates[(monthly > 0).any(axis=1)]
+    out = values.copy()
+    out[sparse] = np.where(in_span[sparse], rates[:, month_code], 0.0)
+    return out
+
+
+def _spread_sparse_months(series: pd.Series) -> pd.Series:
+    """``_spread_sparse_rows`` para una serie diaria continua."""
+    values = _spread_sparse_rows(
+        series.to_numpy(dtype=float)[None, :], series.index, np.array([0]), np.array([len(series) - 1])
+    )
+    return pd.Series(values[0], index=series.index, name=series.name)
+
+
+class ConsumptionMatrix:
+    """
+    Consumo diario de varios medicamentos sobre un mismo eje de dias.
+
+    Attributes
+    ----------
+    medication_ids : np.ndarray
+        Id de medicamento de cada fila (orden ascendente).
+    dates : pd.DatetimeIndex
+        Dias consecutivos de la ventana (columnas).
+    values : np.ndarray
+        Matriz ``len(medication_ids) x len(dates)`` ya redistribuida.
+    first, last : np.ndarray
+        Columna del primer y ultimo dia con salidas de cada fila (-1 si
+        el medicamento no tiene consumo en la ventana).
+    """
+
+    def __init__(self, medication_ids, dates, values, first, last) -> None:
+        self.medication_ids = medication_ids
+        self.dates = dates
+        self.values = values
+        self.first = first
+        self.last = last
+        self._rows = {int(m): i for i, m in enumerate(medication_ids)}
+
+    def __len__(self) -> int:
+        return len(self.medication_ids)
+
+    def series(self, medication_id: int) -> pd.Series:
+        """
+        Serie diaria de un medicamento, recortada a su tramo con datos
+        (identica a ``get_consumption_series(..., freq="D")``).
+        """
+        row = self._rows[medication_id]
+        if self.first[row] < 0:
+            return pd.Series(dtype=float)
+        span = slice(self.first[row], self.last[row] + 1)
+        return pd.Series(self.values[row, span], index=self.dates[span], name="quantity")
+
+
+def _with_empty_rows(requested, grouped):
+    """Recorre ``requested`` (ordenado) con las filas de cada id, o [] si no tiene."""
+    current = next(grouped, None)
+    for med_id in requested:
+        if current is not None and current[0] == med_id:
+            yield med_id, list(current[1])
+            current = next(grouped, None)
+        else:
+            yield med_id, []
+
+
+def _build_matrix(chunk, dates: pd.DatetimeIndex) -> ConsumptionMatrix:
+    """Matriz densa de un bloque ``[(medication_id, [(id, dia, total), ...]), ...]``."""
+    origin = dates[0].date()
+    values = np.zeros((len(chunk), len(dates)))
+    first = np.full(len(chunk), -1)
+    last = np.full(len(chunk), -1)
+    for i, (_, rows) in enumerate(chunk):
+        if not rows:
+            continue
+        cols = np.fromiter(((r[1] - origin).days for r in rows), dtype=np.int64, count=len(rows))
+        values[i, cols] = np.fromiter((r[2] for r in rows), dtype=float, count=len(rows))
+        first[i], last[i] = cols[0], cols[-1]
+    ids = np.fromiter((med_id for med_id, _ in chunk), dtype=np.int64, count=len(chunk))
+    return ConsumptionMatrix(ids, dates, _spread_sparse_rows(values, dates, first, last), first, last)
+
+
 class MovementRepository(BaseRepository[Movement]):
     """
     Repositorio de movimientos de inventario.
@@ -24,6 +140,8 @@ class MovementRepository(BaseRepository[Movement]):
     Provee operaciones CRUD estandar (heredadas) y la consulta
     especializada get_consumption_series que agrega los movimientos
     OUT en una serie de tiempo diaria, requerida por ARIMA y Prophet.
+    Para lotes, iter_consumption_matrices/get_consumption_matrix cargan
+    muchos medicamentos con una sola consulta.
     """
 
     def __init__(self, db: Session) -> None:
@@ -57,57 +175,124 @@ class MovementRepository(BaseRepository[Movement]):
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=30 * months_back)
 
-        stmt = select(Movement).where(
-            Movement.medication_id == medication_id,
-            Movement.type == MovementType.OUT,
-            Movement.date >= start_date,
-            Movement.date <= end_date,
+        # Rollup diario (DailyConsumption): solo viaja (dia, total) por dia con salidas
+        dc = DailyConsumption
+        stmt = (
+            select(dc.day, dc.out_quantity)
+            .where(
+                dc.medication_id == medication_id,
+                dc.out_quantity > 0,
+                dc.day >= start_date.date(),
+                dc.day <= end_date.date(),
+            )
+            .order_by(dc.day)
         )
-        movements = self._db.exec(stmt).all()
+        rows = self._db.exec(stmt).all()
 
-        if not movements:
+        if not rows:
             return pd.Series(dtype=float)
 
-        df = pd.DataFrame(
-            [{"date": m.date.date(), "quantity": m.quantity} for m in movements]
+        days, totals = zip(*rows)
+        series = pd.Series(
+            np.asarray(totals, dtype=float), index=pd.DatetimeIndex(pd.to_datetime(days)), name="quantity"
         )
-        df["date"] = pd.to_datetime(df["date"])
-        series = df.groupby("date")["quantity"].sum()
-
         full_idx = pd.date_range(
-            start=series.index.min(), end=series.index.max(), freq="D"
+            start=series.index[0], end=series.index[-1], freq="D"
         )
-        series = series.reindex(full_idx, fill_value=0.0)
-
-        # Deteccion de granularidad mensual
-        # Si menos del 15% de dias tienen datos, redistribuir mensual -> diario
-        nonzero_count = int((series > 0).sum())
-        nonzero_pct = nonzero_count / max(len(series), 1)
-
-        if nonzero_pct < 0.15 and nonzero_count >= 3:
-            monthly = series.resample("ME").sum()
-            dates_list = []
-            rates_list = []
-            for month_end, total in monthly.items():
-                if total <= 0:
-                    continue
-                month_start = month_end.replace(day=1)
-                days_in_month = month_end.day
-                daily_rate = total / days_in_month
-                for d in range(days_in_month):
-                    day = month_start + pd.Timedelta(days=d)
-                    if series.index.min() <= day <= series.index.max():
-                        dates_list.append(day)
-                        rates_list.append(daily_rate)
-            if dates_list:
-                smooth = pd.Series(rates_list, index=pd.DatetimeIndex(dates_list))
-                series = smooth.reindex(full_idx, fill_value=0.0)
+        series = _spread_sparse_months(series.reindex(full_idx, fill_value=0.0))
 
         if freq != "D":
             series = series.resample(freq).sum()
 
         return series
 
+    def iter_consumption_matrices(
+        self,
+        medication_ids: Optional[Iterable[int]] = None,
+        months_back: int = 24,
+        chunk_size: int = 500,
+    ) -> Iterator[ConsumptionMatrix]:
+        """
+        Consumo diario de muchos medicamentos en bloques de ``chunk_size``.
+
+        Una unica consulta agrupada por (medicamento, dia), ordenada por
+        medicamento y leida en streaming: la memoria es la de un bloque,
+        no la del catalogo.  Aplica la misma redistribucion mensual que
+        ``get_consumption_series``.
+
+        Parameters
+        ----------
+        medication_ids : iterable of int, optional
+            Medicamentos a cargar (None = todos los que tienen salidas).
+            Los que no tengan consumo aparecen como filas vacias.
+        months_back : int
+        chunk_size : int
+            Medicamentos por bloque.
+
+        Yields
+        ------
+        ConsumptionMatrix
+        """
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=30 * months_back)
+        dates = pd.date_range(start=start_date.date(), end=end_date.date(), freq="D")
+
+        dc = DailyConsumption
+        stmt = (
+            select(dc.medication_id, dc.day, dc.out_quantity)
+            .where(
+                dc.out_quantity > 0,
+                dc.day >= start_date.date(),
+                dc.day <= end_date.date(),
+            )
+            .order_by(dc.medication_id, dc.day)
+            .execution_options(yield_per=10_000)
+        )
+        requested = None
+        if medication_ids is not None:
+            requested = sorted(set(medication_ids))
+            if not requested:
+                return
+            stmt = stmt.where(dc.medication_id.in_(requested))
+
+        grouped = groupby(self._db.exec(stmt), key=lambda row: row[0])
+        if requested is None:
+            per_medication = ((med_id, list(rows)) for med_id, rows in grouped)
+        else:
+            per_medication = _with_empty_rows(requested, grouped)
+
+        chunk = []
+        for item in per_medication:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield _build_matrix(chunk, dates)
+                chunk = []
+        if chunk:
+            yield _build_matrix(chunk, dates)
+
+    def get_consumption_matrix(
+        self,
+        medication_ids: Optional[Iterable[int]] = None,
+        months_back: int = 24,
+        chunk_size: int = 500,
+    ) -> Optional[ConsumptionMatrix]:
+        """
+        ``iter_consumption_matrices`` en una sola matriz (None si no hay
+        medicamentos).
+        """
+        chunks = list(self.iter_consumption_matrices(medication_ids, months_back, chunk_size))
+        if not chunks:
+            return None
+        if len(chunks) == 1:
+            return chunks[0]
+        return ConsumptionMatrix(
+            np.concatenate([c.medication_ids for c in chunks]),
+            chunks[0].dates,
+            np.vstack([c.values for c in chunks]),
+            np.concatenate([c.first for c in chunks]),
+            np.concatenate([c.last for c in chunks]),
+        )
+
     def get_recent_movements(
         self,
         medication_id: int,
@@ -0,0 +1,218 @@
+"""
+Seleccion escalonada de modelo ("auto").
+
+Pedir siempre ``ensemble`` paga ARIMA y Prophet en cada medicamento,
+aunque la mayoria del catalogo se pronostica igual de bien con un modelo
+ligero.  ``run_auto_forecast`` perfila la serie y sube de nivel solo
+cuando hace falta:
+
+1. Perfil: ADI (intervalo medio entre demandas), CV^2 de los tamanos de
+   demanda no nulos (cuadrantes de Syntetos-Boylan), longitud y fuerza
+   de la estacionalidad semanal.
+2. Nivel ligero: SBA para demanda intermitente/lumpy, Holt-Winters para
+   demanda regular y naive estacional para series cortas con patron semanal.
+3. Escalado: si el WMAPE walk-forward supera TARGET_WMAPE (15%), se
+   prueba ARIMA y, si la serie es regular y suficientemente larga, el
+   ensemble.  Se devuelve el primer modelo que cumple el objetivo o, si
+   ninguno lo cumple, el de menor WMAPE.  Un modelo sin folds walk-forward
+   (serie corta) no cuenta como validado: se sigue escalando y, si ninguno
+   se valida, se elige el mas barato indicandolo en ``reason``.
+
+El nivel elegido, el motivo y los intentos quedan en ``parameters``.
+"""
+
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+SEASON_LENGTH = 7
+
+# Umbrales de Syntetos-Boylan para clasificar la demanda
+_ADI_CUTOFF = 1.32
+_CV2_CUTOFF = 0.49
+
+_SEASONAL_STRENGTH_MIN = 0.3
+_SHORT_SERIES_DAYS = 56     # menos de 8 semanas: Holt-Winters no se estabiliza
+_ENSEMBLE_MIN_DAYS = 90     # Prophet cross_validation necesita al menos 90 dias
+
+
+# ---------------------------------------------------------------------------
+# 1. Perfil de la serie
+# ---------------------------------------------------------------------------
+
+def _seasonal_strength(y, m=SEASON_LENGTH):
+    """
+    Fuerza de la estacionalidad (Hyndman): max(0, 1 - Var(R) / Var(S + R)).
+
+    Tendencia = media movil centrada de m dias; estacionalidad = media por
+    dia de la semana de la serie sin tendencia.
+    """
+    half = m // 2
+    if len(y) < 2 * m + 2 * half:
+        return 0.0
+    trend = np.convolve(y, np.ones(m) / m, mode="valid")
+    detrended = y[half:len(y) - half] - trend
+    phase = np.arange(half, len(y) - half) % m
+    profile = np.bincount(phase, weights=detrended, minlength=m) / np.bincount(phase, minlength=m)
+    remainder = detrended - (profile - profile.mean())[phase]
+    total_var = np.var(detrended)
+    if total_var <= 0:
+        return 0.0
+    return float(max(0.0, 1 - np.var(remainder) / total_var))
+
+
+def classify_series(series):
+    """
+    Perfil de demanda de una serie diaria.
+
+    Returns
+    -------
+    dict
+        ``n_days``, ``adi``, ``cv2``, ``seasonal_strength`` y ``pattern``
+        (``smooth`` | ``intermittent`` | ``erratic`` | ``lumpy``).
+    """
+    y = np.nan_to_num(np.asarray(series, dtype=float))
+    sizes = y[y > 0]
+    adi = len(y) / len(sizes) if len(sizes) else float(len(y))
+    cv2 = float((sizes.std() / sizes.mean()) ** 2) if len(sizes) > 1 else 0.0
+
+    intermittent = adi >= _ADI_CUTOFF
+    erratic = cv2 >= _CV2_CUTOFF
+    if intermittent:
+        pattern = "lumpy" if erratic else "intermittent"
+    else:
+        pattern = "erratic" if erratic else "smooth"
+
+    return {
+        "n_days": int(len(y)),
+        "adi": round(float(adi), 3),
+        "cv2": round(cv2, 3),
+        "seasonal_strength": round(_seasonal_strength(y), 3),
+        "pattern": pattern,
+    }
+
+
+def _ladder(profile):
+    """
+    Modelos a probar en orden y motivo del modelo inicial.
+
+    Returns
+    -------
+    (list[str], str)
+    """
+    seasonal = profile["seasonal_strength"] >= _SEASONAL_STRENGTH_MIN
+    regular = profile["pattern"] in ("smooth", "erratic")
+
+    if not regular:
+        cheap, why = "sba", f"demanda {profile['pattern']} (ADI={profile['adi']}, CV2={profile['cv2']})"
+    elif profile["n_days"] < _SHORT_SERIES_DAYS and seasonal:
+        cheap, why = "seasonal_naive", f"serie corta ({profile['n_days']} dias) con patron semanal"
+    else:
+        cheap, why = "holt_winters", (
+            f"demanda {profile['pattern']} "
+            f"(estacionalidad semanal={profile['seasonal_strength']})"
+        )
+
+    ladder = [cheap, "arima"]
+    # ARIMA/Prophet no aportan sobre demanda intermitente: el ensemble solo para series regulares
+    if regular and profile["n_days"] >= _ENSEMBLE_MIN_DAYS:
+        ladder.append("ensemble")
+    return ladder, why
+
+
+# ---------------------------------------------------------------------------
+# 2. Modelo "auto"
+# ---------------------------------------------------------------------------
+
+def run_auto_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """
+    Elige el modelo mas barato que cumple el objetivo de WMAPE.
+
+    Returns
+    -------
+    dict
+        Resultado del modelo elegido (mismo formato que ARIMA) con
+        ``model_type="auto"`` y en ``parameters``: ``selected_model``,
+        ``tier`` (0 = ligero, 1 = ARIMA, 2 = ensemble), ``reason``,
+        ``profile``, ``attempts`` y ``members`` (parametros del modelo elegido).
+    """
+    from src.core.factory import ForecastModelFactory
+    from src.services.forecast_service import TARGET_WMAPE, get_consumption_series
+
+    series = get_consumption_series(db, medication_id, months_back=months_back, freq="D")
+    profile = classify_series(series.values)
+    ladder, why = _ladder(profile)
+
+    attempts = []
+    results = {}
+    for tier, model_type in enumerate(ladder):
+        fn = ForecastModelFactory.create(model_type)
+        try:
+            result = fn(db, medication_id, horizon_days, months_back)
+        except Exception as e:
+            if tier == 0:
+                raise
+            # Un modelo pesado no disponible (cmdstan, pmdarima...) no impide devolver el ligero
+            logger.warning("Auto: %s fallo para medicamento %s - %s", model_type, medication_id, e)
+            attempts.append({"model": model_type, "error": str(e)})
+            continue
+
+        results[model_type] = (tier, result)
+        if result["metrics"].get("n_folds") == 0:
+            # Sin folds walk-forward (serie corta o folds fallidos): su 0.0 no es un WMAPE
+            attempts.append({"model": model_type, "wmape": None})
+            continue
+        wmape = float(result["metrics"].get("mape", 0.0))
+        attempts.append({"model": model_type, "wmape": round(wmape, 2)})
+        if wmape <= TARGET_WMAPE:
+            break
+
+    validated = [a for a in attempts if a.get("wmape") is not None]
+    met = [a for a in validated if a["wmape"] <= TARGET_WMAPE]
+    if met:
+        chosen = met[0]
+    elif validated:
+        chosen = min(validated, key=lambda a: a["wmape"])
+    else:
+        chosen = next(a for a in attempts if "wmape" in a)  # el mas barato que se ajusto
+    tier, result = results[chosen["model"]]
+
+    if len(attempts) == 1 and met:
+        reason = f"{why}; {chosen['model']} WMAPE {chosen['wmape']}% <= {TARGET_WMAPE}%"
+    else:
+        tried = ", ".join(
+            f"{a['model']} fallo" if "wmape" not in a
+            else f"{a['model']} sin validar" if a["wmape"] is None
+            else f"{a['model']} {a['wmape']}%"
+            for a in attempts
+        )
+        if met:
+            verdict = "cumple el objetivo"
+        elif validated:
+            verdict = f"ninguno cumple {TARGET_WMAPE}%, se elige el menor"
+        else:
+            verdict = "sin validacion walk-forward, se elige el mas barato"
+        reason = f"{why}; escalado ({tried}): {verdict}"
+
+    # Las etapas del modelo elegido ya se suman a la traza de "auto"
+    params = {k: v for k, v in result["parameters"].items() if k != "timings"}
+    members = params.get("members") if chosen["model"] == "ensemble" else {chosen["model"]: params}
+
+    return {
+        **result,
+        "model_type": "auto",
+        "parameters": {
+            "selected_model": chosen["model"],
+            "tier": tier,
+            "reason": reason,
+            "profile": profile,
+            "attempts": attempts,
+            "target_wmape": TARGET_WMAPE,
+            "members": members,
+        },
+    }
@@ -6,6 +6,7 @@ import logging
 from src.models.delivery import Delivery, DeliveryCreate, DeliveryUpdate, DeliveryStatus
 from src.models.supplier import Supplier
 from src.exceptions import DeliveryNotFoundError, SupplierNotFoundError
+from src.services.forecast_service import on_stock_change
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +65,10 @@ def update_delivery(db: Session, delivery_id: int, data: DeliveryUpdate) -> Deli
     except Exception:
         db.rollback()
         raise
+
+    if new_status == DeliveryStatus.RECEIVED and delivery.medication_id:
+        # Recepción de mercancía: alertas de forecast al día sin reajustar modelos
+        on_stock_change(db, [delivery.medication_id])
     return get_delivery_by_id(db, delivery.id)
 
 
@@ -0,0 +1,190 @@
+"""
+Motor de forecasting por lotes para todo el catálogo.
+
+Cada medicamento es una unidad de trabajo independiente: se abre su propia
+sesión, se ejecuta el modelo del ForecastModelFactory, se persiste el run
+y se devuelve un estado serializable.  La misma unidad alimenta dos
+estrategias de fan-out:
+
+- Celery (``src.tasks.tasks``): un chord con una tarea por medicamento y
+  un paso final de agregación que envía las alertas.
+- Pool de procesos local (``run_batch_local``), usado por los scripts.
+
+El refresco programado no recorre todo el catálogo: ``medications_to_refresh``
+selecciona los medicamentos con movimientos nuevos desde su último forecast
+(ForecastWatermark) o cuyo forecast supera FORECAST_REFRESH_MAX_AGE_HOURS.
+
+Formato del estado por medicamento
+----------------------------------
+    {"medication_id": 12, "status": "success", "run_id": 345,
+     "risk_level": "high", "mape": 11.2}
+    {"medication_id": 13, "status": "failed", "error": "Datos insuficientes..."}
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Horas tras las que un medicamento se re-pronostica aunque no tenga movimientos nuevos
+_REFRESH_MAX_AGE_HOURS = float(os.environ.get("FORECAST_REFRESH_MAX_AGE_HOURS", "168"))
+
+
+def _init_worker() -> None:
+    """
+    Inicializador de cada proceso del pool local.
+
+    Los procesos creados con fork heredan el connection pool del padre;
+    compartir sockets entre procesos corrompe las conexiones, así que se
+    descartan (sin cerrarlas) y cada worker abre las suyas.
+
+    El lote ya ocupa todos los núcleos con un medicamento por proceso, por
+    lo que los folds walk-forward y la cross_validation de Prophet se
+    ejecutan secuencialmente dentro de cada uno.
+    """
+    os.environ["FORECAST_WF_N_JOBS"] = "1"
+    os.environ["FORECAST_PROPHET_CV_PARALLEL"] = "none"
+
+    from src.core.database import engine
+    engine.dispose(close=False)
+
+
+def forecast_medication(
+    medication_id: int,
+    model_type: str = "ensemble",
+    horizon_days: int = 30,
+    months_back: int = 24,
+) -> dict:
+    """
+    Ejecuta y persiste el forecast de un medicamento con sesión propia.
+
+    Nunca lanza excepciones: los errores se reportan en el estado para que
+    un medicamento con datos insuficientes no aborte el lote.
+    """
+    from src.core.database import SessionLocal
+    from src.core.factory import ForecastModelFactory
+    from src.services.forecast_service import fit_horizon, save_forecast, series_fingerprint
+
+    db = SessionLocal()
+    # Antes de leer la serie: un movimiento que llegue durante el ajuste la deja sucia
+    started = datetime.utcnow()
+    try:
+        fn = ForecastModelFactory.create(model_type)
+        # Los runs del lote quedan con la clave de la cache de resultados
+        series_hash = series_fingerprint(db, medication_id, months_back)
+        result = fn(db, medication_id, fit_horizon(horizon_days), months_back)
+        run = save_forecast(
+            db, medication_id, result,
+            months_back=months_back, series_hash=series_hash, horizon_days=horizon_days,
+        )
+        _mark_forecasted(db, medication_id, started, run.id)
+        return {
+            "medication_id": medication_id,
+            "status": "success",
+            "run_id": run.id,
+            "risk_level": run.alert_level,
+            "mape": result.get("metrics", {}).get("mape"),
+        }
+    except Exception as e:
+        db.rollback()
+        logger.warning("Batch: forecast fallo para medicamento %s: %s", medication_id, e)
+        if isinstance(e, ValueError):
+            # Datos insuficientes: con la misma serie volvería a fallar
+            _mark_forecasted(db, medication_id, started)
+        return {"medication_id": medication_id, "status": "failed", "error": str(e)}
+    finally:
+        db.close()
+
+
+def _mark_forecasted(db, medication_id: int, started: datetime, run_id: Optional[int] = None) -> None:
+    from src.repositories import ForecastWatermarkRepository
+
+    try:
+        ForecastWatermarkRepository(db).mark_forecasted(medication_id, started, run_id)
+    except Exception as e:
+        # Sin marca el medicamento se repite en el próximo refresco: no es un fallo del lote
+        db.rollback()
+        logger.warning("Batch: no se pudo registrar la marca de %s: %s", medication_id, e)
+
+
+def medications_to_refresh(db, max_age_hours: Optional[float] = None) -> List[int]:
+    """
+    Medicamentos que el refresco programado debe re-pronosticar.
+
+    Incluye los que tienen movimientos nuevos (insertados, modificados o
+    borrados) desde su último forecast del lote, los que nunca se
+    pronosticaron y aquellos cuyo último forecast tiene más de
+    ``max_age_hours`` (por defecto FORECAST_REFRESH_MAX_AGE_HOURS): la
+    ventana de historia y el inicio del horizonte avanzan aunque no haya
+    movimientos nuevos.
+    """
+    from src.repositories import ForecastWatermarkRepository
+
+    hours = _REFRESH_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    stale_before = datetime.utcnow() - timedelta(hours=hours)
+    return ForecastWatermarkRepository(db).get_refresh_candidates(stale_before)
+
+
+def run_batch_local(
+    medication_ids: Iterable[int],
+    model_type: str = "ensemble",
+    horizon_days: int = 30,
+    months_back: int = 24,
+    max_workers: Optional[int] = None,
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> List[dict]:
+    """
+    Fan-out del lote en un pool de procesos local.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Procesos a usar (por defecto, todos los núcleos disponibles).
+    on_result : callable, optional
+        Se invoca con cada estado a medida que termina (progreso en scripts).
+
+    Returns
+    -------
+    list[dict]
+        Estados por medicamento, en orden de finalización.
+    """
+    ids = list(medication_ids)
+    workers = max_workers or os.cpu_count() or 1
+    results: List[dict] = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(forecast_medication, med_id, model_type, horizon_days, months_back): med_id
+            for med_id in ids
+        }
+        for future in as_completed(futures):
+            try:
+                status = future.result()
+            except Exception as e:
+                # Solo ocurre si el proceso worker murió (el trabajo captura sus errores)
+                status = {"medication_id": futures[future], "status": "failed", "error": str(e)}
+            results.append(status)
+            if on_result is not None:
+                on_result(status)
+
+    return results
+
+
+def summarize_batch(results: List[dict]) -> dict:
+    """Resumen agregado de un lote: totales y conteo por nivel de riesgo."""
+    ok = [r for r in results if r.get("status") == "success"]
+    by_level: dict = {}
+    for r in ok:
+        level = r.get("risk_level") or "unknown"
+        by_level[level] = by_level.get(level, 0) + 1
+    return {
+        "total": len(results),
+        "success": len(ok),
+        "failed": len(results) - len(ok),
+        "by_risk_level": by_level,
+    }
@@ -0,0 +1,92 @@
+"""
+Ejecución de forecasts pedidos por la API.
+
+Une las piezas que comparten los endpoints síncronos
+(``POST /forecasts/{id}`` y ``GET /predictions/predict/``):
+
+1. Cache de resultados (``get_cached_forecast``): mismas entradas recientes
+   -> se reutiliza el run.
+2. Single-flight (``forecast_single_flight``): peticiones concurrentes con
+   la misma clave comparten un único ajuste; los seguidores reciben el
+   ``run_id`` del líder y lo cargan de la BD.
+3. Ajuste en el pool de procesos (``forecast_executor``) y persistencia.
+
+El modelo se ajusta siempre hasta ``fit_horizon(horizon_days)`` (el
+horizonte maximo configurado): cambiar de horizonte en la UI recorta el
+run guardado en lugar de reajustar.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Tuple
+
+from src.core.forecast_executor import forecast_executor
+from src.core.single_flight import forecast_single_flight
+from src.services.forecast_service import (
+    fit_horizon,
+    get_cached_forecast,
+    load_run_forecast,
+    run_risk,
+    save_forecast,
+    slice_forecast,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def compute_forecast(
+    db,
+    medication_id: int,
+    model_type: str,
+    horizon_days: int,
+    months_back: int,
+) -> Tuple[object, dict, str]:
+    """
+    Devuelve el forecast pedido reutilizando trabajo siempre que se pueda.
+
+    Returns
+    -------
+    (ForecastRun, dict, str)
+        Run persistido, datos con el formato de resultado de los modelos
+        recortados a ``horizon_days`` (mas ``risk``, el riesgo de ese
+        horizonte) y origen: ``"computed"`` (esta petición ajustó el modelo), ``"shared"``
+        (lo ajustó una petición concurrente) o ``"cached"`` (run reciente).
+
+    Raises
+    ------
+    ForecastQueueFullError
+        Si el pool de forecasting está saturado.
+    ValueError
+        Datos insuficientes para el modelo.
+    """
+    try:
+        run, result, series_hash = get_cached_forecast(db, medication_id, model_type, horizon_days, months_back)
+    except Exception as e:
+        logger.warning("Cache de resultados no disponible: %s", str(e))
+        db.rollback()
+        run, result, series_hash = None, None, None
+    if run is not None:
+        return run, result, "cached"
+
+    fitted = fit_horizon(horizon_days)
+    leader = {}
+
+    async def _compute() -> int:
+        data = await forecast_executor.run_model(model_type, medication_id, fitted, months_back)
+        new_run = save_forecast(
+            db, medication_id, data,
+            months_back=months_back, series_hash=series_hash, horizon_days=horizon_days,
+        )
+        leader.update(run=new_run, result=data)
+        return new_run.id
+
+    # Peticiones con distinto horizonte comparten el mismo ajuste
+    key = f"{medication_id}:{model_type}:{fitted}:{months_back}:{series_hash}"
+    run_id, shared = await forecast_single_flight.run(key, _compute)
+    if not shared and leader:
+        run = leader["run"]
+        return run, {**slice_forecast(leader["result"], horizon_days), "risk": run_risk(run)}, "computed"
+
+    run, result = load_run_forecast(db, run_id, horizon_days)
+    return run, result, "shared"
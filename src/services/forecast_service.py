@@ -8,8 +8,27 @@ Mejoras academicas implementadas
 1. Validacion Walk-forward (expanding window, 5 folds) reemplaza holdout estatico.
 2. Probabilidad estadistica de desabastecimiento via scipy.stats.norm desde IC 95%.
 3. Diagnostico Prophet: cross_validation() + performance_metrics() oficiales.
-4. Persistencia de modelos con joblib (clave = hash MD5 de la serie).
+4. Persistencia de modelos con joblib (clave = hash MD5 de la serie), en una
+   cache local acotada (src.core.model_cache) respaldada por un registro
+   compartido en BD (ForecastModelArtifact) comun a todos los nodos.
 5. Patron Repository: MovementRepository y ForecastRepository encapsulan la BD.
+6. Folds walk-forward ajustados en paralelo (joblib/loky, FORECAST_WF_N_JOBS).
+7. Warm-start de auto_arima desde el orden del ultimo run del medicamento.
+8. Actualizacion incremental ARIMA (pmdarima update()) cuando solo se agregan dias.
+9. Miembros del ensemble ejecutados en paralelo con timeout por miembro.
+10. Prophet se ajusta una sola vez: el mismo modelo sirve para el diagnostico,
+    la prediccion y la cache (FORECAST_PROPHET_CV_PARALLEL para la CV).
+11. Modelos ligeros vectorizados (lightweight_forecast_service) y seleccion
+    escalonada "auto" (auto_forecast_service) contra TARGET_WMAPE.
+12. Cache de resultados: un run con las mismas entradas (serie, modelo,
+    horizonte) se reutiliza durante FORECAST_RESULT_CACHE_TTL segundos.
+13. Se ajusta una vez hasta FORECAST_MAX_HORIZON dias y los horizontes
+    menores se sirven recortando los puntos guardados (el riesgo se
+    recalcula para el recorte).
+14. Riesgo recalculado tras cambios de stock (pedidos y entregas recibidos,
+    ajustes manuales) sobre los puntos guardados, sin reajustar modelos.
+15. Tiempos por etapa (src.core.tracing) en parameters["timings"] de cada run
+    y agregados en get_timing_metrics.
 """
 
 from __future__ import annotations
@@ -17,22 +36,86 @@ from __future__ import annotations
 import hashlib
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
+from typing import Optional
 
-import joblib
+from joblib import Parallel, delayed
 import numpy as np
 import pandas as pd
 from scipy.stats import norm
 from sqlmodel import Session, select
 
+from src.core.config import settings
+from src.core.model_cache import model_cache
+from src.core.tracing import cache_flag, span
 from src.models.forecast import ForecastPoint, ForecastRun
 from src.models.medication import Medication
-from src.repositories import ForecastRepository, MovementRepository
+from src.repositories import ForecastRepository, ModelRegistryRepository, MovementRepository
+from src.repositories.forecast_repository import pack_points
 
 logger = logging.getLogger(__name__)
 
-_MODEL_CACHE_DIR = os.environ.get("FORECAST_CACHE_DIR", "/tmp/forecast_models")
-os.makedirs(_MODEL_CACHE_DIR, exist_ok=True)
+
+# Objetivo de precision del motor (WMAPE walk-forward, %)
+TARGET_WMAPE = 15.0
+
+# Registro compartido de modelos en BD (ademas de la cache local por host)
+_MODEL_REGISTRY = os.environ.get("FORECAST_MODEL_REGISTRY", "1") == "1"
+
+# Warm-start ARIMA: buscar alrededor del orden previo y, cada N runs, busqueda completa
+_ARIMA_WARM_START = os.environ.get("FORECAST_ARIMA_WARM_START", "1") == "1"
+_ARIMA_FULL_SEARCH_EVERY = int(os.environ.get("FORECAST_ARIMA_FULL_SEARCH_EVERY", "7"))
+
+# Actualizacion incremental ARIMA: refit completo tras N updates o si el error deriva
+_ARIMA_MAX_UPDATES = int(os.environ.get("FORECAST_ARIMA_MAX_UPDATES", "30"))
+_ARIMA_DRIFT_RATIO = float(os.environ.get("FORECAST_ARIMA_DRIFT_RATIO", "1.5"))
+_ARIMA_TAIL_DAYS = 28
+
+# Cache de resultados: segundos durante los que un run con las mismas entradas se reutiliza (0 = off)
+_RESULT_CACHE_TTL = int(os.environ.get("FORECAST_RESULT_CACHE_TTL", "21600"))
+
+# Horizonte que se ajusta y persiste siempre; los menores se sirven recortando
+_MAX_HORIZON = int(os.environ.get("FORECAST_MAX_HORIZON", "180"))
+
+# Puntos del run empaquetados en ForecastRun.packed_points (0 = una fila por dia en forecast_points)
+_PACKED_POINTS = os.environ.get("FORECAST_PACKED_POINTS", "1") == "1"
+
+# Ensemble: segundos maximos por miembro; si Prophet se excede se usa solo ARIMA
+_ENSEMBLE_MEMBER_TIMEOUT = float(os.environ.get("FORECAST_ENSEMBLE_MEMBER_TIMEOUT", "300"))
+
+
+def fit_horizon(horizon_days):
+    """Horizonte a ajustar para poder servir ``horizon_days`` y cualquier horizonte menor."""
+    return max(int(horizon_days), _MAX_HORIZON)
+
+
+# Folds secuenciales forzados en este contexto (miembros concurrentes del ensemble)
+_wf_sequential: ContextVar[bool] = ContextVar("wf_sequential", default=False)
+
+# Evento que el ensemble activa cuando el miembro en curso excede su timeout
+_member_cancel: ContextVar[Optional[threading.Event]] = ContextVar("ensemble_member_cancel", default=None)
+
+
+def _wf_n_jobs():
+    """
+    Procesos para los folds walk-forward (FORECAST_WF_N_JOBS, -1 = todos los nucleos).
+
+    Por defecto 1: cada ajuste abriria su propio pool loky, y los
+    workers del executor, de Celery y de los lotes ya ejecutan varios
+    ajustes a la vez.  El entorno se lee en cada llamada para que esos
+    workers puedan fijarlo a 1 en su inicializador aunque se haya subido.
+    """
+    if _wf_sequential.get():
+        return 1
+    try:
+        return int(os.environ.get("FORECAST_WF_N_JOBS", settings.FORECAST_WF_N_JOBS))
+    except ValueError:
+        return 1
 
 
 # ---------------------------------------------------------------------------
@@ -42,7 +125,8 @@ os.makedirs(_MODEL_CACHE_DIR, exist_ok=True)
 def get_consumption_series(db, medication_id, months_back=24, freq="D"):
     """Devuelve la serie de consumo diario via MovementRepository."""
     repo = MovementRepository(db)
-    return repo.get_consumption_series(medication_id, months_back=months_back, freq=freq)
+    with span("load_series"):
+        return repo.get_consumption_series(medication_id, months_back=months_back, freq=freq)
 
 
 def _series_hash(series):
@@ -51,7 +135,89 @@ def _series_hash(series):
 
 
 def _cache_path(medication_id, model_type, series_hash):
-    return os.path.join(_MODEL_CACHE_DIR, f"{model_type}_med{medication_id}_{series_hash}.joblib")
+    # medication_id None = modelo de catalogo (global); en disco se usa med0
+    return model_cache.path(medication_id or 0, model_type, series_hash)
+
+
+def _load_model(db, medication_id, model_type, series_hash, detach=False):
+    """
+    Busca un modelo ajustado: primero en la cache local y luego en el
+    registro compartido (BD). Un hit del registro puebla la cache local.
+
+    ``detach`` indica que el llamador modificara el objeto in-place.
+    """
+    path = _cache_path(medication_id, model_type, series_hash)
+    with span("model_cache.load"):
+        obj = model_cache.get(path, detach=detach)
+    if obj is not None or not _MODEL_REGISTRY:
+        cache_flag(model_type, "local" if obj is not None else "miss")
+        return obj
+
+    try:
+        with span("model_registry.load"):
+            obj = ModelRegistryRepository(db).load(medication_id, model_type, series_hash)
+    except Exception as e:
+        db.rollback()
+        logger.warning("Registro de modelos no disponible: %s", e)
+        cache_flag(model_type, "miss")
+        return None
+    cache_flag(model_type, "registry" if obj is not None else "miss")
+    if obj is not None:
+        logger.info("%s med %s cargado desde el registro de modelos", model_type, medication_id)
+        try:
+            model_cache.save(path, obj, hot=not detach)
+        except Exception as e:
+            logger.warning("No se pudo poblar la cache local: %s", e)
+    return obj
+
+
+def _member_cancelled(model_type):
+    """True si el ajuste es un miembro del ensemble ya descartado por timeout."""
+    cancel = _member_cancel.get()
+    if cancel is None or not cancel.is_set():
+        return False
+    logger.info("Ensemble: %s descartado por timeout; no se guarda el modelo", model_type)
+    return True
+
+
+def _store_model(db, medication_id, model_type, series_hash, obj, parameters=None):
+    """
+    Guarda el modelo en la cache local y en el registro compartido.
+
+    No guarda nada si el ajuste es un miembro del ensemble que ya excedio
+    su timeout (el ensemble devolvio su resultado sin el).
+    """
+    if _member_cancelled(model_type):
+        return
+    try:
+        with span("model_cache.store"):
+            model_cache.save(_cache_path(medication_id, model_type, series_hash), obj)
+    except Exception as e:
+        logger.warning("No se pudo guardar cache %s: %s", model_type, e)
+    if not _MODEL_REGISTRY or _member_cancelled(model_type):
+        return
+    try:
+        with span("model_registry.store"):
+            ModelRegistryRepository(db).save(
+                medication_id, model_type, series_hash, obj,
+                parameters=parameters, keep=model_cache.keep_per_medication,
+            )
+    except Exception as e:
+        db.rollback()
+        logger.warning("No se pudo registrar el modelo %s: %s", model_type, e)
+
+
+def _latest_model_hash(db, medication_id, model_type):
+    """Hash de la serie del ultimo modelo guardado (registro compartido o cache local)."""
+    if _MODEL_REGISTRY:
+        try:
+            series_hash = ModelRegistryRepository(db).get_latest_hash(medication_id, model_type)
+            if series_hash:
+                return series_hash
+        except Exception as e:
+            db.rollback()
+            logger.warning("Registro de modelos no disponible: %s", e)
+    return model_cache.latest_hash(medication_id or 0, model_type)  # global = med0 (ver _cache_path)
 
 
 # ---------------------------------------------------------------------------
@@ -84,7 +250,15 @@ def _eval_metrics(y_true, y_pred):
     return {"mae": mae, "mape": mape, "rmse": rmse, "r2": r2}
 
 
-def _walk_forward_metrics(series, fit_fn, n_splits=5, test_window=14):
+def _fit_fold(fit_fn, train, n_periods):
+    """Ajusta un fold; devuelve (predicciones, None) o (None, error) sin lanzar."""
+    try:
+        return np.maximum(fit_fn(train, n_periods), 0), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _walk_forward_metrics(series, fit_fn, n_splits=5, test_window=14, n_jobs=None):
     """
     Validacion walk-forward (expanding window).
 
@@ -92,29 +266,45 @@ def _walk_forward_metrics(series, fit_fn, n_splits=5, test_window=14):
     El WMAPE final se calcula sobre los errores acumulados de todos los folds
     (no promedio de MAPEs por fold), lo que da mayor estabilidad estadistica.
 
+    Los folds son independientes, asi que se ajustan en paralelo con joblib
+    (backend loky); los errores se combinan en el orden original de los folds.
+
     Parameters
     ----------
     fit_fn : callable(train: pd.Series, n_periods: int) -> np.ndarray
+    n_jobs : int, optional
+        Procesos para los folds (None = FORECAST_WF_N_JOBS, 1 = secuencial).
     """
     min_train = max(30, len(series) // 3)
     all_abs_err = []
     all_real = []
     fold_metrics = []
 
+    folds = []
     for k in range(n_splits, 0, -1):
         test_end = len(series) - (k - 1) * test_window
         test_start = test_end - test_window
         if test_start < min_train:
             continue
-        train = series.iloc[:test_start]
-        test = series.iloc[test_start:test_end]
-        try:
-            preds = np.maximum(fit_fn(train, len(test)), 0)
-            fold_metrics.append(_eval_metrics(test.values, preds))
-            all_abs_err.append(np.abs(test.values - preds))
-            all_real.append(np.abs(test.values))
-        except Exception as e:
-            logger.debug("Walk-forward fold %d fallo: %s", k, e)
+        folds.append((k, series.iloc[:test_start], series.iloc[test_start:test_end]))
+
+    if n_jobs is None:
+        n_jobs = _wf_n_jobs()
+    if n_jobs == 1 or len(folds) <= 1:
+        outcomes = [_fit_fold(fit_fn, train, len(test)) for _, train, test in folds]
+    else:
+        workers = len(folds) if n_jobs < 0 else min(n_jobs, len(folds))
+        outcomes = Parallel(n_jobs=workers, backend="loky")(
+            delayed(_fit_fold)(fit_fn, train, len(test)) for _, train, test in folds
+        )
+
+    for (k, _, test), (preds, error) in zip(folds, outcomes):
+        if error is not None:
+            logger.debug("Walk-forward fold %d fallo: %s", k, error)
+            continue
+        fold_metrics.append(_eval_metrics(test.values, preds))
+        all_abs_err.append(np.abs(test.values - preds))
+        all_real.append(np.abs(test.values))
 
     if not fold_metrics:
         return {"mae": 0.0, "mape": 0.0, "rmse": 0.0, "r2": 0.0, "n_folds": 0}
@@ -134,12 +324,178 @@ def _walk_forward_metrics(series, fit_fn, n_splits=5, test_window=14):
 # 3. ARIMA
 # ---------------------------------------------------------------------------
 
+def _previous_arima_params(db, medication_id):
+    """
+    Parametros ARIMA del ultimo run del medicamento (run 'arima' o miembro
+    de 'ensemble'/'auto').
+
+    Devuelve None si no hay run previo con order/seasonal_order guardados.
+    """
+    run = ForecastRepository(db).get_latest_for_models(medication_id, ["arima", "ensemble", "auto"])
+    if run is None or not run.parameters:
+        return None
+    params = run.parameters
+    if run.model_type in ("ensemble", "auto"):
+        params = (params.get("members") or {}).get("arima") or {}
+    if not params.get("order") or not params.get("seasonal_order"):
+        return None
+    return params
+
+
+def _arima_search_kwargs(prev=None):
+    """
+    Argumentos de pm.auto_arima.
+
+    Sin orden previo: busqueda stepwise completa (p,q <= 3; P,Q <= 2).
+    Con orden previo (warm-start): la busqueda arranca en ese orden, fija la
+    diferenciacion (evita los tests KPSS/OCSB) y se limita a +1 en cada termino.
+    """
+    kwargs = dict(
+        seasonal=True, m=7, stepwise=True,
+        suppress_warnings=True, error_action="ignore",
+        information_criterion="aic",
+    )
+    if prev is None:
+        kwargs.update(max_p=3, max_q=3, max_P=2, max_Q=2)
+        return kwargs
+
+    p, d, q = prev["order"]
+    P, D, Q = prev["seasonal_order"][:3]
+    kwargs.update(
+        d=d, D=D,
+        start_p=p, start_q=q, start_P=P, start_Q=Q,
+        max_p=p + 1, max_q=q + 1, max_P=P + 1, max_Q=Q + 1,
+    )
+    return kwargs
+
+
+def _resid_rmse(model, window=_ARIMA_TAIL_DAYS):
+    """RMSE de los residuos in-sample de los ultimos ``window`` dias."""
+    resid = np.asarray(model.resid())[-window:]
+    return float(np.sqrt(np.mean(resid ** 2))) if len(resid) else 0.0
+
+
+def _arima_meta(series, model, metrics, n_updates=0, base_rmse=None):
+    """
+    Metadatos guardados junto al modelo ARIMA en cache.
+
+    ``end`` y ``tail`` (ultimos dias de la serie de entrenamiento) permiten
+    detectar si una serie nueva es la misma con dias agregados al final.
+    """
+    return {
+        "end": series.index[-1].isoformat(),
+        "tail": [float(v) for v in series.values[-_ARIMA_TAIL_DAYS:]],
+        "n_updates": n_updates,
+        "base_rmse": base_rmse if base_rmse is not None else _resid_rmse(model),
+        "metrics": metrics,
+    }
+
+
+def _load_arima_artifact(db, medication_id, series_hash, detach=False):
+    """
+    Carga (modelo, meta) de la cache/registro, o (None, None) si no existe.
+
+    Los artefactos antiguos contienen solo el modelo (meta vacia).
+    """
+    obj = _load_model(db, medication_id, "arima", series_hash, detach=detach)
+    if obj is None:
+        return None, None
+    if isinstance(obj, dict) and "model" in obj:
+        return obj["model"], dict(obj.get("meta") or {})
+    return obj, {}
+
+
+def _save_arima_artifact(db, medication_id, series_hash, model, meta):
+    _store_model(
+        db, medication_id, "arima", series_hash,
+        {"model": model, "meta": meta},
+        parameters={"order": list(model.order), "seasonal_order": list(model.seasonal_order)},
+    )
+
+
+def _appended_points(series, meta):
+    """
+    Dias agregados respecto a la serie cacheada, o None si la serie cambio.
+
+    La serie nueva debe extenderse mas alla de ``meta["end"]`` y coincidir con
+    los ultimos dias cacheados (``meta["tail"]``). Una redistribucion mensual
+    que altere dias pasados rompe la coincidencia y fuerza un refit.
+    """
+    if not meta.get("end") or not meta.get("tail"):
+        return None
+    end = pd.Timestamp(meta["end"])
+    if series.index[-1] <= end:
+        return None
+    tail = np.asarray(meta["tail"], dtype=float)
+    overlap = series.reindex(pd.date_range(end=end, periods=len(tail), freq="D"))
+    mask = overlap.notna().values
+    if not mask.any() or not np.allclose(overlap.values[mask], tail[mask], atol=1e-4):
+        return None
+    return series[series.index > end]
+
+
+def _load_or_update_arima(db, medication_id, series, s_hash):
+    """
+    Devuelve (modelo, meta, origen) reutilizando la cache cuando es posible.
+
+    origen = "cache"  : misma serie (hash exacto), en cache local o registro
+           = "update" : serie cacheada + dias nuevos; el modelo se actualiza
+                        con pmdarima update() en lugar de reajustarse
+           = None     : no hay modelo reutilizable, se requiere ajuste completo
+    """
+    model, meta = _load_arima_artifact(db, medication_id, s_hash)
+    if model is not None:
+        logger.info("ARIMA med %s cargado desde cache (%s)", medication_id, s_hash)
+        return model, meta, "cache"
+
+    latest_hash = _latest_model_hash(db, medication_id, "arima")
+    if latest_hash is None:
+        return None, None, None
+    # detach: update() modifica el modelo in-place
+    model, meta = _load_arima_artifact(db, medication_id, latest_hash, detach=True)
+    if model is None:
+        return None, None, None
+
+    appended = _appended_points(series, meta)
+    if appended is None or meta.get("n_updates", 0) >= _ARIMA_MAX_UPDATES:
+        return None, None, None
+
+    try:
+        with span("arima.update"):
+            model.update(appended.values)
+    except Exception as e:
+        logger.info("ARIMA update fallo, se reajusta: %s", e)
+        return None, None, None
+
+    base_rmse = meta.get("base_rmse") or 0.0
+    if base_rmse > 0 and _resid_rmse(model) > base_rmse * _ARIMA_DRIFT_RATIO:
+        logger.info("ARIMA med %s: deriva del error, se reajusta", medication_id)
+        return None, None, None
+
+    logger.info("ARIMA med %s actualizado con %d dias nuevos", medication_id, len(appended))
+    meta = _arima_meta(
+        series, model, meta.get("metrics"),
+        n_updates=meta.get("n_updates", 0) + 1, base_rmse=base_rmse,
+    )
+    return model, meta, "update"
+
+
 def run_arima_forecast(db, medication_id, horizon_days=30, months_back=18):
     """
     Auto-ARIMA con walk-forward validation (5 folds) y persistencia joblib.
 
     Selecciona (p,d,q)(P,D,Q) minimizando AIC, estacionalidad semanal m=7.
     El modelo se serializa con joblib usando el hash de la serie como clave.
+
+    Warm-start: si el medicamento ya tiene un orden guardado, la busqueda se
+    restringe a su vecindario y los folds se ajustan con ese orden fijo (sin
+    busqueda). Cada FORECAST_ARIMA_FULL_SEARCH_EVERY runs se repite la
+    busqueda completa para no quedar anclado a un orden obsoleto.
+
+    Incremental: si la serie es la cacheada mas dias nuevos, el modelo se
+    actualiza con update() y se conservan las metricas walk-forward. Tras
+    FORECAST_ARIMA_MAX_UPDATES updates, o si el RMSE de los residuos recientes
+    supera FORECAST_ARIMA_DRIFT_RATIO veces el del ultimo ajuste, se reajusta.
     """
     try:
         import pmdarima as pm
@@ -151,42 +507,62 @@ def run_arima_forecast(db, medication_id, horizon_days=30, months_back=18):
         raise ValueError(f"Datos insuficientes para ARIMA: {len(series)} dias (minimo 14)")
 
     s_hash = _series_hash(series)
-    cache = _cache_path(medication_id, "arima", s_hash)
 
-    model = None
-    if os.path.exists(cache):
-        try:
-            model = joblib.load(cache)
-            logger.info("ARIMA cargado desde cache: %s", cache)
-        except Exception:
-            model = None
-
-    def _arima_fit_predict(train, n_periods):
-        m = pm.auto_arima(
-            train, seasonal=True, m=7, stepwise=True,
-            suppress_warnings=True, error_action="ignore",
-            max_p=3, max_q=3, max_P=2, max_Q=2,
-            information_criterion="aic",
-        )
-        preds, _ = m.predict(n_periods=n_periods, return_conf_int=True)
-        return preds
+    prev = _previous_arima_params(db, medication_id) if _ARIMA_WARM_START else None
+    warm_runs = int(prev.get("warm_runs", 0)) if prev else 0
 
-    wf_metrics = _walk_forward_metrics(series, _arima_fit_predict, n_splits=5, test_window=14)
-    wf_metrics["validation"] = "walk_forward_5_folds"
+    model, meta, fit = _load_or_update_arima(db, medication_id, series, s_hash)
+    if fit != "cache":
+        # Un hit exacto ya quedo marcado (local/registry) por _load_model
+        cache_flag("arima", fit or "miss")
 
-    if model is None:
-        model = pm.auto_arima(
-            series, seasonal=True, m=7, stepwise=True,
-            suppress_warnings=True, error_action="ignore",
-            max_p=3, max_q=3, max_P=2, max_Q=2,
-            information_criterion="aic",
-        )
-        try:
-            joblib.dump(model, cache)
-        except Exception as e:
-            logger.warning("No se pudo guardar cache ARIMA: %s", e)
+    if model is not None:
+        # Modelo reutilizado: sin busqueda; el orden de los folds es el del modelo
+        search = "none"
+        fixed_order, fixed_seasonal = tuple(model.order), tuple(model.seasonal_order)
+    else:
+        if prev is not None and warm_runs >= _ARIMA_FULL_SEARCH_EVERY:
+            prev = None  # fallback periodico a busqueda completa
+        search = "warm" if prev is not None else "full"
+        warm_runs = warm_runs + 1 if search == "warm" else 0
+        fixed_order = tuple(prev["order"]) if prev is not None else None
+        fixed_seasonal = tuple(prev["seasonal_order"]) if prev is not None else None
+
+    if fixed_order is not None:
+        def _arima_fit_predict(train, n_periods):
+            m = pm.ARIMA(order=fixed_order, seasonal_order=fixed_seasonal, suppress_warnings=True)
+            m.fit(train)
+            preds, _ = m.predict(n_periods=n_periods, return_conf_int=True)
+            return preds
+    else:
+        def _arima_fit_predict(train, n_periods):
+            m = pm.auto_arima(train, **_arima_search_kwargs())
+            preds, _ = m.predict(n_periods=n_periods, return_conf_int=True)
+            return preds
+
+    # Las metricas de un modelo reutilizado se conservan hasta el proximo refit completo
+    wf_metrics = dict(meta["metrics"]) if meta and meta.get("metrics") else None
+    if wf_metrics is None:
+        with span("arima.validation"):
+            wf_metrics = _walk_forward_metrics(series, _arima_fit_predict, n_splits=5, test_window=14)
+        wf_metrics["validation"] = "walk_forward_5_folds"
 
-    forecast_vals, forecast_ci = model.predict(n_periods=horizon_days, return_conf_int=True)
+    if model is None:
+        with span("arima.fit"):
+            model = pm.auto_arima(series, **_arima_search_kwargs(prev))
+        meta = _arima_meta(series, model, wf_metrics)
+        fit = "full"
+        _save_arima_artifact(db, medication_id, s_hash, model, meta)
+    elif fit == "update":
+        meta["metrics"] = wf_metrics
+        _save_arima_artifact(db, medication_id, s_hash, model, meta)
+    elif not meta.get("metrics"):
+        # Artefacto antiguo (solo el modelo): se reescribe con sus metadatos
+        meta = _arima_meta(series, model, wf_metrics)
+        _save_arima_artifact(db, medication_id, s_hash, model, meta)
+
+    with span("arima.predict"):
+        forecast_vals, forecast_ci = model.predict(n_periods=horizon_days, return_conf_int=True)
     forecast_vals = np.maximum(forecast_vals, 0)
     dates = pd.date_range(start=series.index[-1] + timedelta(days=1), periods=horizon_days, freq="D")
 
@@ -197,6 +573,10 @@ def run_arima_forecast(db, medication_id, horizon_days=30, months_back=18):
             "seasonal_order": list(model.seasonal_order),
             "aic": float(model.aic()),
             "validation": "walk_forward_5_folds",
+            "search": search,
+            "warm_runs": warm_runs,
+            "fit": fit,
+            "n_updates": meta.get("n_updates", 0),
         },
         "metrics": wf_metrics,
         "dates": dates,
@@ -210,6 +590,29 @@ def run_arima_forecast(db, medication_id, horizon_days=30, months_back=18):
 # 4. Prophet
 # ---------------------------------------------------------------------------
 
+def _prophet_cv_parallel():
+    """
+    Modo de paralelismo de cross_validation (FORECAST_PROPHET_CV_PARALLEL).
+
+    "processes" | "threads" | "dask"; vacio o "none" = secuencial.  Se lee en
+    cada llamada: los workers de Celery son daemonic y no pueden crear
+    procesos hijos, y los workers de lotes ya ocupan todos los nucleos.
+    """
+    mode = os.environ.get("FORECAST_PROPHET_CV_PARALLEL", "").strip().lower()
+    return None if mode in ("", "none") else mode
+
+
+def _new_prophet(yearly):
+    """Prophet con los hiperparametros del servicio."""
+    from prophet import Prophet
+
+    return Prophet(
+        weekly_seasonality=True, yearly_seasonality=yearly,
+        daily_seasonality=False, seasonality_mode="multiplicative",
+        interval_width=0.95,
+    )
+
+
 def run_prophet_forecast(db, medication_id, horizon_days=30, months_back=24):
     """
     Facebook Prophet con diagnostico oficial (cross_validation) y persistencia joblib.
@@ -218,7 +621,6 @@ def run_prophet_forecast(db, medication_id, horizon_days=30, months_back=24):
     prophet.diagnostics, que implementa walk-forward con ventana deslizante.
     """
     try:
-        from prophet import Prophet
         from prophet.diagnostics import cross_validation, performance_metrics
     except ImportError:
         raise RuntimeError("prophet no instalado.")
@@ -237,37 +639,38 @@ def run_prophet_forecast(db, medication_id, horizon_days=30, months_back=24):
     yearly = len(df_prophet) > 365
 
     s_hash = _series_hash(series)
-    cache = _cache_path(medication_id, "prophet", s_hash)
 
-    model_final = None
-    if os.path.exists(cache):
+    # Un unico ajuste sobre toda la serie: sirve para el diagnostico, la
+    # prediccion y es el modelo que se persiste
+    model_final = _load_model(db, medication_id, "prophet", s_hash)
+    if model_final is None:
         try:
-            model_final = joblib.load(cache)
-            logger.info("Prophet cargado desde cache: %s", cache)
-        except Exception:
-            model_final = None
+            model_final = _new_prophet(yearly)
+            with span("prophet.fit"):
+                model_final.fit(df_prophet)
+        except AttributeError as e:
+            raise RuntimeError(f"Incompatibilidad prophet/cmdstanpy ({e}).")
+        _store_model(
+            db, medication_id, "prophet", s_hash, model_final,
+            parameters={"seasonality_mode": "multiplicative", "yearly_seasonality": yearly},
+        )
 
-    # Diagnostico via prophet.diagnostics
+    # Diagnostico via prophet.diagnostics (reajusta por cutoff sobre el historial del modelo)
     diag_metrics = {}
     if len(df_prophet) >= 90:
         try:
-            _m_diag = Prophet(
-                weekly_seasonality=True, yearly_seasonality=yearly,
-                daily_seasonality=False, seasonality_mode="multiplicative",
-                interval_width=0.95,
-            )
-            _m_diag.fit(df_prophet)
             n = len(df_prophet)
             initial_days = max(60, int(n * 0.60))
             period_days = max(14, int(n * 0.10))
             horizon_cv = f"{min(horizon_days, 30)} days"
-            df_cv = cross_validation(
-                _m_diag,
-                initial=f"{initial_days} days",
-                period=f"{period_days} days",
-                horizon=horizon_cv,
-                parallel=None,
-            )
+            with span("prophet.cv"):
+                df_cv = cross_validation(
+                    model_final,
+                    initial=f"{initial_days} days",
+                    period=f"{period_days} days",
+                    horizon=horizon_cv,
+                    parallel=_prophet_cv_parallel(),
+                )
             df_perf = performance_metrics(df_cv, rolling_window=1)
             diag_metrics = {
                 "mae": float(df_perf["mae"].mean()),
@@ -284,37 +687,19 @@ def run_prophet_forecast(db, medication_id, horizon_days=30, months_back=24):
     if not diag_metrics:
         def _prophet_fit_predict(train, n_periods):
             df_t = pd.DataFrame({"ds": train.index, "y": train.values})
-            m = Prophet(
-                weekly_seasonality=True, yearly_seasonality=len(df_t) > 365,
-                daily_seasonality=False, seasonality_mode="multiplicative",
-                interval_width=0.95,
-            )
+            m = _new_prophet(len(df_t) > 365)
             m.fit(df_t)
             fut = m.make_future_dataframe(periods=n_periods, include_history=False)
             fc = m.predict(fut)
             return np.maximum(fc["yhat"].values, 0)
 
-        wf = _walk_forward_metrics(series, _prophet_fit_predict, n_splits=3, test_window=14)
+        with span("prophet.validation"):
+            wf = _walk_forward_metrics(series, _prophet_fit_predict, n_splits=3, test_window=14)
         diag_metrics = {**wf, "validation": "walk_forward_3_folds"}
 
-    # Modelo final sobre toda la serie
-    if model_final is None:
-        try:
-            model_final = Prophet(
-                weekly_seasonality=True, yearly_seasonality=yearly,
-                daily_seasonality=False, seasonality_mode="multiplicative",
-                interval_width=0.95,
-            )
-            model_final.fit(df_prophet)
-            try:
-                joblib.dump(model_final, cache)
-            except Exception as e:
-                logger.warning("No se pudo guardar cache Prophet: %s", e)
-        except AttributeError as e:
-            raise RuntimeError(f"Incompatibilidad prophet/cmdstanpy ({e}).")
-
-    future = model_final.make_future_dataframe(periods=horizon_days, include_history=False)
-    forecast = model_final.predict(future)
+    with span("prophet.predict"):
+        future = model_final.make_future_dataframe(periods=horizon_days, include_history=False)
+        forecast = model_final.predict(future)
 
     return {
         "model_type": "prophet",
@@ -336,20 +721,67 @@ def run_prophet_forecast(db, medication_id, horizon_days=30, months_back=24):
 # 5. Ensemble
 # ---------------------------------------------------------------------------
 
+def _run_member(bind, fn, medication_id, horizon_days, months_back, cancel=None):
+    """
+    Ejecuta un miembro del ensemble con su propia sesion (Session no es
+    thread-safe).  Los miembros corren a la vez, asi que sus folds son
+    secuenciales.  ``cancel`` (threading.Event) se activa si el miembro
+    excede su timeout: el ajuste en curso no se puede interrumpir, pero
+    ``_store_model`` deja de persistir su modelo.
+    """
+    tokens = (_wf_sequential.set(True), _member_cancel.set(cancel))
+    try:
+        with Session(bind) as member_db:
+            return fn(member_db, medication_id, horizon_days, months_back)
+    finally:
+        _member_cancel.reset(tokens[1])
+        _wf_sequential.reset(tokens[0])
+
+
 def run_ensemble_forecast(db, medication_id, horizon_days=30, months_back=24):
     """
     Combina ARIMA y Prophet con pesos proporcionales a 1/RMSE.
-    Degrada gracefully si un modelo falla.
+    Degrada gracefully si un modelo falla o excede el timeout.
+
+    Los miembros se ajustan en hilos concurrentes, cada uno con su sesion.
+    El trabajo pesado no compite por el GIL (Stan corre en un proceso
+    externo), asi que el tiempo total se acerca al del miembro mas lento
+    en vez de a la suma; los folds de cada miembro son secuenciales.  Un miembro
+    que excede FORECAST_ENSEMBLE_MEMBER_TIMEOUT se descarta: su hilo
+    termina el ajuste en curso en segundo plano (no se puede interrumpir),
+    pero se le señala la cancelacion y no escribe en la cache ni en el
+    registro de modelos.
     """
     results = {}
     errors = {}
+    members = [("arima", run_arima_forecast), ("prophet", run_prophet_forecast)]
+    bind = db.get_bind()
+    cancels = {name: threading.Event() for name, _ in members}
 
-    for name, fn in [("arima", run_arima_forecast), ("prophet", run_prophet_forecast)]:
-        try:
-            results[name] = fn(db, medication_id, horizon_days, months_back)
-        except Exception as e:
-            errors[name] = str(e)
-            logger.warning("Ensemble: %s fallo - %s", name, e)
+    pool = ThreadPoolExecutor(max_workers=len(members), thread_name_prefix="ensemble")
+    try:
+        # copy_context: los tiempos de cada miembro se suman a la traza del ensemble
+        futures = {
+            name: pool.submit(
+                copy_context().run, _run_member, bind, fn, medication_id, horizon_days, months_back,
+                cancels[name],
+            )
+            for name, fn in members
+        }
+        # Los miembros arrancan a la vez: un deadline comun equivale a un timeout por miembro
+        deadline = time.monotonic() + _ENSEMBLE_MEMBER_TIMEOUT
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeoutError:
+                cancels[name].set()
+                errors[name] = f"timeout ({_ENSEMBLE_MEMBER_TIMEOUT:.0f}s)"
+                logger.warning("Ensemble: %s excedio el timeout de %.0fs", name, _ENSEMBLE_MEMBER_TIMEOUT)
+            except Exception as e:
+                errors[name] = str(e)
+                logger.warning("Ensemble: %s fallo - %s", name, e)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
     if not results:
         raise ValueError(f"Todos los modelos fallaron: {errors}")
@@ -381,6 +813,8 @@ def run_ensemble_forecast(db, medication_id, horizon_days=30, months_back=24):
             "models_used": list(results.keys()),
             "weights": weights,
             "individual_rmse": rmse_vals,
+            "members": {k: v["parameters"] for k, v in results.items()},
+            "member_errors": errors,
             "validation": "walk_forward_per_model",
         },
         "metrics": avg_metrics,
@@ -414,88 +848,403 @@ def _compute_shortage_probability(medication, forecast_values, lower_ci, upper_c
     con Phi = CDF de la normal estandar (scipy.stats.norm).
     """
     available = max(0.0, float(medication.stock) - float(medication.min_stock))
+    prob, days_until, level = _shortage_risk_matrix(
+        np.array([available]),
+        np.asarray(forecast_values, dtype=float)[None, :],
+        np.asarray(lower_ci, dtype=float)[None, :],
+        np.asarray(upper_ci, dtype=float)[None, :],
+    )
+    return {
+        "days_until_shortage": int(days_until[0]) or None,
+        "shortage_probability": round(float(prob[0]), 4),
+        "alert_level": str(level[0]),
+    }
 
-    sigma_daily = (upper_ci - lower_ci) / (2.0 * 1.96)
-    sigma_daily = np.maximum(sigma_daily, 1e-9)
-
-    cum_mean = float(np.sum(forecast_values))
-    cum_std = float(np.sqrt(np.sum(sigma_daily ** 2)))
-
-    if cum_std < 1e-6:
-        prob = 1.0 if cum_mean > available else 0.0
-    else:
-        prob = float(1.0 - norm.cdf(available, loc=cum_mean, scale=cum_std))
 
-    prob = float(np.clip(prob, 0.0, 1.0))
+def _shortage_risk_matrix(available, values, lower_ci, upper_ci):
+    """
+    _compute_shortage_probability para varias series a la vez.
 
-    cumsum = np.cumsum(forecast_values)
-    arr = np.where(cumsum >= available)[0]
-    days_until = int(arr[0]) + 1 if len(arr) > 0 else None
+    Parameters
+    ----------
+    available : array (n,)
+        Stock disponible (stock - min_stock, >= 0) de cada serie.
+    values, lower_ci, upper_ci : arrays (n, H)
+        Prediccion e IC 95%; las series mas cortas se rellenan con NaN.
+
+    Returns
+    -------
+    (prob, days_until, level) : arrays (n,)
+        ``days_until`` es 0 si el stock no se agota dentro del horizonte.
+    """
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0.0)
+    sigma_daily = np.where(valid, np.maximum((upper_ci - lower_ci) / (2.0 * 1.96), 1e-9), 0.0)
+
+    cum_mean = values.sum(axis=1)
+    cum_std = np.sqrt((sigma_daily ** 2).sum(axis=1))
+
+    degenerate = cum_std < 1e-6
+    prob = np.where(
+        degenerate,
+        (cum_mean > available).astype(float),
+        1.0 - norm.cdf(available, loc=cum_mean, scale=np.where(degenerate, 1.0, cum_std)),
+    )
+    prob = np.clip(prob, 0.0, 1.0)
 
-    if prob >= 0.70:
-        level = "high"
-    elif prob >= 0.35:
-        level = "medium"
+    crossed = (np.cumsum(values, axis=1) >= available[:, None]) & valid
+    if crossed.shape[1]:
+        days_until = np.where(crossed.any(axis=1), crossed.argmax(axis=1) + 1, 0)
     else:
-        level = "low"
+        days_until = np.zeros(len(available), dtype=int)
 
-    return {
-        "days_until_shortage": days_until,
-        "shortage_probability": round(prob, 4),
-        "alert_level": level,
-    }
+    level = np.select([prob >= 0.70, prob >= 0.35], ["high", "medium"], default="low")
+    return prob, days_until, level
 
 
 # ---------------------------------------------------------------------------
 # 7. Persistencia en BD
 # ---------------------------------------------------------------------------
 
-def save_forecast(db, medication_id, forecast_data):
+def save_forecast(db, medication_id, forecast_data, months_back=None, series_hash=None, horizon_days=None):
     """
     Persiste ForecastRun + ForecastPoints usando ForecastRepository.
     La probabilidad de desabastecimiento se deriva del IC (estadisticamente).
+
+    ``months_back`` y ``series_hash`` son la clave de la cache de resultados
+    (ver get_cached_forecast); sin ellos el run no se reutiliza.
+
+    ``horizon_days`` es el horizonte pedido cuando el modelo se ajusto a uno
+    mayor (ver fit_horizon): se guardan todos los puntos ajustados
+    (``fitted_horizon_days``) y el riesgo del run corresponde al horizonte
+    pedido.
+
+    Con FORECAST_PACKED_POINTS los puntos van empaquetados en el propio
+    run (un solo INSERT); si no, como filas de ``forecast_points``.
     """
     medication = db.get(Medication, medication_id)
     if not medication:
         raise ValueError(f"Medicamento {medication_id} no encontrado")
 
+    fitted = len(forecast_data["dates"])
+    horizon = min(horizon_days or fitted, fitted)
     risk = _compute_shortage_probability(
-        medication, forecast_data["values"], forecast_data["lower_ci"], forecast_data["upper_ci"]
+        medication,
+        np.asarray(forecast_data["values"])[:horizon],
+        np.asarray(forecast_data["lower_ci"])[:horizon],
+        np.asarray(forecast_data["upper_ci"])[:horizon],
     )
     metrics = forecast_data.get("metrics", {})
-    horizon = len(forecast_data["dates"])
-
+    persist_started = time.perf_counter()
     run = ForecastRun(
         medication_id=medication_id,
         model_type=forecast_data["model_type"],
         horizon_days=horizon,
+        fitted_horizon_days=fitted,
         mae=metrics.get("mae"),
         mape=metrics.get("mape"),
         rmse=metrics.get("rmse"),
         r2=metrics.get("r2"),
         parameters=forecast_data.get("parameters", {}),
+        months_back=months_back,
+        series_hash=series_hash,
         stock_at_forecast=float(medication.stock),
         days_until_shortage=risk["days_until_shortage"],
         shortage_probability=risk["shortage_probability"],
         alert_level=risk["alert_level"],
     )
 
-    points = [
-        ForecastPoint(
-            forecast_run_id=0,
-            date=pd.Timestamp(date).to_pydatetime(),
-            predicted_value=max(0.0, float(val)),
-            lower_ci=max(0.0, float(low)),
-            upper_ci=max(0.0, float(up)),
+    if _PACKED_POINTS:
+        run.packed_points = pack_points(
+            forecast_data["dates"],
+            np.maximum(0.0, np.asarray(forecast_data["values"], dtype=float)),
+            np.maximum(0.0, np.asarray(forecast_data["lower_ci"], dtype=float)),
+            np.maximum(0.0, np.asarray(forecast_data["upper_ci"], dtype=float)),
         )
-        for date, val, low, up in zip(
-            forecast_data["dates"], forecast_data["values"],
-            forecast_data["lower_ci"], forecast_data["upper_ci"],
+        points = []
+    else:
+        points = [
+            ForecastPoint(
+                forecast_run_id=0,
+                date=pd.Timestamp(date).to_pydatetime(),
+                predicted_value=max(0.0, float(val)),
+                lower_ci=max(0.0, float(low)),
+                upper_ci=max(0.0, float(up)),
+            )
+            for date, val, low, up in zip(
+                forecast_data["dates"], forecast_data["values"],
+                forecast_data["lower_ci"], forecast_data["upper_ci"],
+            )
+        ]
+
+    timings = (run.parameters or {}).get("timings")
+
+    def record_persist(saved):
+        # "persist" cubre la preparacion y los INSERT ya enviados; se anota antes
+        # del commit (misma transaccion) reasignando el dict para marcar el JSON
+        persist = round(time.perf_counter() - persist_started, 4)
+        saved.parameters = {
+            **saved.parameters,
+            "timings": {**timings, "stages": {**timings.get("stages", {}), "persist": persist}},
+        }
+
+    return ForecastRepository(db).save_run_with_points(
+        run, points, before_commit=record_persist if timings is not None else None,
+    )
+
+
+def series_fingerprint(db, medication_id, months_back=24):
+    """Hash de la serie de consumo actual (clave de la cache de resultados), o None si esta vacia."""
+    series = get_consumption_series(db, medication_id, months_back=months_back, freq="D")
+    return _series_hash(series) if len(series) else None
+
+
+def _points_risk(medication, points):
+    """Riesgo de desabastecimiento sobre unos puntos guardados."""
+    values = np.array([p.predicted_value for p in points])
+    lower = np.array([p.lower_ci for p in points])
+    upper = np.array([p.upper_ci for p in points])
+    risk = _compute_shortage_probability(medication, values, lower, upper)
+    risk["stock_at_forecast"] = float(medication.stock)
+    return risk
+
+
+def run_risk(run):
+    """Campos de riesgo guardados en el run."""
+    return {
+        "stock_at_forecast": run.stock_at_forecast,
+        "days_until_shortage": run.days_until_shortage,
+        "shortage_probability": run.shortage_probability,
+        "alert_level": run.alert_level,
+    }
+
+
+def refresh_run_risk(db, run, points=None):
+    """
+    Recalcula los campos que dependen del stock (probabilidad, dias hasta
+    desabasto, nivel de alerta) a partir de los puntos guardados del run,
+    dentro de su horizonte ``horizon_days``.
+
+    Solo escribe en la BD si algun campo cambio. Devuelve el run.
+    """
+    medication = db.get(Medication, run.medication_id)
+    if medication is None:
+        return run
+    if points is None:
+        points = ForecastRepository(db).get_run_points(run)
+    points = points[:run.horizon_days]
+    if not points:
+        return run
+
+    risk = _points_risk(medication, points)
+    if any(getattr(run, k) != v for k, v in risk.items()):
+        for k, v in risk.items():
+            setattr(run, k, v)
+        run.updated_at = datetime.utcnow()
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+    return run
+
+
+def refresh_risk_for_medications(db, medication_ids):
+    """
+    Recalcula el riesgo de los ultimos runs (uno por modelo) de varios
+    medicamentos tras un cambio de stock, sin reajustar ningun modelo.
+
+    Runs y puntos se cargan en dos consultas y todos los horizontes se
+    evaluan a la vez con _shortage_risk_matrix; solo se escriben los runs
+    cuyo riesgo cambio.
+
+    Returns
+    -------
+    int
+        Numero de runs actualizados.
+    """
+    ids = sorted({int(m) for m in medication_ids if m is not None})
+    repo = ForecastRepository(db)
+    runs = repo.get_latest_runs_by_model(ids)
+    rows = repo.get_point_values_for_runs(runs)
+    if not rows:
+        return 0
+
+    meds = {m.id: m for m in db.exec(select(Medication).where(Medication.id.in_(ids))).all()}
+    runs = [r for r in runs if r.medication_id in meds]
+    row_of = {r.id: i for i, r in enumerate(runs)}
+    horizons = np.array([r.horizon_days for r in runs])
+
+    data = np.array([(row_of.get(rid, -1), v, lo, up) for rid, v, lo, up in rows], dtype=float)
+    data = data[data[:, 0] >= 0]
+    run_idx = data[:, 0].astype(int)
+    # Posicion de cada punto dentro de su run (las filas vienen ordenadas por run y fecha)
+    starts = np.flatnonzero(np.r_[True, run_idx[1:] != run_idx[:-1]])
+    pos = np.arange(len(run_idx)) - np.repeat(starts, np.diff(np.r_[starts, len(run_idx)]))
+    keep = pos < horizons[run_idx]
+    run_idx, pos, data = run_idx[keep], pos[keep], data[keep]
+
+    shape = (len(runs), int(pos.max()) + 1 if len(pos) else 0)
+    values, lower, upper = (np.full(shape, np.nan) for _ in range(3))
+    values[run_idx, pos], lower[run_idx, pos], upper[run_idx, pos] = data[:, 1], data[:, 2], data[:, 3]
+
+    stock = np.array([float(meds[r.medication_id].stock) for r in runs])
+    min_stock = np.array([float(meds[r.medication_id].min_stock) for r in runs])
+    prob, days_until, level = _shortage_risk_matrix(np.maximum(0.0, stock - min_stock), values, lower, upper)
+
+    has_points = np.bincount(run_idx, minlength=len(runs)) > 0
+    now = datetime.utcnow()
+    updated = 0
+    for i, run in enumerate(runs):
+        if not has_points[i]:
+            continue
+        risk = {
+            "stock_at_forecast": float(stock[i]),
+            "days_until_shortage": int(days_until[i]) or None,
+            "shortage_probability": round(float(prob[i]), 4),
+            "alert_level": str(level[i]),
+        }
+        if any(getattr(run, k) != v for k, v in risk.items()):
+            for k, v in risk.items():
+                setattr(run, k, v)
+            run.updated_at = now
+            db.add(run)
+            updated += 1
+    if updated:
+        db.commit()
+    return updated
+
+
+def on_stock_change(db, medication_ids):
+    """
+    Mantiene al dia las alertas de forecast tras un cambio de stock.
+
+    Lo llaman los servicios que modifican ``Medication.stock`` despues de
+    confirmar su propia transaccion; un fallo aqui se registra pero no
+    revierte la operacion que lo disparo.
+    """
+    try:
+        updated = refresh_risk_for_medications(db, medication_ids)
+        if updated:
+            logger.info("Riesgo recalculado en %d runs tras cambio de stock", updated)
+    except Exception as e:
+        db.rollback()
+        logger.warning("No se pudo recalcular el riesgo tras cambio de stock: %s", str(e))
+
+
+def serve_run(db, run, horizon_days=None, points=None, refresh=True):
+    """
+    Datos de un run persistido recortados a ``horizon_days``.
+
+    Si el horizonte es el del run se usan (y, con ``refresh``, se
+    actualizan) sus campos de riesgo; si es menor, el riesgo se recalcula
+    para el recorte sin modificar el run.
+
+    Returns
+    -------
+    (ForecastRun, dict)
+        Run y datos con el formato de resultado de los modelos, mas
+        ``risk`` (campos de riesgo del horizonte servido).
+
+    Raises
+    ------
+    ValueError
+        Si el run no tiene puntos suficientes para ``horizon_days``.
+    """
+    if points is None:
+        points = ForecastRepository(db).get_run_points(run)
+    horizon = horizon_days or run.horizon_days
+    if len(points) < horizon:
+        raise ValueError(
+            f"El forecast {run.id} solo cubre {len(points)} dias; se pidieron {horizon}"
         )
-    ]
 
+    if horizon == run.horizon_days:
+        if refresh:
+            run = refresh_run_risk(db, run, points)
+        risk = run_risk(run)
+    else:
+        medication = db.get(Medication, run.medication_id)
+        risk = _points_risk(medication, points[:horizon]) if medication is not None else run_risk(run)
+
+    data = _run_forecast_data(run, points[:horizon])
+    data["risk"] = risk
+    return run, data
+
+
+def slice_forecast(forecast_data, horizon_days):
+    """Resultado de un modelo recortado a los primeros ``horizon_days`` dias."""
+    return {
+        **forecast_data,
+        "dates": forecast_data["dates"][:horizon_days],
+        "values": np.asarray(forecast_data["values"])[:horizon_days],
+        "lower_ci": np.asarray(forecast_data["lower_ci"])[:horizon_days],
+        "upper_ci": np.asarray(forecast_data["upper_ci"])[:horizon_days],
+    }
+
+
+def get_cached_forecast(db, medication_id, model_type, horizon_days, months_back):
+    """
+    Cache de resultados: reutiliza un run con las mismas entradas.
+
+    La clave es (medicamento, modelo, months_back, hash de la serie); un run
+    creado hace menos de FORECAST_RESULT_CACHE_TTL segundos con esa clave y
+    al menos ``horizon_days`` dias ajustados se devuelve recortado en lugar
+    de reajustar el modelo e insertar un duplicado.  Solo se recalculan los
+    campos que dependen del stock.
+
+    Returns
+    -------
+    (ForecastRun | None, dict | None, str | None)
+        Run reutilizado, sus datos (ver serve_run) y el hash de la serie,
+        que el llamador pasa a save_forecast en caso de miss.
+    """
+    series_hash = series_fingerprint(db, medication_id, months_back)
+    if series_hash is None or _RESULT_CACHE_TTL <= 0:
+        return None, None, series_hash
+
+    since = datetime.utcnow() - timedelta(seconds=_RESULT_CACHE_TTL)
     repo = ForecastRepository(db)
-    return repo.save_run_with_points(run, points)
+    run = repo.get_cached_run(medication_id, model_type, horizon_days, months_back, series_hash, since)
+    if run is None:
+        return None, None, series_hash
+
+    points = repo.get_run_points(run)
+    if len(points) < horizon_days:
+        return None, None, series_hash
+    run, data = serve_run(db, run, horizon_days, points)
+    return run, data, series_hash
+
+
+def _run_forecast_data(run, points):
+    """Run persistido con el formato de resultado de los modelos."""
+    return {
+        "model_type": run.model_type,
+        "parameters": run.parameters or {},
+        "metrics": {"mae": run.mae, "mape": run.mape, "rmse": run.rmse, "r2": run.r2},
+        "dates": pd.DatetimeIndex([p.date for p in points]),
+        "values": np.array([p.predicted_value for p in points]),
+        "lower_ci": np.array([p.lower_ci for p in points]),
+        "upper_ci": np.array([p.upper_ci for p in points]),
+    }
+
+
+def load_run_forecast(db, run_id, horizon_days=None):
+    """
+    Carga un run (p.ej. calculado por otra peticion) con el riesgo al dia,
+    recortado a ``horizon_days`` (por defecto, el horizonte del run).
+
+    Returns
+    -------
+    (ForecastRun, dict)
+
+    Raises
+    ------
+    ValueError
+        Si el run no existe (p.ej. fue borrado entretanto).
+    """
+    run = ForecastRepository(db).get(run_id)
+    if run is None:
+        raise ValueError(f"Forecast run {run_id} no encontrado")
+    return serve_run(db, run, horizon_days)
 
 
 def get_forecast_summary(db):
@@ -540,7 +1289,7 @@ def get_model_performance(db):
             "meds_with_forecast": 0,
             "total_meds": total_meds,
             "coverage_pct": 0.0,
-            "target_mape": 15.0,
+            "target_mape": TARGET_WMAPE,
             "meets_mape_target": False,
             "mape_method": "WMAPE",
         }
@@ -572,7 +1321,76 @@ def get_model_performance(db):
         "meds_with_forecast": meds_with_forecast,
         "total_meds": total_meds,
         "coverage_pct": coverage_pct,
-        "target_mape": 15.0,
-        "meets_mape_target": avg_mape is not None and avg_mape < 15.0,
+        "target_mape": TARGET_WMAPE,
+        "meets_mape_target": avg_mape is not None and avg_mape < TARGET_WMAPE,
         "mape_method": "WMAPE",
     }
+
+
+# Limites (segundos) de los buckets de los histogramas de tiempos
+TIMING_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def get_timing_metrics(db, hours=24, model_type=None, limit=5000):
+    """
+    Histogramas de tiempos por modelo y etapa (parameters["timings"]).
+
+    Se agregan los runs creados en las ultimas ``hours`` horas (como mucho
+    ``limit``, los mas recientes), de modo que incluye los ajustados por
+    cualquier worker de la API o de Celery.
+
+    Returns
+    -------
+    dict
+        ``buckets`` (limites superiores en segundos; el ultimo bucket es
+        +inf) y, por modelo, ``runs``, ``stages`` (``count``, ``mean``,
+        ``p50``, ``p90``, ``p99``, ``max`` e ``histogram`` por etapa,
+        incluida ``total``) y ``cache`` (conteo de local/registry/miss...
+        por artefacto).
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    stmt = (
+        select(ForecastRun.model_type, ForecastRun.parameters)
+        .where(ForecastRun.created_at >= since)
+        .order_by(ForecastRun.created_at.desc())
+        .limit(limit)
+    )
+    if model_type:
+        stmt = stmt.where(ForecastRun.model_type == model_type)
+
+    durations: dict = {}
+    cache: dict = {}
+    runs: dict = {}
+    for model, params in db.exec(stmt).all():
+        timings = (params or {}).get("timings")
+        if not timings:
+            continue
+        runs[model] = runs.get(model, 0) + 1
+        stages = durations.setdefault(model, {})
+        for stage, seconds in {**timings.get("stages", {}), "total": timings.get("total_s")}.items():
+            if seconds is not None:
+                stages.setdefault(stage, []).append(float(seconds))
+        for name, outcome in timings.get("cache", {}).items():
+            counts = cache.setdefault(model, {}).setdefault(name, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    edges = np.array((0.0, *TIMING_BUCKETS, np.inf))
+    models = {}
+    for model, stages in durations.items():
+        summary = {}
+        for stage, values in sorted(stages.items()):
+            arr = np.array(values)
+            p50, p90, p99 = np.percentile(arr, [50, 90, 99])
+            summary[stage] = {
+                "count": int(arr.size),
+                "mean": round(float(arr.mean()), 4),
+                "p50": round(float(p50), 4),
+                "p90": round(float(p90), 4),
+                "p99": round(float(p99), 4),
+                "max": round(float(arr.max()), 4),
+                "histogram": np.histogram(arr, bins=edges)[0].tolist(),
+            }
+        models[model] = {"runs": runs[model], "stages": summary, "cache": cache.get(model, {})}
+
+    return {"window_hours": hours, "buckets": list(TIMING_BUCKETS), "models": models}
+
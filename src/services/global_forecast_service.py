@@ -0,0 +1,400 @@
+"""
+Modelo global de forecasting para todo el catalogo ("global").
+
+Ajustar un ARIMA/Prophet por medicamento no escala a miles de productos.
+El modelo global es un unico HistGradientBoostingRegressor entrenado
+sobre las series diarias de todos los medicamentos:
+
+- Cada serie se normaliza por su consumo medio, de modo que medicamentos
+  de distinto volumen comparten patrones.
+- Features: rezagos (1..28 dias), medias/desviacion moviles y calendario
+  (dia de la semana, mes, dia del mes), todas calculadas sobre una
+  ventana de los ultimos 28 dias.
+- Prediccion recursiva a h pasos, en lote para todos los medicamentos:
+  una llamada a ``predict`` por dia del horizonte.
+- Intervalos por bootstrap de residuos: se simulan FORECAST_GLOBAL_PATHS
+  trayectorias por medicamento sumando residuos del ajuste y se toman
+  los percentiles 2.5/97.5.
+
+El entrenamiento es nocturno (tarea Celery ``train_global_forecast_model``)
+y el artefacto se guarda en la cache local y en el registro compartido
+de modelos con ``medication_id = NULL``.  La validacion es un holdout de
+los ultimos 28 dias de cada serie con un modelo ajustado sin ellos.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlmodel import select
+
+from src.core.tracing import span
+from src.models.medication import Medication
+from src.repositories import MovementRepository
+
+logger = logging.getLogger(__name__)
+
+
+MODEL_TYPE = "global"
+
+_WINDOW = 28
+_LAGS = (1, 2, 3, 7, 14, 21, 28)
+_HOLDOUT_DAYS = 28
+_MAX_RESIDUALS = 20000
+
+FEATURE_NAMES = [f"lag_{lag}" for lag in _LAGS] + [
+    "mean_7", "mean_28", "std_7", "dayofweek", "month", "day",
+]
+
+# Trayectorias simuladas por medicamento para los intervalos
+_N_PATHS = int(os.environ.get("FORECAST_GLOBAL_PATHS", "100"))
+
+
+# ---------------------------------------------------------------------------
+# 1. Features
+# ---------------------------------------------------------------------------
+
+def _window_features(windows, dates):
+    """
+    Matriz de features a partir de ventanas de 28 dias normalizadas.
+
+    Parameters
+    ----------
+    windows : array (rows, 28)
+        Consumo normalizado de los 28 dias previos a cada fecha objetivo.
+    dates : pd.DatetimeIndex (rows,)
+        Fecha objetivo de cada fila.
+    """
+    last7 = windows[:, -7:]
+    return np.column_stack([
+        windows[:, [-lag for lag in _LAGS]],
+        last7.mean(axis=1),
+        windows.mean(axis=1),
+        last7.std(axis=1),
+        dates.dayofweek,
+        dates.month,
+        dates.day,
+    ])
+
+
+def _scale(values):
+    """Consumo medio de la serie (normalizador); 0 si no hay consumo."""
+    return float(np.mean(values)) if len(values) else 0.0
+
+
+def _series_rows(series):
+    """Filas de entrenamiento (X, y normalizado) de una serie diaria."""
+    scale = _scale(series.values)
+    if scale <= 0 or len(series) <= _WINDOW:
+        return None
+    y = series.values.astype(float) / scale
+    windows = sliding_window_view(y[:-1], _WINDOW)
+    return _window_features(windows, series.index[_WINDOW:]), y[_WINDOW:]
+
+
+def _load_panel(db, medication_ids, months_back):
+    """
+    Series diarias de consumo por medicamento (las vacias se omiten).
+
+    Se cargan con una consulta agrupada por bloques
+    (``MovementRepository.iter_consumption_matrices``) en lugar de una
+    por medicamento.
+    """
+    panel = {}
+    with span("load_series"):
+        for matrix in MovementRepository(db).iter_consumption_matrices(medication_ids, months_back):
+            for med_id in matrix.medication_ids:
+                series = matrix.series(int(med_id))
+                if len(series):
+                    panel[int(med_id)] = series
+    return panel
+
+
+def _all_medication_ids(db):
+    return list(db.exec(select(Medication.id)).all())
+
+
+# ---------------------------------------------------------------------------
+# 2. Ajuste y simulacion
+# ---------------------------------------------------------------------------
+
+def _fit(panel):
+    """Ajusta el estimador global; devuelve (estimador, residuos normalizados, filas)."""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    blocks = [rows for rows in (_series_rows(s) for s in panel.values()) if rows is not None]
+    if not blocks:
+        raise ValueError(f"Datos insuficientes para el modelo global (minimo {_WINDOW + 1} dias por serie)")
+    X = np.vstack([b[0] for b in blocks])
+    y = np.concatenate([b[1] for b in blocks])
+
+    estimator = HistGradientBoostingRegressor(
+        max_iter=300, learning_rate=0.05, min_samples_leaf=40, random_state=0,
+    )
+    estimator.fit(X, y)
+
+    residuals = y - estimator.predict(X)
+    if len(residuals) > _MAX_RESIDUALS:
+        residuals = np.random.default_rng(0).choice(residuals, _MAX_RESIDUALS, replace=False)
+    return estimator, residuals, len(y)
+
+
+def _simulate(estimator, histories, last_dates, horizon, residuals=None, n_paths=0, seed=0):
+    """
+    Prediccion recursiva en lote (normalizada).
+
+    La trayectoria central (sin ruido) y las ``n_paths`` trayectorias con
+    residuos remuestreados de todos los medicamentos avanzan juntas: una
+    sola llamada a ``predict`` por dia del horizonte.
+
+    Returns
+    -------
+    (point, lower, upper) : arrays (n_series, horizon); lower/upper son None sin trayectorias.
+    """
+    n = len(histories)
+    rng = np.random.default_rng(seed)
+    buffers = np.vstack([histories, np.repeat(histories, n_paths, axis=0)])
+    dates = last_dates.append(last_dates.repeat(n_paths)) if n_paths else last_dates
+    noisy = np.arange(len(buffers)) >= n
+
+    out = np.empty((len(buffers), horizon))
+    for h in range(horizon):
+        step = estimator.predict(_window_features(buffers, dates + timedelta(days=h + 1)))
+        if n_paths:
+            step[noisy] += rng.choice(residuals, noisy.sum())
+        step = np.maximum(step, 0)
+        out[:, h] = step
+        buffers = np.column_stack([buffers[:, 1:], step])
+
+    point = out[:n]
+    if not n_paths:
+        return point, None, None
+    paths = out[n:].reshape(n, n_paths, horizon)
+    return point, np.quantile(paths, 0.025, axis=1), np.quantile(paths, 0.975, axis=1)
+
+
+def _holdout_metrics(panel):
+    """
+    Metricas de validacion: modelo ajustado sin los ultimos 28 dias de cada
+    serie y evaluado sobre ellos.  Devuelve (globales, por medicamento).
+    """
+    from src.services.forecast_service import _eval_metrics
+
+    eligible = {
+        med_id: s for med_id, s in panel.items()
+        if len(s) >= 2 * _WINDOW + _HOLDOUT_DAYS and _scale(s.values[:-_HOLDOUT_DAYS]) > 0
+    }
+    if not eligible:
+        return {}, {}
+
+    train = {med_id: s.iloc[:-_HOLDOUT_DAYS] for med_id, s in eligible.items()}
+    estimator, _, _ = _fit(train)
+
+    ids = list(train)
+    scales = np.array([_scale(train[i].values) for i in ids])
+    histories = np.vstack([train[i].values[-_WINDOW:] for i in ids]) / scales[:, None]
+    last_dates = pd.DatetimeIndex([train[i].index[-1] for i in ids])
+    point, _, _ = _simulate(estimator, histories, last_dates, _HOLDOUT_DAYS)
+    point *= scales[:, None]
+
+    by_med = {}
+    abs_err, real = 0.0, 0.0
+    for row, med_id in enumerate(ids):
+        actual = eligible[med_id].values[-_HOLDOUT_DAYS:]
+        by_med[med_id] = {**_eval_metrics(actual, point[row]), "n_folds": 1}
+        abs_err += float(np.abs(actual - point[row]).sum())
+        real += float(np.abs(actual).sum())
+
+    overall = {
+        m: float(np.mean([v[m] for v in by_med.values()])) for m in ("mae", "rmse", "r2")
+    }
+    overall["mape"] = abs_err / real * 100 if real > 0 else 0.0  # WMAPE del catalogo
+    overall["n_series"] = len(by_med)
+    return overall, by_med
+
+
+# ---------------------------------------------------------------------------
+# 3. Entrenamiento nocturno
+# ---------------------------------------------------------------------------
+
+def train_global_model(db, months_back=24, medication_ids=None):
+    """
+    Entrena el modelo global sobre el catalogo y lo registra.
+
+    Returns
+    -------
+    dict
+        Resumen: version, series y filas de entrenamiento y metricas de holdout.
+    """
+    from src.services.forecast_service import _store_model
+
+    ids = medication_ids if medication_ids is not None else _all_medication_ids(db)
+    panel = _load_panel(db, ids, months_back)
+
+    metrics, metrics_by_med = _holdout_metrics(panel)
+    estimator, residuals, n_rows = _fit(panel)
+
+    version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    artifact = {
+        "estimator": estimator,
+        "residuals": residuals,
+        "features": FEATURE_NAMES,
+        "metrics": metrics,
+        "metrics_by_medication": metrics_by_med,
+        "trained_at": datetime.utcnow().isoformat(),
+        "n_series": len(panel),
+        "n_rows": n_rows,
+        "months_back": months_back,
+    }
+    summary = {
+        "version": version,
+        "n_series": len(panel),
+        "n_rows": n_rows,
+        "metrics": metrics,
+    }
+    _store_model(db, None, MODEL_TYPE, version, artifact, parameters=summary)
+    logger.info(
+        "Modelo global %s entrenado: %d series, %d filas, WMAPE holdout %s",
+        version, len(panel), n_rows, metrics.get("mape"),
+    )
+    return summary
+
+
+def load_global_model(db):
+    """Ultimo modelo global registrado como (version, artefacto), o (None, None)."""
+    from src.services.forecast_service import _latest_model_hash, _load_model
+
+    version = _latest_model_hash(db, None, MODEL_TYPE)
+    if version is None:
+        return None, None
+    return version, _load_model(db, None, MODEL_TYPE, version)
+
+
+# ---------------------------------------------------------------------------
+# 4. Prediccion en lote
+# ---------------------------------------------------------------------------
+
+def predict_global(db, medication_ids=None, horizon_days=30, months_back=24):
+    """
+    Pronostica todos los medicamentos pedidos con una unica simulacion en lote.
+
+    Returns
+    -------
+    (dict, dict)
+        Resultados por medicamento (formato de ``run_arima_forecast``) y
+        errores por medicamento (datos insuficientes).
+
+    Raises
+    ------
+    RuntimeError
+        Si todavia no hay un modelo global entrenado.
+    """
+    with span("global.load"):
+        version, artifact = load_global_model(db)
+    if artifact is None:
+        raise RuntimeError("Modelo global no entrenado. Ejecuta la tarea train_global_forecast_model.")
+
+    ids = medication_ids if medication_ids is not None else _all_medication_ids(db)
+    panel = _load_panel(db, ids, months_back)
+    errors = {med_id: "Sin consumo registrado" for med_id in ids if med_id not in panel}
+
+    ready = {}
+    for med_id, series in panel.items():
+        if len(series) < _WINDOW:
+            errors[med_id] = f"Datos insuficientes para global: {len(series)} dias (minimo {_WINDOW})"
+        else:
+            ready[med_id] = series
+    if not ready:
+        return {}, errors
+
+    order = list(ready)
+    scales = np.array([_scale(ready[i].values) for i in order])
+    safe = np.where(scales > 0, scales, 1.0)
+    histories = np.vstack([ready[i].values[-_WINDOW:] for i in order]) / safe[:, None]
+    last_dates = pd.DatetimeIndex([ready[i].index[-1] for i in order])
+
+    with span("global.predict"):
+        point, lower, upper = _simulate(
+            artifact["estimator"], histories, last_dates, horizon_days,
+            residuals=artifact["residuals"], n_paths=_N_PATHS,
+        )
+
+    parameters = {
+        "model_version": version,
+        "trained_at": artifact["trained_at"],
+        "n_series": artifact["n_series"],
+        "features": artifact["features"],
+        "interval": "residual_bootstrap",
+        "n_paths": _N_PATHS,
+        "validation": "global_holdout_28d",
+    }
+    results = {}
+    for row, med_id in enumerate(order):
+        factor = scales[row]  # serie sin consumo: pronostico 0
+        metrics = artifact["metrics_by_medication"].get(med_id) or artifact["metrics"]
+        results[med_id] = {
+            "model_type": MODEL_TYPE,
+            "parameters": {**parameters, "scale": float(factor)},
+            "metrics": {**metrics, "validation": "global_holdout_28d"},
+            "dates": pd.date_range(start=last_dates[row] + timedelta(days=1), periods=horizon_days, freq="D"),
+            "values": point[row] * factor,
+            "lower_ci": lower[row] * factor,
+            "upper_ci": upper[row] * factor,
+        }
+    return results, errors
+
+
+def run_global_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """Pronostico de un medicamento con el modelo global (firma del ForecastModelFactory)."""
+    results, errors = predict_global(db, [medication_id], horizon_days, months_back)
+    if medication_id not in results:
+        raise ValueError(errors.get(medication_id, "Datos insuficientes para el modelo global"))
+    return results[medication_id]
+
+
+def forecast_catalog_global(db, horizon_days=30, months_back=24, medication_ids=None):
+    """
+    Pronostica y persiste (``save_forecast``) todo el catalogo en un lote.
+
+    Como ``forecast_medication``, ajusta hasta ``fit_horizon(horizon_days)``
+    y guarda los runs con la clave de la cache de resultados (months_back y
+    hash de la serie, tomado antes de predecir), de modo que las peticiones
+    posteriores de cualquier horizonte los reutilizan.
+
+    Returns
+    -------
+    list[dict]
+        Estados por medicamento, en el formato de ``forecast_medication``.
+    """
+    from src.services.forecast_service import fit_horizon, save_forecast, series_fingerprint
+
+    ids = medication_ids if medication_ids is not None else _all_medication_ids(db)
+    hashes = {med_id: series_fingerprint(db, med_id, months_back) for med_id in ids}
+    results, errors = predict_global(db, ids, fit_horizon(horizon_days), months_back)
+    statuses = [
+        {"medication_id": med_id, "status": "failed", "error": error}
+        for med_id, error in errors.items()
+    ]
+    for med_id, result in results.items():
+        try:
+            run = save_forecast(
+                db, med_id, result,
+                months_back=months_back, series_hash=hashes[med_id], horizon_days=horizon_days,
+            )
+        except Exception as e:
+            db.rollback()
+            statuses.append({"medication_id": med_id, "status": "failed", "error": str(e)})
+            continue
+        statuses.append({
+            "medication_id": med_id,
+            "status": "success",
+            "run_id": run.id,
+            "risk_level": run.alert_level,
+            "mape": result["metrics"].get("mape"),
+        })
+    return statuses
@@ -0,0 +1,347 @@
+"""
+Modelos de forecasting ligeros y vectorizados.
+
+Buena parte del catalogo tiene demanda baja e intermitente, donde
+auto_arima y Prophet tardan decenas de segundos sin ser mas precisos.
+Estos modelos operan sobre una matriz ``Y`` (series x dias) y pronostican
+todas las filas en una sola llamada: el bucle es sobre el tiempo y cada
+paso es una operacion NumPy sobre todas las series a la vez.
+
+Modelos
+-------
+- ``"croston"`` / ``"sba"`` / ``"tsb"`` : demanda intermitente (Croston,
+  Syntetos-Boylan Approximation y Teunter-Syntetos-Babai).
+- ``"holt_winters"``   : suavizado exponencial aditivo con tendencia
+  amortiguada y estacionalidad semanal; (alpha, beta, gamma) se eligen por
+  serie en una rejilla pequena minimizando el error a un paso.
+- ``"seasonal_naive"`` : repite la ultima semana observada.
+
+Intervalos
+----------
+Se derivan de la desviacion de los errores a un paso (sigma) con la
+varianza a h pasos de cada familia (ETS para Croston/Holt-Winters,
+numero de temporadas para el naive estacional), al 95%.
+
+Uso
+---
+    fc = forecast_matrix("sba", Y, horizon=30)      # fc["values"].shape == (n, 30)
+    fn = ForecastModelFactory.create("sba")         # misma firma que ARIMA
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+SEASON_LENGTH = 7
+_Z95 = 1.959964
+
+# Suavizado de Croston/SBA/TSB (valores habituales en la literatura)
+_CROSTON_ALPHA = 0.1
+_TSB_BETA = 0.1
+
+# Rejilla Holt-Winters: (alpha, beta, gamma) en forma de correccion de error (beta <= alpha)
+_HW_PHI = 0.98
+_HW_GRID = [
+    (alpha, beta, gamma)
+    for alpha in (0.05, 0.2, 0.5)
+    for beta in (0.0, 0.01)
+    for gamma in (0.05, 0.2)
+]
+
+_MIN_DAYS = 2 * SEASON_LENGTH
+
+
+# ---------------------------------------------------------------------------
+# 1. Nucleos vectorizados (matriz series x dias)
+# ---------------------------------------------------------------------------
+
+def _as_matrix(Y):
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[None, :]
+    return np.nan_to_num(Y, nan=0.0)
+
+
+def _intervals(point, var):
+    """Intervalo al 95% (consumo no negativo) a partir de la varianza por paso."""
+    half = _Z95 * np.sqrt(var)
+    return {
+        "values": np.maximum(point, 0),
+        "lower": np.maximum(point - half, 0),
+        "upper": np.maximum(point + half, 0),
+    }
+
+
+def croston_matrix(Y, horizon, variant="sba", alpha=_CROSTON_ALPHA, beta=_TSB_BETA):
+    """
+    Croston y variantes para demanda intermitente.
+
+    Parameters
+    ----------
+    Y : array (n_series, n_days)
+    variant : {"croston", "sba", "tsb"}
+        ``croston`` = tamano / intervalo; ``sba`` corrige su sesgo con
+        (1 - alpha/2); ``tsb`` suaviza la probabilidad de demanda en cada
+        periodo, por lo que decae cuando un medicamento deja de usarse.
+
+    Returns
+    -------
+    dict
+        ``values``, ``lower``, ``upper`` (n_series, horizon), ``sigma`` y ``params``.
+    """
+    if variant not in ("croston", "sba", "tsb"):
+        raise ValueError(f"Variante Croston desconocida: {variant}")
+
+    Y = _as_matrix(Y)
+    n, T = Y.shape
+    demand = Y > 0
+    counts = demand.sum(axis=1)
+
+    # Inicializacion: tamano medio de la demanda no nula, intervalo y probabilidad medios
+    size = np.where(counts > 0, Y.sum(axis=1) / np.maximum(counts, 1), 0.0)
+    interval = np.where(counts > 0, T / np.maximum(counts, 1), 1.0)
+    prob = counts / T
+    since = np.zeros(n)
+
+    def _point():
+        if variant == "tsb":
+            return prob * size
+        rate = size / interval
+        return rate * (1 - alpha / 2) if variant == "sba" else rate
+
+    sq_err = np.zeros(n)
+    for t in range(T):
+        y, occurred = Y[:, t], demand[:, t]
+        err = y - _point()
+        sq_err += err * err
+
+        since += 1
+        size = np.where(occurred, size + alpha * (y - size), size)
+        if variant == "tsb":
+            prob = prob + beta * (occurred - prob)
+        else:
+            interval = np.where(occurred, interval + alpha * (since - interval), interval)
+        since = np.where(occurred, 0.0, since)
+
+    sigma = np.sqrt(sq_err / T)
+    steps = np.arange(horizon)
+    point = np.repeat(_point()[:, None], horizon, axis=1)
+    var = sigma[:, None] ** 2 * (1 + steps[None, :] * alpha ** 2)
+
+    params = {"alpha": alpha, "variant": variant}
+    if variant == "tsb":
+        params["beta"] = beta
+    return {**_intervals(point, var), "sigma": sigma, "params": params}
+
+
+def _holt_winters_pass(Y, m, alpha, beta, gamma, phi):
+    """Un recorrido Holt-Winters aditivo (tendencia amortiguada) con parametros fijos."""
+    n, T = Y.shape
+    level = Y[:, :m].mean(axis=1)
+    trend = (Y[:, m:2 * m].mean(axis=1) - level) / m
+    season = Y[:, :m] - level[:, None]  # season[:, t % m] = indice estacional del dia t
+
+    sq_err = np.zeros(n)
+    for t in range(m, T):
+        k = t % m
+        err = Y[:, t] - (level + phi * trend + season[:, k])
+        sq_err += err * err
+        level = level + phi * trend + alpha * err
+        trend = phi * trend + beta * err
+        season[:, k] = season[:, k] + gamma * err
+
+    return level, trend, season, np.sqrt(sq_err / max(T - m, 1))
+
+
+def holt_winters_matrix(Y, horizon, season_length=SEASON_LENGTH, phi=_HW_PHI):
+    """
+    Holt-Winters aditivo con estacionalidad semanal para todas las series.
+
+    Cada combinacion de la rejilla se evalua sobre la matriz completa y se
+    elige, por serie, la de menor error a un paso.  La varianza a h pasos es
+    la de ETS(A,Ad,A): sigma^2 * (1 + sum_j c_j^2), con
+    c_j = alpha + beta * phi_j + gamma * [j mod m == 0].
+
+    Returns
+    -------
+    dict
+        ``values``, ``lower``, ``upper`` (n_series, horizon), ``sigma`` y ``params``.
+    """
+    Y = _as_matrix(Y)
+    n, T = Y.shape
+    m = season_length
+    if T < 2 * m:
+        raise ValueError(f"Holt-Winters requiere al menos {2 * m} dias")
+
+    passes = [_holt_winters_pass(Y, m, a, b, g, phi) for a, b, g in _HW_GRID]
+    sigmas = np.stack([p[3] for p in passes])
+    best = np.argmin(sigmas, axis=0)
+    rows = np.arange(n)
+
+    level = np.stack([p[0] for p in passes])[best, rows]
+    trend = np.stack([p[1] for p in passes])[best, rows]
+    season = np.stack([p[2] for p in passes])[best, rows]
+    sigma = sigmas[best, rows]
+    grid = np.asarray(_HW_GRID)
+    alpha, beta, gamma = grid[best, 0], grid[best, 1], grid[best, 2]
+
+    h = np.arange(1, horizon + 1)
+    phi_h = np.cumsum(phi ** h)
+    point = (
+        level[:, None]
+        + phi_h[None, :] * trend[:, None]
+        + season[:, (T - 1 + h) % m]
+    )
+
+    c = alpha[:, None] + beta[:, None] * phi_h[None, :] + gamma[:, None] * (h % m == 0)[None, :]
+    cum = np.concatenate([np.zeros((n, 1)), np.cumsum(c[:, :-1] ** 2, axis=1)], axis=1)
+    var = sigma[:, None] ** 2 * (1 + cum)
+
+    params = {"alpha": alpha, "beta": beta, "gamma": gamma, "phi": phi, "season_length": m}
+    return {**_intervals(point, var), "sigma": sigma, "params": params}
+
+
+def seasonal_naive_matrix(Y, horizon, season_length=SEASON_LENGTH):
+    """
+    Naive estacional: cada dia futuro repite el mismo dia de la ultima semana.
+
+    La varianza crece con el numero de temporadas recorridas: sigma^2 * (floor((h-1)/m) + 1).
+    """
+    Y = _as_matrix(Y)
+    m = season_length
+    if Y.shape[1] < 2 * m:
+        raise ValueError(f"Naive estacional requiere al menos {2 * m} dias")
+
+    steps = np.arange(horizon)
+    point = Y[:, -m:][:, steps % m]
+    resid = Y[:, m:] - Y[:, :-m]
+    sigma = np.sqrt(np.mean(resid ** 2, axis=1))
+    var = sigma[:, None] ** 2 * (steps // m + 1)[None, :]
+
+    return {**_intervals(point, var), "sigma": sigma, "params": {"season_length": m}}
+
+
+_KERNELS = {
+    "croston":        lambda Y, h: croston_matrix(Y, h, variant="croston"),
+    "sba":            lambda Y, h: croston_matrix(Y, h, variant="sba"),
+    "tsb":            lambda Y, h: croston_matrix(Y, h, variant="tsb"),
+    "holt_winters":   holt_winters_matrix,
+    "seasonal_naive": seasonal_naive_matrix,
+}
+
+
+def forecast_matrix(model_type, Y, horizon):
+    """
+    Pronostica todas las filas de ``Y`` con un modelo ligero.
+
+    Raises
+    ------
+    ValueError
+        Si ``model_type`` no es un modelo ligero.
+    """
+    kernel = _KERNELS.get(model_type)
+    if kernel is None:
+        raise ValueError(f"Modelo ligero '{model_type}' desconocido. Opciones: {list(_KERNELS)}")
+    return kernel(Y, horizon)
+
+
+# ---------------------------------------------------------------------------
+# 2. Funciones con la firma del ForecastModelFactory
+# ---------------------------------------------------------------------------
+
+def _scalar_params(params):
+    """Parametros de la fila 0 como tipos JSON."""
+    out = {}
+    for k, v in params.items():
+        if isinstance(v, np.ndarray):
+            v = v[0]
+        out[k] = v.item() if isinstance(v, np.generic) else v
+    return out
+
+
+def _run_lightweight(model_type, db, medication_id, horizon_days, months_back):
+    """Pronostico de un medicamento con el mismo formato de resultado que ARIMA."""
+    from src.services.forecast_service import _walk_forward_metrics, get_consumption_series
+
+    series = get_consumption_series(db, medication_id, months_back=months_back, freq="D")
+    if len(series) < _MIN_DAYS:
+        raise ValueError(
+            f"Datos insuficientes para {model_type}: {len(series)} dias (minimo {_MIN_DAYS})"
+        )
+
+    def _fit_predict(train, n_periods):
+        return forecast_matrix(model_type, train.values, n_periods)["values"][0]
+
+    # Cada ajuste tarda milisegundos: paralelizar los folds costaria mas que ejecutarlos
+    with span(f"{model_type}.validation"):
+        wf_metrics = _walk_forward_metrics(series, _fit_predict, n_splits=5, test_window=14, n_jobs=1)
+    wf_metrics["validation"] = "walk_forward_5_folds"
+
+    with span(f"{model_type}.fit"):
+        fc = forecast_matrix(model_type, series.values, horizon_days)
+    dates = pd.date_range(start=series.index[-1] + timedelta(days=1), periods=horizon_days, freq="D")
+
+    return {
+        "model_type": model_type,
+        "parameters": {
+            **_scalar_params(fc["params"]),
+            "sigma": float(fc["sigma"][0]),
+            "validation": "walk_forward_5_folds",
+        },
+        "metrics": wf_metrics,
+        "dates": dates,
+        "values": fc["values"][0],
+        "lower_ci": fc["lower"][0],
+        "upper_ci": fc["upper"][0],
+    }
+
+
+def run_croston_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """Croston clasico (tamano / intervalo entre demandas)."""
+    return _run_lightweight("croston", db, medication_id, horizon_days, months_back)
+
+
+def run_sba_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """Croston con correccion de sesgo de Syntetos-Boylan."""
+    return _run_lightweight("sba", db, medication_id, horizon_days, months_back)
+
+
+def run_tsb_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """Teunter-Syntetos-Babai: probabilidad de demanda suavizada en cada dia."""
+    return _run_lightweight("tsb", db, medication_id, horizon_days, months_back)
+
+
+def run_holt_winters_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """Holt-Winters aditivo con estacionalidad semanal."""
+    return _run_lightweight("holt_winters", db, medication_id, horizon_days, months_back)
+
+
+def run_seasonal_naive_forecast(db, medication_id, horizon_days=30, months_back=24):
+    """Naive estacional semanal."""
+    return _run_lightweight("seasonal_naive", db, medication_id, horizon_days, months_back)
+
+
+LIGHTWEIGHT_MODELS = {
+    "croston":        run_croston_forecast,
+    "sba":            run_sba_forecast,
+    "tsb":            run_tsb_forecast,
+    "holt_winters":   run_holt_winters_forecast,
+    "seasonal_naive": run_seasonal_naive_forecast,
+}
+
+
+def register_lightweight_models() -> None:
+    """Registra los modelos ligeros en el ForecastModelFactory."""
+    from src.core.factory import ForecastModelFactory
+
+    for name, fn in LIGHTWEIGHT_MODELS.items():
+        ForecastModelFactory.register(name, fn)
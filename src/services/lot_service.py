@@ -26,7 +26,7 @@ def get_lots(
         query = query.filter(Lot.status == status_filter)
     if medication_id is not None:
         query = query.filter(Lot.medication_id == medication_id)
-    return query.order_by(Lot.created_at.desc()).offset(skip).limit(limit).unique().all()
+    return query.order_by(Lot.created_at.desc()).offset(skip).limit(limit).all()
 
 
 def get_lot_by_id(db: Session, lot_id: int) -> Optional[Lot]:
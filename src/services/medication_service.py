@@ -11,6 +11,7 @@ from src.exceptions import (
     CategoryNotFoundError, IntakeTypeNotFoundError,
     ConditionNotFoundError, MedicationNotFoundError
 )
+from src.services.forecast_service import on_stock_change
 
 logger = logging.getLogger(__name__)
 
@@ -96,6 +97,10 @@ def update_medication(db: Session, medication_id: int, update_data: MedicationUp
     except Exception:
         db.rollback()
         raise
+
+    if {"stock", "min_stock"} & update_dict.keys():
+        # Ajuste manual de stock: alertas de forecast al día sin reajustar modelos
+        on_stock_change(db, [medication_id])
     return db_medication
 
 
@@ -7,6 +7,7 @@ from src.models.order import Order, OrderCreate, OrderUpdate, OrderStatus
 from src.models.medication import Medication
 from src.models.user import User
 from src.exceptions import MedicationNotFoundError, OrderNotFoundError
+from src.services.forecast_service import on_stock_change
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +98,10 @@ def update_order_status(
     except Exception:
         db.rollback()
         raise
+
+    if new_status == OrderStatus.RECEIVED:
+        # El stock cambió: alertas de forecast al día sin reajustar modelos
+        on_stock_change(db, [order.medication_id])
     return order
 
 
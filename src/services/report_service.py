@@ -59,7 +59,6 @@ def generate_report(
 
 def _build_report_data(db: Session, report_type: ReportType, parameters: dict) -> dict:
     from src.models.medication import Medication
-    from src.models.movement import Movement
     from src.models.prediction import Prediction
 
     if report_type == ReportType.INVENTORY:
@@ -79,16 +78,11 @@ def _build_report_data(db: Session, report_type: ReportType, parameters: dict) -
         }
 
     elif report_type == ReportType.MOVEMENTS:
-        movements = db.query(
-            Movement.type,
-            func.count(Movement.id).label("count"),
-            func.sum(Movement.quantity).label("total_quantity")
-        ).group_by(Movement.type).all()
+        # Totales desde el rollup diario (O(dias), no O(movimientos))
+        from src.repositories import DailyConsumptionRepository
+
         return {
-            "movements": [
-                {"type": m.type, "count": m.count, "total_quantity": float(m.total_quantity or 0)}
-                for m in movements
-            ],
+            "movements": DailyConsumptionRepository(db).get_totals_by_type(),
             "period": parameters.get("period", "all")
         }
 
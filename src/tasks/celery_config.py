@@ -1,4 +1,8 @@
+import os
+
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_init
 from src.core.config import settings
 
 REDIS_URL = getattr(settings, "REDIS_URL", "redis://localhost:6379/0")
@@ -23,3 +27,18 @@ celery_app.conf.update(
     task_acks_late=True,
     worker_prefetch_multiplier=1,
 )
+
+@worker_process_init.connect
+def _sequential_walk_forward(**kwargs):
+    # Cada proceso del worker ejecuta su propio forecast: folds walk-forward
+    # secuenciales para no abrir un pool loky por tarea
+    os.environ["FORECAST_WF_N_JOBS"] = "1"
+
+
+# Tareas periodicas (requiere `celery -A src.tasks.celery_config beat`)
+celery_app.conf.beat_schedule = {
+    "train-global-forecast-model-nightly": {
+        "task": "src.tasks.tasks.train_global_forecast_model",
+        "schedule": crontab(hour=2, minute=0),
+    },
+}
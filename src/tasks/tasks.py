@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from celery import chord, group
 from sqlalchemy.orm import Session
 import logging
 
@@ -9,6 +10,7 @@ from src.models.movement import Movement
 from src.models.notification import Notification, NotificationLevel, NotificationType
 from src.models.user import User, Role
 from src.core.database import SessionLocal
+from src.services.forecast_batch_service import forecast_medication, medications_to_refresh, summarize_batch
 
 logger = logging.getLogger(__name__)
 
@@ -22,31 +24,117 @@ def _get_db() -> Session:
 
 
 @celery_app.task(bind=True, max_retries=3)
-def generate_predictions_for_all_medications(self):
-    from src.services.prediction_service import predict_shortage_risk
-
+def generate_predictions_for_all_medications(self, model_type: str = "ensemble",
+                                             horizon_days: int = 30, months_back: int = 24,
+                                             only_changed: bool = True):
+    """
+    Fan-out: una tarea por medicamento y un paso final que agrega y envia alertas.
+
+    Con ``only_changed`` (por defecto) solo entran los medicamentos con
+    movimientos nuevos desde su ultimo forecast o con un forecast mas
+    antiguo que FORECAST_REFRESH_MAX_AGE_HOURS; con False, todo el catalogo.
+    """
     db = _get_db()
     try:
-        medications = db.query(Medication).all()
-        results = []
-        for med in medications:
-            try:
-                result = predict_shortage_risk(db=db, medication_id=med.id, days_ahead=30)
-                results.append({"medication_id": med.id, "status": "success", "risk_level": result.get("risk_level")})
-            except Exception as e:
-                logger.error("Error predicting for medication %s: %s", med.id, str(e))
-                results.append({"medication_id": med.id, "status": "failed", "error": str(e)})
+        if only_changed:
+            medication_ids = medications_to_refresh(db)
+        else:
+            medication_ids = [m.id for m in db.query(Medication.id).all()]
+    except Exception as e:
+        logger.error("Error in generate_predictions_for_all_medications: %s", str(e))
+        raise self.retry(exc=e, countdown=300)
+    finally:
+        db.close()
+
+    if not medication_ids:
+        return {"total": 0, "batch_id": None}
+
+    header = group(
+        forecast_medication_task.s(med_id, model_type, horizon_days, months_back)
+        for med_id in medication_ids
+    )
+    batch = chord(header)(finalize_forecast_batch.s())
+    return {"total": len(medication_ids), "batch_id": batch.id}
+
 
+@celery_app.task
+def forecast_medication_task(medication_id: int, model_type: str = "ensemble",
+                             horizon_days: int = 30, months_back: int = 24):
+    # forecast_medication captura sus errores: una falla no rompe el chord
+    return forecast_medication(medication_id, model_type, horizon_days, months_back)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def finalize_forecast_batch(self, results: list):
+    db = _get_db()
+    try:
         _send_bulk_alert_notifications(db, results)
-        return {"total": len(medications), "results": results}
+        return {**summarize_batch(results), "results": results}
 
     except Exception as e:
-        logger.error("Error in generate_predictions_for_all_medications: %s", str(e))
+        logger.error("Error in finalize_forecast_batch: %s", str(e))
         raise self.retry(exc=e, countdown=300)
     finally:
         db.close()
 
 
+@celery_app.task(bind=True, max_retries=3)
+def run_forecast_job(self, medication_id: int, model_type: str = "ensemble",
+                     horizon_days: int = 30, months_back: int = 24):
+    from src.core.factory import ForecastModelFactory
+    from src.services.forecast_service import fit_horizon, save_forecast, series_fingerprint
+
+    db = _get_db()
+    try:
+        fn = ForecastModelFactory.create(model_type)
+        series_hash = series_fingerprint(db, medication_id, months_back)
+        result = fn(db, medication_id, fit_horizon(horizon_days), months_back)
+        run = save_forecast(
+            db, medication_id, result,
+            months_back=months_back, series_hash=series_hash, horizon_days=horizon_days,
+        )
+        return {
+            "run_id": run.id,
+            "medication_id": medication_id,
+            "model_type": model_type,
+            "alert_level": run.alert_level,
+        }
+
+    except ValueError:
+        # Datos insuficientes o modelo invalido: reintentar no cambia el resultado
+        raise
+    except Exception as e:
+        logger.error("Error in run_forecast_job for medication %s: %s", medication_id, str(e))
+        raise self.retry(exc=e, countdown=60)
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, max_retries=2)
+def train_global_forecast_model(self, months_back: int = 24, horizon_days: int = 30,
+                                forecast: bool = True):
+    """Entrenamiento nocturno del modelo global y forecast del catalogo en un lote."""
+    from src.services.global_forecast_service import forecast_catalog_global, train_global_model
+
+    db = _get_db()
+    try:
+        summary = train_global_model(db, months_back=months_back)
+        if forecast:
+            results = forecast_catalog_global(db, horizon_days=horizon_days, months_back=months_back)
+            _send_bulk_alert_notifications(db, results)
+            summary["batch"] = summarize_batch(results)
+        return summary
+
+    except ValueError:
+        # Sin datos suficientes en el catalogo: reintentar no cambia el resultado
+        raise
+    except Exception as e:
+        logger.error("Error in train_global_forecast_model: %s", str(e))
+        raise self.retry(exc=e, countdown=600)
+    finally:
+        db.close()
+
+
 @celery_app.task(bind=True, max_retries=3)
 def check_low_stock_medications(self):
     db = _get_db()
@@ -33,6 +33,7 @@ from src.models.password_reset_token import PasswordResetToken
 from src.models.notification import Notification, NotificationType, NotificationLevel
 from src.models.order import Order, OrderStatus
 from src.models.report import Report, ReportType, ReportFormat, ReportStatus
+from src.models.forecast import ForecastRun, ForecastPoint
 
 # Create a shared in-memory SQLite engine for tests (StaticPool = one DB shared by all connections)
 TEST_ENGINE = create_engine(
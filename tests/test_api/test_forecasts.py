@@ -0,0 +1,251 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlmodel import Session, select
+from src.core.forecast_executor import forecast_executor
+from src.dependencies.auth import get_current_user
+from src.main import app
+from src.models.category import Category
+from src.models.forecast import ForecastRun
+from src.models.intake_type import IntakeType
+from src.models.medication import Medication
+from src.models.movement import Movement, MovementType
+
+
+@pytest.fixture()
+def category(db: Session):
+    cat = Category(name="Forecast Category", description="For forecast tests")
+    db.add(cat)
+    db.commit()
+    db.refresh(cat)
+    yield cat
+    db.delete(cat)
+    db.commit()
+
+
+@pytest.fixture()
+def intake_type(db: Session):
+    it = IntakeType(name="Forecast Intake", description="For forecast tests")
+    db.add(it)
+    db.commit()
+    db.refresh(it)
+    yield it
+    db.delete(it)
+    db.commit()
+
+
+@pytest.fixture()
+def medication(db: Session, category: Category, intake_type: IntakeType):
+    med = Medication(
+        name="ForecastMed",
+        stock=50,
+        min_stock=5,
+        unit="units",
+        status="Activo",
+        price=1.0,
+        category_id=category.id,
+        intake_type_id=intake_type.id,
+    )
+    db.add(med)
+    db.commit()
+    db.refresh(med)
+    yield med
+    db.delete(med)
+    db.commit()
+
+
+@pytest.fixture()
+def auth_client(client, regular_user):
+    # Evita el login (rate-limited) inyectando directamente el usuario
+    app.dependency_overrides[get_current_user] = lambda: regular_user
+    yield client
+
+
+@pytest.fixture()
+def saturated_executor(monkeypatch):
+    capacity = forecast_executor.max_workers + forecast_executor.queue_size
+    monkeypatch.setattr(forecast_executor, "_in_flight", capacity)
+    yield forecast_executor
+
+
+class TestRunForecast:
+    def test_requires_authentication(self, client, medication):
+        response = client.post(f"/api/v1/forecasts/{medication.id}")
+        assert response.status_code == 401
+
+    def test_unknown_model_returns_422(self, auth_client, medication):
+        response = auth_client.post(f"/api/v1/forecasts/{medication.id}?model=random_forest")
+        assert response.status_code == 422
+
+    def test_full_queue_returns_503_with_retry_after(self, auth_client, medication, saturated_executor):
+        response = auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(saturated_executor.retry_after)
+        # El contador no debe quedar alterado por el rechazo
+        assert saturated_executor.in_flight == (
+            saturated_executor.max_workers + saturated_executor.queue_size
+        )
+
+
+class TestPredictEndpointExecutor:
+    def test_full_queue_returns_503(self, auth_client, medication, saturated_executor):
+        response = auth_client.get(f"/api/v1/predictions/predict/?medicamento_id={medication.id}")
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+
+class TestAsyncForecastJobs:
+    def test_async_mode_returns_202_with_job_id(self, auth_client, medication, monkeypatch):
+        from src.tasks import tasks
+
+        calls = []
+
+        class _FakeResult:
+            id = "job-123"
+
+        def fake_delay(*args):
+            calls.append(args)
+            return _FakeResult()
+
+        monkeypatch.setattr(tasks.run_forecast_job, "delay", fake_delay)
+        response = auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima&async=true")
+        assert response.status_code == 202
+        data = response.json()
+        assert data["job_id"] == "job-123"
+        assert data["status"] == "queued"
+        assert calls == [(medication.id, "arima", 30, 24)]
+
+    def test_job_status_reports_done_with_run_id(self, auth_client, monkeypatch):
+        from src.tasks.celery_config import celery_app
+
+        class _FakeAsyncResult:
+            state = "SUCCESS"
+            result = {"run_id": 42, "medication_id": 1}
+
+        monkeypatch.setattr(celery_app, "AsyncResult", lambda job_id: _FakeAsyncResult())
+        response = auth_client.get("/api/v1/forecasts/jobs/job-123")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "done"
+        assert data["run_id"] == 42
+
+
+@pytest.fixture()
+def consumption(db: Session, medication: Medication):
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    movements = [
+        Movement(
+            medication_id=medication.id, type=MovementType.OUT,
+            quantity=float(2 + i % 3), date=today - timedelta(days=i + 1),
+        )
+        for i in range(60)
+    ]
+    db.add_all(movements)
+    db.commit()
+    yield movements
+    for run in db.exec(select(ForecastRun).where(ForecastRun.medication_id == medication.id)).all():
+        db.delete(run)
+    for m in movements:
+        db.delete(m)
+    db.commit()
+
+
+@pytest.fixture()
+def fake_model(monkeypatch):
+    calls = []
+
+    async def run_model(model_type, medication_id, horizon_days, months_back):
+        calls.append((model_type, medication_id, horizon_days, months_back))
+        return {
+            "model_type": model_type,
+            "parameters": {},
+            "metrics": {"mae": 1.0, "mape": 10.0, "rmse": 1.0, "r2": 0.5},
+            "dates": pd.date_range(datetime.utcnow().date(), periods=horizon_days, freq="D"),
+            "values": np.full(horizon_days, 3.0),
+            "lower_ci": np.full(horizon_days, 2.0),
+            "upper_ci": np.full(horizon_days, 4.0),
+        }
+
+    monkeypatch.setattr(forecast_executor, "run_model", run_model)
+    yield calls
+
+
+class TestResultCache:
+    def test_same_inputs_reuse_the_run(self, auth_client, medication, consumption, fake_model, db):
+        url = f"/api/v1/forecasts/{medication.id}?model=arima&horizon_days=14"
+        first = auth_client.post(url).json()
+        second = auth_client.post(url).json()
+
+        assert first["cached"] is False and second["cached"] is True
+        assert second["run_id"] == first["run_id"]
+        assert second["points"] == first["points"]
+        assert len(fake_model) == 1
+        runs = db.exec(select(ForecastRun).where(ForecastRun.medication_id == medication.id)).all()
+        assert len(runs) == 1
+
+    def test_new_consumption_misses(self, auth_client, medication, consumption, fake_model, db):
+        auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima&horizon_days=14")
+
+        consumption[0].quantity += 5
+        db.add(consumption[0])
+        db.commit()
+        auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima&horizon_days=14")
+        assert len(fake_model) == 2
+
+    def test_shorter_horizons_are_sliced_from_one_fit(self, auth_client, medication, consumption, fake_model, db):
+        medication.stock, medication.min_stock = 60, 0
+        db.add(medication)
+        db.commit()
+
+        long_ = auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima&horizon_days=30").json()
+        short = auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima&horizon_days=7").json()
+
+        assert [c[2] for c in fake_model] == [180]
+        assert short["cached"] is True and short["run_id"] == long_["run_id"]
+        assert len(long_["points"]) == 30 and len(short["points"]) == 7
+        assert short["points"] == long_["points"][:7]
+        # 3/dia: 7 dias (21) no agotan el stock de 60, 30 dias (90) si
+        assert short["alert_level"] == "low" and long_["alert_level"] == "high"
+
+        run = db.get(ForecastRun, long_["run_id"])
+        db.refresh(run)
+        assert (run.horizon_days, run.fitted_horizon_days) == (30, 180)
+        assert run.alert_level == "high"
+
+        latest = auth_client.get(f"/api/v1/forecasts/{medication.id}/latest?horizon_days=7").json()
+        assert len(latest["points"]) == 7 and latest["alert_level"] == "low"
+        assert len(auth_client.get(f"/api/v1/forecasts/{medication.id}/latest").json()["points"]) == 30
+
+        history = auth_client.get(f"/api/v1/forecasts/{medication.id}/history?horizon_days=7").json()
+        assert [(r["horizon_days"], r["alert_level"]) for r in history["runs"]] == [(7, "low")]
+        history = auth_client.get(f"/api/v1/forecasts/{medication.id}/history").json()
+        assert [(r["horizon_days"], r["alert_level"]) for r in history["runs"]] == [(30, "high")]
+        # Ningun run cubre 200 dias: no se listan con riesgo inventado
+        assert auth_client.get(f"/api/v1/forecasts/{medication.id}/history?horizon_days=200").json()["runs"] == []
+
+    def test_hit_recomputes_stock_dependent_fields(self, auth_client, medication, consumption, fake_model, db):
+        url = f"/api/v1/forecasts/{medication.id}?model=arima&horizon_days=14"
+        first = auth_client.post(url).json()
+
+        medication.stock = 5
+        db.add(medication)
+        db.commit()
+        second = auth_client.post(url).json()
+
+        assert second["cached"] is True and len(fake_model) == 1
+        assert second["stock_at_forecast"] == 5
+        assert first["alert_level"] == "low" and second["alert_level"] == "high"
+
+    def test_async_hit_returns_run_without_enqueuing(self, auth_client, medication, consumption, fake_model, monkeypatch):
+        from src.tasks import tasks
+
+        def fail_delay(*args):
+            raise AssertionError("no se debe encolar")
+
+        monkeypatch.setattr(tasks.run_forecast_job, "delay", fail_delay)
+        auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima")
+        response = auth_client.post(f"/api/v1/forecasts/{medication.id}?model=arima&async=true")
+        assert response.status_code == 200
+        assert response.json()["cached"] is True
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlmodel import select
+
+from benchmarks.catalog import build_catalog, holdout_wmape, synthetic_series
+from src.models.forecast import ForecastWatermark
+from src.models.medication import Medication
+from src.models.movement import Movement
+from src.services.forecast_service import get_consumption_series
+
+
+def _series(profile, days=400):
+    return synthetic_series(profile, "Analgesico", days, datetime(2025, 1, 1), np.random.default_rng(0))
+
+
+class TestSyntheticSeries:
+    def test_profiles(self):
+        smooth, intermittent, shifted = (_series(p) for p in ("smooth", "intermittent", "trend_shift"))
+        assert (smooth > 0).mean() > 0.95
+        assert 0.2 < (intermittent > 0).mean() < 0.4
+        assert shifted[300:].mean() > 1.4 * shifted[:250].mean()
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            _series("lumpy")
+
+
+class TestBuildCatalog:
+    @pytest.fixture()
+    def catalog(self, db):
+        catalog = build_catalog(db, 3, history_days=120, horizon_days=14, seed=1)
+        yield catalog
+        ids = [item.medication_id for item in catalog]
+        for model in (Movement, ForecastWatermark):
+            for row in db.exec(select(model).where(model.medication_id.in_(ids))).all():
+                db.delete(row)
+        db.commit()
+        for med in db.exec(select(Medication).where(Medication.id.in_(ids))).all():
+            db.delete(med)
+        db.commit()
+
+    def test_history_ends_yesterday_and_holdout_scores(self, db, catalog):
+        assert [item.profile for item in catalog] == ["smooth", "intermittent", "trend_shift"]
+        item = catalog[1]
+        series = get_consumption_series(db, item.medication_id, months_back=5)
+        assert series.index[-1] + pd.Timedelta(days=1) == pd.Timestamp(item.holdout_start)
+
+        dates = pd.date_range(item.holdout_start, periods=14, freq="D")
+        assert holdout_wmape({"dates": dates, "values": item.holdout}, item) == 0.0
+        assert holdout_wmape({"dates": dates, "values": item.holdout * 1.5}, item) == pytest.approx(50.0)
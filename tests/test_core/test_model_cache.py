@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from src.core.model_cache import ModelCache
+
+
+def _age(path, seconds):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return ModelCache(str(tmp_path), max_bytes=10**9, max_files=100, keep_per_medication=2, hot_size=2)
+
+
+class TestModelCache:
+    def test_miss_then_hits(self, cache):
+        path = cache.path(1, "arima", "abc")
+        assert cache.get(path) is None
+        cache.save(path, {"model": 1})
+        assert cache.get(path) == {"model": 1}
+        cache._hot.clear()
+        assert cache.get(path) == {"model": 1}
+        stats = cache.stats()
+        assert (stats["misses"], stats["hot_hits"], stats["disk_hits"]) == (1, 1, 1)
+
+    def test_atomic_write_leaves_no_temp_files(self, cache, tmp_path):
+        cache.save(cache.path(1, "arima", "abc"), [1, 2, 3])
+        assert sorted(os.listdir(tmp_path)) == ["arima_med1_abc.joblib"]
+
+    def test_keeps_latest_k_per_medication(self, cache):
+        for i, h in enumerate(["a1", "a2", "a3"]):
+            cache.save(cache.path(7, "arima", h), h)
+            _age(cache.path(7, "arima", h), 100 - i)
+        cache.save(cache.path(7, "prophet", "p1"), "p1")
+        assert not os.path.exists(cache.path(7, "arima", "a1"))
+        assert os.path.exists(cache.path(7, "arima", "a2"))
+        assert os.path.exists(cache.path(7, "arima", "a3"))
+        assert os.path.exists(cache.path(7, "prophet", "p1"))
+        assert cache.stats()["evictions"] == 1
+
+    def test_global_limit_evicts_least_recently_used(self, tmp_path):
+        cache = ModelCache(str(tmp_path), max_bytes=10**9, max_files=2, keep_per_medication=5, hot_size=0)
+        cache.save(cache.path(1, "arima", "x"), 1)
+        cache.save(cache.path(2, "arima", "x"), 2)
+        _age(cache.path(1, "arima", "x"), 50)
+        _age(cache.path(2, "arima", "x"), 100)
+        cache.get(cache.path(2, "arima", "x"))  # lectura reciente: deja de ser LRU
+        cache.save(cache.path(3, "arima", "x"), 3)
+        assert not os.path.exists(cache.path(1, "arima", "x"))
+        assert os.path.exists(cache.path(2, "arima", "x"))
+        assert os.path.exists(cache.path(3, "arima", "x"))
+
+    def test_hot_tier_is_bounded(self, cache):
+        for h in ["a", "b", "c"]:
+            cache.save(cache.path(1, "prophet", h), h)
+        assert cache.stats()["hot_entries"] == 2
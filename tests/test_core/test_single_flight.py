@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from src.core.single_flight import SingleFlight
+
+
+class FakeRedis:
+    """Subconjunto de redis.asyncio usado por SingleFlight, compartible entre instancias."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+class DownRedis:
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+
+def _single_flight(redis=None):
+    sf = SingleFlight("redis://fake" if redis else None, lock_ttl=60, wait_timeout=5,
+                      result_ttl=60, poll_interval=0.01)
+    sf._redis = redis
+    return sf
+
+
+def _counting_compute(calls, value=42, delay=0.05, error=None):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+    return compute
+
+
+class TestInProcess:
+    def test_concurrent_callers_share_one_computation(self):
+        sf, calls = _single_flight(), []
+
+        async def burst():
+            return await asyncio.gather(*(sf.run("k", _counting_compute(calls)) for _ in range(5)))
+
+        results = asyncio.run(burst())
+        assert len(calls) == 1
+        assert [r[0] for r in results] == [42] * 5
+        assert sum(shared for _, shared in results) == 4
+
+    def test_leader_error_reaches_followers(self):
+        sf, calls = _single_flight(), []
+
+        async def burst():
+            return await asyncio.gather(
+                *(sf.run("k", _counting_compute(calls, error=ValueError("sin datos"))) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(burst())
+        assert len(calls) == 1
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_sequential_calls_recompute(self):
+        sf, calls = _single_flight(), []
+        asyncio.run(sf.run("k", _counting_compute(calls)))
+        asyncio.run(sf.run("k", _counting_compute(calls)))
+        assert len(calls) == 2
+
+
+class TestAcrossWorkers:
+    def test_follower_in_other_worker_waits_for_leader(self):
+        redis, calls = FakeRedis(), []
+        worker_a, worker_b = _single_flight(redis), _single_flight(redis)
+
+        async def both():
+            leader = asyncio.create_task(worker_a.run("k", _counting_compute(calls, value=7, delay=0.1)))
+            await asyncio.sleep(0.02)
+            follower = await worker_b.run("k", _counting_compute(calls, value=8))
+            return await leader, follower
+
+        leader, follower = asyncio.run(both())
+        assert len(calls) == 1
+        assert leader == (7, False) and follower == (7, True)
+        assert "singleflight:lock:k" not in redis.data
+
+    def test_follower_computes_when_leader_fails(self):
+        redis, calls = FakeRedis(), []
+        worker_a, worker_b = _single_flight(redis), _single_flight(redis)
+
+        async def both():
+            leader = asyncio.create_task(
+                worker_a.run("k", _counting_compute(calls, delay=0.05, error=RuntimeError("boom")))
+            )
+            await asyncio.sleep(0.01)
+            follower = await worker_b.run("k", _counting_compute(calls, value=9))
+            with pytest.raises(RuntimeError):
+                await leader
+            return follower
+
+        assert asyncio.run(both()) == (9, False)
+        assert len(calls) == 2
+
+    def test_redis_down_degrades_to_local(self):
+        sf, calls = _single_flight(DownRedis()), []
+        assert asyncio.run(sf.run("k", _counting_compute(calls))) == (42, False)
+        assert sf._get_redis() is None  # en backoff
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from src.core.tracing import cache_flag, current_trace, span, traced_forecast
+
+
+def _model(stages):
+    def run(*args, **kwargs):
+        for name in stages:
+            with span(name):
+                time.sleep(0.01)
+        cache_flag("arima", "local")
+        return {"model_type": "fake", "parameters": {"order": [1, 0, 0]}}
+    return run
+
+
+class TestTracing:
+    def test_span_outside_trace_is_noop(self):
+        with span("load_series"):
+            pass
+        assert current_trace() is None
+
+    def test_traced_forecast_records_stages(self):
+        result = traced_forecast("fake", _model(["load_series", "fit", "load_series"]))()
+        timings = result["parameters"]["timings"]
+        assert result["parameters"]["order"] == [1, 0, 0]
+        assert set(timings["stages"]) == {"load_series", "fit"}
+        assert timings["stages"]["load_series"] >= 0.02
+        assert timings["calls"] == {"load_series": 2}
+        assert timings["cache"] == {"arima": "local"}
+        assert timings["total_s"] >= sum(timings["stages"].values()) - 1e-3
+        assert current_trace() is None
+
+    def test_nested_model_adds_to_outer_trace(self):
+        inner = traced_forecast("inner", _model(["inner.fit"]))
+
+        def outer_run():
+            with span("outer.fit"):
+                result = inner()
+            assert "timings" not in result["parameters"]
+            # Hilos lanzados con el contexto copiado suman a la misma traza
+            with ThreadPoolExecutor(2) as pool:
+                pool.submit(copy_context().run, _model(["member.fit"])).result()
+            return {"parameters": {}}
+
+        timings = traced_forecast("outer", outer_run)()["parameters"]["timings"]
+        assert set(timings["stages"]) == {"outer.fit", "inner.fit", "member.fit"}
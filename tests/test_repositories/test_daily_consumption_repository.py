@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastWatermark
+from src.models.medication import Medication
+from src.models.movement import DailyConsumption, Movement, MovementType
+from src.repositories import DailyConsumptionRepository
+
+
+@pytest.fixture()
+def meds(db: Session):
+    meds = [Medication(name=f"RollupMed{i}", stock=10, unit="units", price=1.0) for i in range(2)]
+    db.add_all(meds)
+    db.commit()
+    for med in meds:
+        db.refresh(med)
+    yield meds
+    ids = [m.id for m in meds]
+    for model in (Movement, ForecastWatermark, DailyConsumption):
+        for row in db.exec(select(model).where(model.medication_id.in_(ids))).all():
+            db.delete(row)
+    db.commit()
+    for med in meds:
+        db.delete(med)
+    db.commit()
+
+
+def _rollup(db, meds):
+    ids = [m.id for m in meds]
+    db.expire_all()
+    rows = db.exec(select(DailyConsumption).where(DailyConsumption.medication_id.in_(ids))).all()
+    return {
+        (r.medication_id, r.day): (r.out_quantity, r.out_count, r.in_quantity, r.in_count)
+        for r in rows
+    }
+
+
+class TestDailyConsumptionRollup:
+    def test_hook_keeps_rollup_in_sync(self, db, meds):
+        a, b = meds
+        day = datetime(2026, 3, 10, 9)
+        out1 = Movement(medication_id=a.id, type=MovementType.OUT, quantity=2.0, date=day)
+        out2 = Movement(medication_id=a.id, type=MovementType.OUT, quantity=3.0, date=day.replace(hour=17))
+        inbound = Movement(medication_id=a.id, type=MovementType.IN, quantity=50.0, date=day)
+        db.add_all([out1, out2, inbound])
+        db.commit()
+        assert _rollup(db, meds) == {(a.id, day.date()): (5.0, 2, 50.0, 1)}
+
+        # Cambio de dia, de medicamento y de tipo: se recalculan celda vieja y nueva
+        out2.date = day + timedelta(days=1)
+        inbound.medication_id = b.id
+        out1.type = MovementType.IN
+        db.add_all([out1, out2, inbound])
+        db.commit()
+        assert _rollup(db, meds) == {
+            (a.id, day.date()): (0.0, 0, 2.0, 1),
+            (a.id, (day + timedelta(days=1)).date()): (3.0, 1, 0.0, 0),
+            (b.id, day.date()): (0.0, 0, 50.0, 1),
+        }
+
+        db.delete(out1)
+        db.commit()
+        expected = _rollup(db, meds)
+        assert (a.id, day.date()) not in expected
+
+        assert DailyConsumptionRepository(db).rebuild([a.id, b.id]) == 2
+        assert _rollup(db, meds) == expected
+
+    def test_movements_report_reads_rollup(self, db, meds):
+        from src.models.report import ReportType
+        from src.services.report_service import _build_report_data
+
+        a, _ = meds
+        before = {m["type"]: m for m in _build_report_data(db, ReportType.MOVEMENTS, {})["movements"]}
+        db.add_all([
+            Movement(medication_id=a.id, type=MovementType.OUT, quantity=4.0, date=datetime(2026, 1, 5)),
+            Movement(medication_id=a.id, type=MovementType.OUT, quantity=1.0, date=datetime(2026, 1, 6)),
+        ])
+        db.commit()
+        after = {m["type"]: m for m in _build_report_data(db, ReportType.MOVEMENTS, {})["movements"]}
+        out_before = before.get(MovementType.OUT, {"count": 0, "total_quantity": 0.0})
+        assert after[MovementType.OUT]["count"] == out_before["count"] + 2
+        assert after[MovementType.OUT]["total_quantity"] == pytest.approx(out_before["total_quantity"] + 5.0)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastPoint, ForecastRun
+from src.models.medication import Medication
+from src.repositories import ForecastRepository
+from src.repositories.forecast_repository import pack_points, unpack_points
+from src.services import forecast_service
+from src.services.forecast_service import save_forecast
+
+
+@pytest.fixture()
+def medication(db: Session):
+    med = Medication(name="PackedPointsMed", stock=10, min_stock=0, unit="units", price=1.0)
+    db.add(med)
+    db.commit()
+    db.refresh(med)
+    yield med
+    for run in db.exec(select(ForecastRun).where(ForecastRun.medication_id == med.id)).all():
+        db.delete(run)
+    db.delete(med)
+    db.commit()
+
+
+@pytest.fixture()
+def repo(db: Session):
+    return ForecastRepository(db)
+
+
+def _forecast_data(horizon, model_type="arima"):
+    values = np.linspace(1.0, 4.0, horizon) + 0.123
+    return {
+        "model_type": model_type,
+        "parameters": {},
+        "metrics": {},
+        "dates": pd.date_range("2026-01-01", periods=horizon, freq="D"),
+        "values": values,
+        "lower_ci": values - 1,
+        "upper_ci": values + 1,
+    }
+
+
+def _save(db, medication, monkeypatch, packed, **data):
+    monkeypatch.setattr(forecast_service, "_PACKED_POINTS", packed)
+    return save_forecast(db, medication.id, _forecast_data(**data))
+
+
+def _as_tuples(points):
+    return [(p.date, round(p.predicted_value, 4), round(p.lower_ci, 4), round(p.upper_ci, 4)) for p in points]
+
+
+def _row_count(db, run):
+    return len(db.exec(select(ForecastPoint).where(ForecastPoint.forecast_run_id == run.id)).all())
+
+
+class TestPackedPoints:
+    def test_pack_roundtrip_keeps_days_and_missing_ci(self):
+        dates = pd.date_range("2026-03-30", periods=3, freq="D")
+        blob = pack_points(dates, [1.5, 2.25, 0.0], [None, 1.0, 0.0], [2.0, None, 0.5])
+        assert len(blob) == 4 * 3 * 4
+
+        days, values, lower, upper = unpack_points(blob)
+        assert days == list(dates.to_pydatetime())
+        assert values.tolist() == [1.5, 2.25, 0.0]
+        assert np.isnan(lower[0]) and np.isnan(upper[1])
+
+    def test_packed_run_reads_like_rows(self, db, repo, medication, monkeypatch):
+        rows_run = _save(db, medication, monkeypatch, packed=False, horizon=45)
+        packed_run = _save(db, medication, monkeypatch, packed=True, horizon=45)
+        assert packed_run.packed_points is not None and _row_count(db, packed_run) == 0
+        assert rows_run.packed_points is None and _row_count(db, rows_run) == 45
+
+        assert _as_tuples(repo.get_run_points(packed_run)) == _as_tuples(repo.get_run_points(rows_run))
+        assert packed_run.days_until_shortage == rows_run.days_until_shortage
+
+    def test_point_values_for_mixed_runs(self, db, repo, medication, monkeypatch):
+        rows_run = _save(db, medication, monkeypatch, packed=False, horizon=10)
+        packed_run = _save(db, medication, monkeypatch, packed=True, horizon=20, model_type="sba")
+
+        values = repo.get_point_values_for_runs([packed_run, rows_run])
+        by_run = {}
+        for run_id, value, _, _ in values:
+            by_run.setdefault(run_id, []).append(round(value, 4))
+        assert len(by_run[rows_run.id]) == 10 and len(by_run[packed_run.id]) == 20
+        assert by_run[packed_run.id][:10] == [round(v, 4) for v in _forecast_data(20)["values"][:10]]
+        # Agrupados por run: cada run aparece en un bloque contiguo
+        run_ids = [v[0] for v in values]
+        assert run_ids == sorted(run_ids, key=run_ids.index)
+
+    def test_existing_rows_are_packed_and_unpacked(self, db, repo, medication, monkeypatch):
+        run = _save(db, medication, monkeypatch, packed=False, horizon=30)
+        before = _as_tuples(repo.get_run_points(run))
+
+        while repo.pack_row_points(batch_size=1):
+            pass
+        db.refresh(run)
+        assert run.packed_points is not None and _row_count(db, run) == 0
+        assert _as_tuples(repo.get_run_points(run)) == before
+
+        while repo.unpack_to_rows(batch_size=1):
+            pass
+        db.refresh(run)
+        assert run.packed_points is None and _row_count(db, run) == 30
+        assert _as_tuples(repo.get_run_points(run)) == before
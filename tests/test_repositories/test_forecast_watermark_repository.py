@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastWatermark
+from src.models.medication import Medication
+from src.models.movement import Movement, MovementType
+from src.repositories import ForecastWatermarkRepository
+
+
+@pytest.fixture()
+def meds(db: Session):
+    meds = [Medication(name=f"WatermarkMed{i}", stock=10, unit="units", price=1.0) for i in range(3)]
+    db.add_all(meds)
+    db.commit()
+    for med in meds:
+        db.refresh(med)
+    yield meds
+    ids = [m.id for m in meds]
+    for mv in db.exec(select(Movement).where(Movement.medication_id.in_(ids))).all():
+        db.delete(mv)
+    db.commit()
+    for wm in db.exec(select(ForecastWatermark)).all():
+        db.delete(wm)
+    for med in meds:
+        db.delete(med)
+    db.commit()
+
+
+@pytest.fixture()
+def repo(db: Session):
+    return ForecastWatermarkRepository(db)
+
+
+def _movement(med, quantity=1.0):
+    return Movement(medication_id=med.id, type=MovementType.OUT, quantity=quantity,
+                    date=datetime.utcnow() - timedelta(days=1))
+
+
+def _candidates(repo, meds, max_age=timedelta(days=7)):
+    ids = {m.id for m in meds}
+    return [m for m in repo.get_refresh_candidates(datetime.utcnow() - max_age) if m in ids]
+
+
+class TestForecastWatermarkRepository:
+    def test_movement_changes_mark_medication_dirty(self, db, repo, meds):
+        a, b, _ = meds
+        mv = _movement(a)
+        db.add(mv)
+        db.commit()
+        first = repo.get(a.id).changed_at
+        assert first is not None and repo.get(b.id) is None
+
+        mv.medication_id = b.id
+        db.add(mv)
+        db.commit()
+        db.expire_all()
+        assert repo.get(a.id).changed_at > first  # la serie anterior tambien cambio
+        assert repo.get(b.id).changed_at is not None
+
+    def test_only_changed_or_stale_medications_are_candidates(self, db, repo, meds):
+        a, b, c = meds
+        db.add_all([_movement(a), _movement(b)])
+        db.commit()
+        # Nunca pronosticados: todos son candidatos
+        assert _candidates(repo, meds) == [a.id, b.id, c.id]
+
+        now = datetime.utcnow()
+        for med in meds:
+            repo.mark_forecasted(med.id, now, forecast_run_id=1)
+        assert _candidates(repo, meds) == []
+
+        db.add(_movement(b))
+        db.commit()
+        repo.mark_forecasted(c.id, now - timedelta(days=8))
+        assert _candidates(repo, meds) == [b.id, c.id]
+        assert repo.get(a.id).forecast_run_id == 1
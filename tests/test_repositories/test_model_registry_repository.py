@@ -0,0 +1,43 @@
+import pytest
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastModelArtifact
+from src.repositories import ModelRegistryRepository
+
+
+@pytest.fixture()
+def repo(db: Session):
+    yield ModelRegistryRepository(db)
+    for artifact in db.exec(select(ForecastModelArtifact)).all():
+        db.delete(artifact)
+    db.commit()
+
+
+class TestModelRegistryRepository:
+    def test_roundtrip(self, repo):
+        repo.save(1, "arima", "h1", {"order": [1, 0, 1]}, parameters={"order": [1, 0, 1]})
+        assert repo.load(1, "arima", "h1") == {"order": [1, 0, 1]}
+        assert repo.load(1, "arima", "missing") is None
+
+    def test_save_is_idempotent_per_key(self, repo, db):
+        repo.save(1, "arima", "h1", "v1")
+        repo.save(1, "arima", "h1", "v2")
+        rows = db.exec(select(ForecastModelArtifact)).all()
+        assert len(rows) == 1
+        assert repo.load(1, "arima", "h1") == "v2"
+
+    def test_latest_hash_and_prune(self, repo, db):
+        for h in ("h1", "h2", "h3"):
+            repo.save(1, "arima", h, h, keep=2)
+        repo.save(1, "prophet", "p1", "p1", keep=2)
+        assert repo.get_latest_hash(1, "arima") == "h3"
+        hashes = {a.series_hash for a in db.exec(select(ForecastModelArtifact)).all()}
+        assert hashes == {"h2", "h3", "p1"}
+
+    def test_table_matches_migration(self):
+        # create_all (tests, benchmarks) debe crear el mismo esquema que las migraciones 0005/0006
+        table = ForecastModelArtifact.__table__
+        indexes = {i.name: [c.name for c in i.columns] for i in table.indexes}
+        assert indexes["ix_forecast_model_artifacts_latest"] == ["medication_id", "model_type", "created_at"]
+        (fk,) = table.c.medication_id.foreign_keys
+        assert fk.ondelete == "CASCADE" and table.c.medication_id.nullable
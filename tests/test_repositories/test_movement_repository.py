@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from sqlmodel import Session, select
+
+from src.models.forecast import ForecastWatermark
+from src.models.medication import Medication
+from src.models.movement import Movement, MovementType
+from src.repositories import MovementRepository
+
+
+@pytest.fixture()
+def medication(db: Session):
+    med = Medication(name="SeriesMed", stock=10, unit="units", price=1.0)
+    db.add(med)
+    db.commit()
+    db.refresh(med)
+    yield med
+    for model in (Movement, ForecastWatermark):
+        for row in db.exec(select(model).where(model.medication_id == med.id)).all():
+            db.delete(row)
+    db.commit()
+    db.delete(med)
+    db.commit()
+
+
+def _add(db, med, day, quantity, type=MovementType.OUT, hour=9):
+    db.add(Movement(medication_id=med.id, type=type, quantity=quantity, date=day.replace(hour=hour)))
+
+
+class TestGetConsumptionSeries:
+    def test_daily_totals_with_gaps_filled(self, db, medication):
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        first = today - timedelta(days=4)
+        for day in range(4):
+            _add(db, medication, first + timedelta(days=day), 2.0)
+        _add(db, medication, first, 1.5, hour=18)
+        _add(db, medication, first + timedelta(days=1), 50.0, type=MovementType.IN)
+        db.commit()
+
+        series = MovementRepository(db).get_consumption_series(medication.id, months_back=1)
+        assert list(series.index) == [first + timedelta(days=d) for d in range(4)]
+        assert series.tolist() == [3.5, 2.0, 2.0, 2.0]
+
+    def test_monthly_movements_are_spread_over_days(self, db, medication):
+        today = datetime.utcnow()
+        months = [(today.replace(day=1) - timedelta(days=1)).replace(day=1)]
+        for _ in range(3):
+            months.insert(0, (months[0] - timedelta(days=1)).replace(day=1))
+        for i, month in enumerate(months):
+            _add(db, medication, month.replace(day=15, hour=0, minute=0, second=0, microsecond=0), 31.0 * (i + 1))
+        db.commit()
+
+        series = MovementRepository(db).get_consumption_series(medication.id, months_back=6)
+        first, last = series.index[0], series.index[-1]
+        assert (first.day, last.day) == (15, 15)
+        month_days = series.index.days_in_month
+        assert series.iloc[0] == pytest.approx(31.0 / month_days[0])
+        assert series.iloc[-1] == pytest.approx(124.0 / month_days[-1])
+        assert (series > 0).all()
+
+
+class TestConsumptionMatrix:
+    @pytest.fixture()
+    def meds(self, db: Session):
+        meds = [Medication(name=f"MatrixMed{i}", stock=10, unit="units", price=1.0) for i in range(3)]
+        db.add_all(meds)
+        db.commit()
+        for med in meds:
+            db.refresh(med)
+        yield meds
+        ids = [m.id for m in meds]
+        for model in (Movement, ForecastWatermark):
+            for row in db.exec(select(model).where(model.medication_id.in_(ids))).all():
+                db.delete(row)
+        db.commit()
+        for med in meds:
+            db.delete(med)
+        db.commit()
+
+    def test_rows_match_single_series(self, db, meds):
+        daily, monthly, empty = meds
+        yesterday = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        for d in range(60):
+            _add(db, daily, yesterday - timedelta(days=d), 1.0 + d % 7)
+        for m in range(4):
+            _add(db, monthly, yesterday - timedelta(days=30 * m), 60.0)
+        _add(db, empty, yesterday, 5.0, type=MovementType.IN)
+        db.commit()
+
+        repo = MovementRepository(db)
+        ids = [m.id for m in meds]
+        chunks = list(repo.iter_consumption_matrices(ids, months_back=6, chunk_size=2))
+        assert [list(c.medication_ids) for c in chunks] == [ids[:2], ids[2:]]
+
+        matrix = repo.get_consumption_matrix(ids, months_back=6, chunk_size=2)
+        assert matrix.values.shape == (3, len(matrix.dates))
+        for med in (daily, monthly):
+            expected = repo.get_consumption_series(med.id, months_back=6)
+            pd.testing.assert_series_equal(matrix.series(med.id), expected)
+        assert matrix.series(empty.id).empty and not matrix.values[2].any()
@@ -0,0 +1,266 @@
+"""
+Planes de ejecucion de las consultas calientes.
+
+Los tests de EXPLAIN necesitan un Postgres: se ejecutan solo con
+``TEST_POSTGRES_URL`` (p. ej. ``postgresql://postgres@localhost/forecast_test``).
+Crean un esquema temporal, lo pueblan a escala con INSERT en lote, lanzan
+ANALYZE y capturan el SQL real que emiten repositorios y servicios; cada
+SELECT se explica con sus mismos parametros y el test falla si el plan
+recorre la tabla objetivo con un Seq Scan.
+
+El test de la migracion corre siempre: comprueba que la 0011 crea los
+mismos indices que declaran los modelos.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import types
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import event, insert, text
+from sqlmodel import Session, SQLModel, create_engine
+
+from src.models.delivery import Delivery, DeliveryStatus
+from src.models.forecast import ForecastRun
+from src.models.lot import Lot, LotStatus
+from src.models.medication import Medication
+from src.models.movement import Movement, MovementType
+from src.models.order import Order, OrderStatus
+from src.models.prediction import Prediction
+from src.models.supplier import Supplier
+from src.models.user import User
+from src.repositories import DailyConsumptionRepository, ForecastRepository, MovementRepository
+from src.services import delivery_service, lot_service, order_service
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+MIGRATION = Path(__file__).parents[2] / "alembic" / "versions" / "20260622_0011_add_hot_path_indexes.py"
+
+N_MEDICATIONS = 300
+HISTORY_DAYS = 365
+N_ROWS = 30_000  # predicciones, runs, pedidos, entregas y lotes
+
+
+# ── Migracion frente a los modelos ─────────────────────────────────────────────
+
+class _RecordingOp:
+    """``alembic.op`` minimo que registra las llamadas de la migracion."""
+
+    def __init__(self):
+        self.created, self.dropped = [], []
+
+    def create_index(self, name, table, columns, unique=False, **options):
+        self.created.append((name, table, list(columns), options))
+
+    def drop_index(self, name, table_name=None):
+        self.dropped.append(name)
+
+
+def _run_migration(monkeypatch):
+    op = _RecordingOp()
+    monkeypatch.setitem(sys.modules, "alembic", types.SimpleNamespace(op=op))
+    spec = importlib.util.spec_from_file_location("hot_path_indexes", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade()
+    module.downgrade()
+    return op
+
+
+def test_migration_matches_model_indexes(monkeypatch):
+    op = _run_migration(monkeypatch)
+    declared = {
+        index.name: (table.name, [c.name for c in index.columns], index)
+        for table in SQLModel.metadata.tables.values()
+        for index in table.indexes
+    }
+    for name, table, columns, options in op.created:
+        assert declared[name][:2] == (table, columns), name
+        index = declared[name][2]
+        if "postgresql_where" in options:
+            assert str(index.dialect_options["postgresql"]["where"]) == str(options["postgresql_where"])
+        if "postgresql_include" in options:
+            assert index.dialect_options["postgresql"]["include"] == options["postgresql_include"]
+    assert op.dropped == [name for name, *_ in reversed(op.created)]
+
+
+# ── EXPLAIN sobre Postgres ─────────────────────────────────────────────────────
+
+def _seed(db: Session) -> dict:
+    rng = np.random.default_rng(7)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    def stamp(days: float) -> datetime:
+        return now - timedelta(days=float(days))
+
+    meds = db.execute(
+        insert(Medication).returning(Medication.id),
+        [{"name": f"Plan {i:04d}", "stock": 100, "unit": "units", "price": 1.0} for i in range(N_MEDICATIONS)],
+    ).scalars().all()
+    user = User(nombre="Plan", email=f"plan-{uuid.uuid4().hex}@test.com", hashed_password="x",
+                cargo="qa", departamento="qa")
+    supplier = Supplier(name="Plan supplier")
+    db.add_all([user, supplier])
+    db.flush()
+
+    # Salidas casi diarias y alguna entrada: ~110k movimientos
+    movements = [
+        {"medication_id": med_id, "date": stamp(d) - timedelta(hours=int(rng.integers(0, 12))),
+         "type": MovementType.OUT if rng.random() > 0.05 else MovementType.IN,
+         "quantity": float(rng.integers(1, 20)), "created_at": now, "updated_at": now}
+        for med_id in meds
+        for d in range(1, HISTORY_DAYS + 1)
+        if rng.random() < 0.35
+    ]
+    db.execute(insert(Movement), movements)
+
+    def pick(n):
+        return [int(m) for m in rng.choice(meds, n)]
+
+    ages = rng.uniform(0, 720, N_ROWS)
+    db.execute(insert(Prediction), [
+        {"medication_id": med_id, "date": stamp(age), "created_at": stamp(age), "updated_at": now,
+         "real_usage": 1.0, "predicted_usage": 1.0, "stock": 10.0, "month_of_year": stamp(age).month,
+         "regional_demand": 1.0, "shortage": bool(rng.random() < 0.03)}
+        for med_id, age in zip(pick(N_ROWS), ages)
+    ])
+    models = ["arima", "prophet", "sba", "croston", "ensemble"]
+    db.execute(insert(ForecastRun), [
+        {"medication_id": med_id, "model_type": models[i % len(models)], "horizon_days": 30,
+         "created_at": stamp(age), "updated_at": now}
+        for i, (med_id, age) in enumerate(zip(pick(N_ROWS), ages))
+    ])
+    db.execute(insert(Order), [
+        {"medication_id": med_id, "quantity": 10, "status": list(OrderStatus)[i % len(OrderStatus)],
+         "supplier": "Plan", "total_cost": 1.0, "created_by": user.id, "order_date": stamp(age),
+         "created_at": stamp(age), "updated_at": now}
+        for i, (med_id, age) in enumerate(zip(pick(N_ROWS), ages))
+    ])
+    db.execute(insert(Delivery), [
+        {"supplier_id": supplier.id, "medication_id": med_id, "product": "Plan", "quantity": 10,
+         "status": list(DeliveryStatus)[i % len(DeliveryStatus)], "created_at": stamp(age), "updated_at": now}
+        for i, (med_id, age) in enumerate(zip(pick(N_ROWS), ages))
+    ])
+    db.execute(insert(Lot), [
+        {"code": f"L{i:06d}", "medication_id": med_id, "quantity": 10,
+         "status": list(LotStatus)[i % len(LotStatus)], "created_at": stamp(age), "updated_at": now}
+        for i, (med_id, age) in enumerate(zip(pick(N_ROWS), ages))
+    ])
+    db.commit()
+    DailyConsumptionRepository(db).rebuild()
+    return {"medication_id": meds[N_MEDICATIONS // 2], "now": now}
+
+
+@pytest.fixture(scope="module")
+def pg():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL no definido: los planes se comprueban contra Postgres")
+    schema = f"plans_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(POSTGRES_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    engine = create_engine(POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as db:
+            seeded = _seed(db)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+        yield engine, seeded
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        admin.dispose()
+
+
+def _capture(engine, call):
+    """Ejecuta ``call(db)`` y devuelve los SELECT (sql, parametros) que emite."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Session(engine) as db:
+            call(db)
+            db.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements, "la llamada no emitio ningun SELECT"
+    return statements
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _seq_scans(engine, statements, table: str) -> list:
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar_one()
+            plan = (raw if isinstance(raw, list) else json.loads(raw))[0]["Plan"]
+            scans += [
+                statement for node in _nodes(plan)
+                if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == table
+            ]
+    return scans
+
+
+def _hot_queries():
+    since = lambda seeded, days: seeded["now"] - timedelta(days=days)  # noqa: E731
+    return {
+        "movements.recent": (
+            "movements", lambda db, s: MovementRepository(db).get_recent_movements(s["medication_id"], days=30)),
+        "movements.rollup_refresh": (
+            "movements", lambda db, s: DailyConsumptionRepository.refresh_days(
+                db.connection(), [(s["medication_id"], date.today() - timedelta(days=d)) for d in (3, 10)])),
+        "daily_consumption.series": (
+            "daily_consumption", lambda db, s: MovementRepository(db).get_consumption_series(s["medication_id"])),
+        "predictions.by_medication": (
+            "predictions", lambda db, s: db.query(Prediction)
+            .filter(Prediction.medication_id == s["medication_id"], Prediction.date >= since(s, 90))
+            .order_by(Prediction.date.desc()).all()),
+        "predictions.cleanup": (
+            "predictions", lambda db, s: db.query(Prediction.id)
+            .filter(Prediction.created_at < since(s, 710)).all()),
+        "predictions.alerts": (
+            "predictions", lambda db, s: db.query(Prediction)
+            .filter(Prediction.shortage == True)  # noqa: E712  (igual que report_service)
+            .order_by(Prediction.date.desc()).limit(100).all()),
+        "forecast_runs.latest": (
+            "forecast_runs", lambda db, s: ForecastRepository(db).get_latest_for_medication(s["medication_id"])),
+        "forecast_runs.latest_by_model": (
+            "forecast_runs", lambda db, s: ForecastRepository(db).get_latest_for_medication(
+                s["medication_id"], model_type="arima")),
+        "forecast_runs.history": (
+            "forecast_runs", lambda db, s: ForecastRepository(db).get_history_for_medication(s["medication_id"])),
+        "orders.list": ("orders", lambda db, s: order_service.get_orders(db)),
+        "orders.by_status": (
+            "orders", lambda db, s: order_service.get_orders(db, status_filter=OrderStatus.SHIPPED)),
+        "orders.by_medication": (
+            "orders", lambda db, s: order_service.get_orders_by_medication(db, s["medication_id"])),
+        "deliveries.list": ("deliveries", lambda db, s: delivery_service.get_deliveries(db)),
+        "deliveries.by_status": (
+            "deliveries", lambda db, s: delivery_service.get_deliveries(db, status_filter=DeliveryStatus.RECEIVED)),
+        "lots.list": ("lots", lambda db, s: lot_service.get_lots(db)),
+        "lots.by_status": ("lots", lambda db, s: lot_service.get_lots(db, status_filter=LotStatus.STORED)),
+    }
+
+
+@pytest.mark.parametrize("name", sorted(_hot_queries()))
+def test_hot_query_avoids_seq_scan(pg, name):
+    engine, seeded = pg
+    table, call = _hot_queries()[name]
+    statements = _capture(engine, lambda db: call(db, seeded))
+    assert _seq_scans(engine, statements, table) == []
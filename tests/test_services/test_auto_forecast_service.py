@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.factory import ForecastModelFactory
+from src.services import forecast_service
+from src.services.auto_forecast_service import _ladder, classify_series, run_auto_forecast
+
+
+def _series(values):
+    return pd.Series(values, index=pd.date_range("2025-01-01", periods=len(values), freq="D"))
+
+
+@pytest.fixture()
+def weekly():
+    rng = np.random.default_rng(0)
+    t = np.arange(200)
+    return 20 + 6 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 1, 200)
+
+
+@pytest.fixture()
+def intermittent():
+    rng = np.random.default_rng(1)
+    return (rng.poisson(0.15, 200) * rng.integers(1, 4, 200)).astype(float)
+
+
+def _fake(model_type, wmape, calls, n_folds=3):
+    def run(db, medication_id, horizon_days=30, months_back=24):
+        calls.append(model_type)
+        return {
+            "model_type": model_type,
+            "parameters": {"name": model_type},
+            "metrics": {"mae": 1.0, "mape": wmape, "rmse": 1.0, "r2": 0.0, "n_folds": n_folds},
+            "dates": pd.date_range("2026-01-01", periods=horizon_days, freq="D"),
+            "values": np.ones(horizon_days),
+            "lower_ci": np.zeros(horizon_days),
+            "upper_ci": np.full(horizon_days, 2.0),
+        }
+    return run
+
+
+class TestClassifySeries:
+    def test_weekly_series_is_smooth_and_seasonal(self, weekly):
+        profile = classify_series(weekly)
+        assert profile["pattern"] == "smooth"
+        assert profile["seasonal_strength"] > 0.8
+
+    def test_sparse_series_is_intermittent(self, intermittent):
+        profile = classify_series(intermittent)
+        assert profile["pattern"] in ("intermittent", "lumpy")
+        assert profile["adi"] >= 1.32
+
+    def test_ladders(self, weekly, intermittent):
+        assert _ladder(classify_series(weekly))[0] == ["holt_winters", "arima", "ensemble"]
+        assert _ladder(classify_series(intermittent))[0] == ["sba", "arima"]
+        assert _ladder(classify_series(weekly[:42]))[0] == ["seasonal_naive", "arima"]
+
+
+class TestRunAutoForecast:
+    @pytest.fixture()
+    def patched(self, monkeypatch, weekly):
+        ForecastModelFactory.available_models()
+        monkeypatch.setattr(forecast_service, "get_consumption_series", lambda *a, **k: _series(weekly))
+
+        def install(**wmapes):
+            calls = []
+            for name, wmape in wmapes.items():
+                monkeypatch.setitem(ForecastModelFactory._registry, name, _fake(name, wmape, calls))
+            return calls
+        return install
+
+    def test_cheap_model_meeting_target_stops(self, patched):
+        calls = patched(holt_winters=9.0, arima=5.0, ensemble=4.0)
+        result = run_auto_forecast(None, 1, horizon_days=14)
+        assert calls == ["holt_winters"]
+        params = result["parameters"]
+        assert result["model_type"] == "auto"
+        assert (params["selected_model"], params["tier"]) == ("holt_winters", 0)
+        assert params["members"] == {"holt_winters": {"name": "holt_winters"}}
+        assert "holt_winters" in params["reason"]
+
+    def test_escalates_until_target_met(self, patched):
+        calls = patched(holt_winters=25.0, arima=12.0, ensemble=4.0)
+        result = run_auto_forecast(None, 1, horizon_days=14)
+        assert calls == ["holt_winters", "arima"]
+        assert result["parameters"]["selected_model"] == "arima"
+        assert result["parameters"]["tier"] == 1
+
+    def test_keeps_best_when_nothing_meets_target(self, patched):
+        patched(holt_winters=18.0, arima=30.0, ensemble=22.0)
+        result = run_auto_forecast(None, 1, horizon_days=14)
+        assert result["parameters"]["selected_model"] == "holt_winters"
+        assert [a["model"] for a in result["parameters"]["attempts"]] == ["holt_winters", "arima", "ensemble"]
+
+    def test_failed_heavy_model_is_recorded(self, patched, monkeypatch):
+        patched(holt_winters=20.0, ensemble=10.0)
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("pmdarima no instalado.")
+        monkeypatch.setitem(ForecastModelFactory._registry, "arima", broken)
+
+        result = run_auto_forecast(None, 1, horizon_days=14)
+        assert result["parameters"]["selected_model"] == "ensemble"
+        assert result["parameters"]["attempts"][1] == {"model": "arima", "error": "pmdarima no instalado."}
+        assert "arima fallo" in result["parameters"]["reason"]
+
+    def test_short_series_is_not_reported_as_validated(self, monkeypatch, weekly):
+        # 30 dias: ningun fold walk-forward cabe (min_train = 30), WMAPE 0.0 sin validar
+        ForecastModelFactory.available_models()
+        monkeypatch.setattr(forecast_service, "get_consumption_series", lambda *a, **k: _series(weekly[:30]))
+        calls = []
+        monkeypatch.setitem(ForecastModelFactory._registry, "arima", _fake("arima", 0.0, calls, n_folds=0))
+
+        result = run_auto_forecast(None, 1, horizon_days=7)
+        params = result["parameters"]
+        assert calls == ["arima"]  # escala aunque el nivel ligero "marque" 0.0
+        assert params["selected_model"] == "seasonal_naive" and params["tier"] == 0
+        assert params["attempts"] == [{"model": "seasonal_naive", "wmape": None}, {"model": "arima", "wmape": None}]
+        assert "sin validacion walk-forward" in params["reason"]
+        assert f"<= {forecast_service.TARGET_WMAPE}%" not in params["reason"]
+
+    def test_validated_heavy_model_beats_unvalidated_cheap_one(self, patched, monkeypatch):
+        calls = patched(arima=40.0, ensemble=30.0)
+        monkeypatch.setitem(ForecastModelFactory._registry, "holt_winters", _fake("holt_winters", 0.0, calls, n_folds=0))
+        result = run_auto_forecast(None, 1, horizon_days=14)
+        assert calls == ["holt_winters", "arima", "ensemble"]
+        assert result["parameters"]["selected_model"] == "ensemble"
+        assert "holt_winters sin validar" in result["parameters"]["reason"]
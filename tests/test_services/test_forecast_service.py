@@ -0,0 +1,303 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from src.models.forecast import ForecastRun
+from src.models.medication import Medication
+from src.models.order import Order, OrderStatus
+from src.services import forecast_service, order_service
+from src.services.forecast_service import (
+    _appended_points,
+    _arima_search_kwargs,
+    _compute_shortage_probability,
+    _prophet_cv_parallel,
+    _shortage_risk_matrix,
+    _walk_forward_metrics,
+    run_ensemble_forecast,
+    save_forecast,
+)
+
+
+def _mean_fit_predict(train, n_periods):
+    return np.full(n_periods, train.tail(14).mean())
+
+
+def _failing_fit_predict(train, n_periods):
+    raise RuntimeError("fit failed")
+
+
+@pytest.fixture()
+def series():
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2025-01-01", periods=180, freq="D")
+    weekly = 1 + 0.3 * np.sin(2 * np.pi * np.arange(180) / 7)
+    return pd.Series(20 * weekly + rng.normal(0, 2, 180), index=idx)
+
+
+class TestWalkForwardMetrics:
+    def test_parallel_matches_sequential(self, series):
+        seq = _walk_forward_metrics(series, _mean_fit_predict, n_jobs=1)
+        par = _walk_forward_metrics(series, _mean_fit_predict, n_jobs=2)
+        assert seq["n_folds"] == par["n_folds"] == 5
+        for metric in ("mae", "mape", "rmse", "r2"):
+            assert seq[metric] == pytest.approx(par[metric])
+
+    def test_failed_folds_are_skipped(self, series):
+        result = _walk_forward_metrics(series, _failing_fit_predict, n_jobs=1)
+        assert result["n_folds"] == 0
+        assert result["mape"] == 0.0
+
+    def test_folds_are_sequential_by_default_and_in_ensemble_members(self, monkeypatch):
+        monkeypatch.delenv("FORECAST_WF_N_JOBS", raising=False)
+        assert forecast_service._wf_n_jobs() == 1
+        monkeypatch.setenv("FORECAST_WF_N_JOBS", "-1")
+        assert forecast_service._wf_n_jobs() == -1
+
+        # Dentro de un miembro del ensemble los folds son secuenciales
+        member = lambda db, *args: forecast_service._wf_n_jobs()  # noqa: E731
+        assert forecast_service._run_member(None, member, 1, 30, 24) == 1
+        assert forecast_service._wf_n_jobs() == -1
+
+
+class TestArimaSearchKwargs:
+    def test_full_search_without_previous_order(self):
+        kwargs = _arima_search_kwargs()
+        assert kwargs["max_p"] == 3 and kwargs["max_P"] == 2
+        assert "d" not in kwargs and "start_p" not in kwargs
+
+    def test_warm_start_restricts_to_neighbourhood(self):
+        kwargs = _arima_search_kwargs({"order": [1, 1, 2], "seasonal_order": [1, 0, 0, 7]})
+        assert (kwargs["d"], kwargs["D"]) == (1, 0)
+        assert (kwargs["start_p"], kwargs["start_q"]) == (1, 2)
+        assert (kwargs["max_p"], kwargs["max_q"], kwargs["max_P"], kwargs["max_Q"]) == (2, 3, 2, 1)
+
+
+class TestAppendedPoints:
+    def _meta(self, series):
+        return {"end": series.index[-1].isoformat(), "tail": list(series.values[-28:])}
+
+    def test_detects_appended_days(self, series):
+        meta = self._meta(series.iloc[:-3])
+        appended = _appended_points(series, meta)
+        assert list(appended.index) == list(series.index[-3:])
+
+    def test_changed_history_requires_refit(self, series):
+        meta = self._meta(series.iloc[:-3])
+        changed = series.copy()
+        changed.iloc[-10] += 5
+        assert _appended_points(changed, meta) is None
+
+    def test_same_series_has_nothing_appended(self, series):
+        assert _appended_points(series, self._meta(series)) is None
+
+
+class _NoBindDB:
+    def get_bind(self):
+        return None
+
+
+def _fake_member(name, rmse, delay=0.0):
+    def run(db, medication_id, horizon_days, months_back):
+        time.sleep(delay)
+        return {
+            "parameters": {"name": name},
+            "metrics": {"mae": 1.0, "mape": 10.0, "rmse": rmse, "r2": 0.5},
+            "dates": pd.date_range("2026-01-01", periods=horizon_days, freq="D"),
+            "values": np.full(horizon_days, 10.0),
+            "lower_ci": np.full(horizon_days, 8.0),
+            "upper_ci": np.full(horizon_days, 12.0),
+        }
+    return run
+
+
+class TestEnsembleMembers:
+    def test_members_run_concurrently(self, monkeypatch):
+        monkeypatch.setattr(forecast_service, "run_arima_forecast", _fake_member("arima", 1.0, 0.5))
+        monkeypatch.setattr(forecast_service, "run_prophet_forecast", _fake_member("prophet", 1.0, 0.5))
+        start = time.monotonic()
+        result = run_ensemble_forecast(_NoBindDB(), 1, horizon_days=7)
+        assert time.monotonic() - start < 0.9
+        assert result["parameters"]["models_used"] == ["arima", "prophet"]
+        assert result["parameters"]["weights"]["arima"] == pytest.approx(0.5)
+
+    def test_slow_member_degrades_to_arima_only(self, monkeypatch):
+        monkeypatch.setattr(forecast_service, "_ENSEMBLE_MEMBER_TIMEOUT", 0.2)
+        monkeypatch.setattr(forecast_service, "run_arima_forecast", _fake_member("arima", 1.0))
+        monkeypatch.setattr(forecast_service, "run_prophet_forecast", _fake_member("prophet", 1.0, 1.0))
+        result = run_ensemble_forecast(_NoBindDB(), 1, horizon_days=7)
+        assert result["parameters"]["models_used"] == ["arima"]
+        assert "timeout" in result["parameters"]["member_errors"]["prophet"]
+        assert len(result["values"]) == 7
+
+    def test_timed_out_member_does_not_store_its_model(self, monkeypatch):
+        monkeypatch.setattr(forecast_service, "_ENSEMBLE_MEMBER_TIMEOUT", 0.2)
+        saved, finished = [], threading.Event()
+        monkeypatch.setattr(forecast_service.model_cache, "save", lambda path, obj: saved.append(path))
+        monkeypatch.setattr(forecast_service, "_MODEL_REGISTRY", False)
+
+        def storing_member(name, delay):
+            fit = _fake_member(name, 1.0, delay)
+
+            def run(db, medication_id, horizon_days, months_back):
+                result = fit(db, medication_id, horizon_days, months_back)
+                forecast_service._store_model(db, medication_id, name, "hash", object())
+                if delay:
+                    finished.set()
+                return result
+            return run
+
+        monkeypatch.setattr(forecast_service, "run_arima_forecast", storing_member("arima", 0.0))
+        monkeypatch.setattr(forecast_service, "run_prophet_forecast", storing_member("prophet", 0.5))
+        result = run_ensemble_forecast(_NoBindDB(), 1, horizon_days=7)
+        assert result["parameters"]["models_used"] == ["arima"]
+
+        assert finished.wait(2.0)  # el hilo del miembro descartado termina su ajuste...
+        assert len(saved) == 1 and "arima" in str(saved[0])  # ...pero no guarda el modelo
+
+
+class TestProphetCvParallel:
+    @pytest.mark.parametrize("value, expected", [
+        ("", None), ("none", None), ("processes", "processes"), (" Threads ", "threads"),
+    ])
+    def test_reads_mode_from_env(self, monkeypatch, value, expected):
+        monkeypatch.setenv("FORECAST_PROPHET_CV_PARALLEL", value)
+        assert _prophet_cv_parallel() == expected
+
+
+class TestShortageRiskMatrix:
+    def test_rows_match_single_series_computation(self):
+        rng = np.random.default_rng(3)
+        horizons, stocks = [7, 30, 14], [40.0, 10.0, 500.0]
+        width = max(horizons)
+        values, lower, upper = (np.full((3, width), np.nan) for _ in range(3))
+        expected = []
+        for i, (h, stock) in enumerate(zip(horizons, stocks)):
+            v = rng.uniform(1, 5, h)
+            values[i, :h], lower[i, :h], upper[i, :h] = v, v - 1, v + 1
+            med = SimpleNamespace(stock=stock, min_stock=0)
+            expected.append(_compute_shortage_probability(med, v, v - 1, v + 1))
+
+        prob, days, level = _shortage_risk_matrix(np.array(stocks), values, lower, upper)
+        for i, exp in enumerate(expected):
+            assert round(float(prob[i]), 4) == exp["shortage_probability"]
+            assert (int(days[i]) or None) == exp["days_until_shortage"]
+            assert level[i] == exp["alert_level"]
+
+
+def _forecast_data(horizon, value=3.0):
+    return {
+        "model_type": "arima",
+        "parameters": {},
+        "metrics": {"mae": 1.0, "mape": 10.0, "rmse": 1.0, "r2": 0.5},
+        "dates": pd.date_range("2026-01-01", periods=horizon, freq="D"),
+        "values": np.full(horizon, value),
+        "lower_ci": np.full(horizon, value - 1),
+        "upper_ci": np.full(horizon, value + 1),
+    }
+
+
+class TestRiskRefreshOnStockChange:
+    @pytest.fixture()
+    def medication(self, db):
+        med = Medication(name="RiskMed", stock=10, min_stock=0, unit="units", price=1.0)
+        db.add(med)
+        db.commit()
+        db.refresh(med)
+        yield med
+        for run in db.exec(select(ForecastRun).where(ForecastRun.medication_id == med.id)).all():
+            db.delete(run)
+        for order in db.exec(select(Order).where(Order.medication_id == med.id)).all():
+            db.delete(order)
+        db.delete(med)
+        db.commit()
+
+    def test_refresh_updates_latest_run_per_model(self, db, medication):
+        old = save_forecast(db, medication.id, _forecast_data(30))
+        latest = save_forecast(db, medication.id, _forecast_data(180), horizon_days=30)
+        other = save_forecast(db, medication.id, {**_forecast_data(14), "model_type": "sba"})
+        assert latest.alert_level == "high" and other.alert_level == "high"
+
+        medication.stock = 200
+        db.add(medication)
+        db.commit()
+        assert forecast_service.refresh_risk_for_medications(db, [medication.id]) == 2
+
+        for run in (old, latest, other):
+            db.refresh(run)
+        assert latest.alert_level == "low" and latest.days_until_shortage is None
+        assert latest.stock_at_forecast == 200
+        assert other.alert_level == "low"
+        assert old.alert_level == "high"  # solo se recalcula el ultimo run de cada modelo
+        assert forecast_service.refresh_risk_for_medications(db, [medication.id]) == 0
+
+    def test_received_order_refreshes_alerts(self, db, regular_user, medication):
+        run = save_forecast(db, medication.id, _forecast_data(30))
+        assert run.days_until_shortage == 4
+
+        order = Order(medication_id=medication.id, quantity=30, supplier="Proveedor", created_by=regular_user.id)
+        db.add(order)
+        db.commit()
+        order_service.update_order_status(db, order.id, OrderStatus.RECEIVED)
+
+        db.refresh(run)
+        assert run.stock_at_forecast == 40
+        assert run.days_until_shortage == 14
+
+
+class TestTimingMetrics:
+    @pytest.fixture()
+    def medication(self, db):
+        med = Medication(name="TimingMed", stock=10, unit="units", price=1.0)
+        db.add(med)
+        db.commit()
+        db.refresh(med)
+        yield med
+        for run in db.exec(select(ForecastRun).where(ForecastRun.medication_id == med.id)).all():
+            db.delete(run)
+        db.delete(med)
+        db.commit()
+
+    def test_persist_stage_and_histograms(self, db, medication):
+        for fit_s, outcome in ((0.5, "miss"), (2.0, "local")):
+            timings = {"total_s": fit_s + 0.1, "stages": {"arima.fit": fit_s}, "calls": {},
+                       "cache": {"arima": outcome}}
+            data = _forecast_data(30)
+            data["parameters"] = {"timings": timings}
+            run = save_forecast(db, medication.id, data)
+        save_forecast(db, medication.id, {**_forecast_data(30), "model_type": "sba"})  # sin trazas
+
+        db.refresh(run)
+        assert run.parameters["timings"]["stages"]["persist"] >= 0
+
+        # "persist" incluye el INSERT del run, y la traza va en su misma transaccion
+        statements = []
+
+        def slow_insert(conn, cursor, sql, *args):
+            statements.append(sql.split()[0].upper())
+            if statements[-1] == "INSERT":
+                time.sleep(0.2)
+
+        event.listen(db.get_bind(), "before_cursor_execute", slow_insert)
+        try:
+            data = _forecast_data(30)
+            data["parameters"] = {"timings": {"total_s": 0.1, "stages": {}, "calls": {}, "cache": {}}}
+            traced = save_forecast(db, medication.id, data)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", slow_insert)
+        assert traced.parameters["timings"]["stages"]["persist"] >= 0.2
+        assert statements.count("INSERT") == 1 and statements.index("INSERT") < statements.index("UPDATE")
+
+        report = forecast_service.get_timing_metrics(db, hours=1, model_type="arima")
+        arima = report["models"]["arima"]
+        assert list(report["models"]) == ["arima"]
+        assert arima["runs"] == 3
+        assert arima["stages"]["arima.fit"]["max"] == 2.0
+        assert sum(arima["stages"]["arima.fit"]["histogram"]) == 2
+        assert arima["cache"] == {"arima": {"miss": 1, "local": 1}}
+        assert "sba" not in forecast_service.get_timing_metrics(db, hours=1)["models"]
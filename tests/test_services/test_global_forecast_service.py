@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlmodel import select
+
+from src.core.model_cache import ModelCache
+from src.models.forecast import ForecastModelArtifact, ForecastRun
+from src.models.medication import Medication
+from src.services import forecast_service, global_forecast_service
+from src.services.forecast_service import fit_horizon, get_cached_forecast
+from src.services.global_forecast_service import (
+    _simulate,
+    forecast_catalog_global,
+    predict_global,
+    run_global_forecast,
+    train_global_model,
+)
+
+
+def _panel(n_series=6, days=180):
+    rng = np.random.default_rng(0)
+    idx = pd.date_range("2025-01-01", periods=days, freq="D")
+    weekly = 1 + 0.4 * np.sin(2 * np.pi * np.arange(days) / 7)
+    return {
+        med_id: pd.Series(level * weekly + rng.normal(0, 0.1 * level, days), index=idx).clip(lower=0)
+        for med_id, level in zip(range(1, n_series + 1), (5, 10, 20, 40, 80, 160))
+    }
+
+
+@pytest.fixture()
+def panel(monkeypatch, tmp_path, db):
+    data = _panel()
+    monkeypatch.setattr(
+        global_forecast_service, "_load_panel",
+        lambda db, ids, months_back: {i: data[i] for i in ids if i in data},
+    )
+    monkeypatch.setattr(forecast_service, "model_cache", ModelCache(str(tmp_path), 10**9, 100, 3, 4))
+    yield data
+    for artifact in db.exec(select(ForecastModelArtifact)).all():
+        db.delete(artifact)
+    db.commit()
+
+
+class TestGlobalModel:
+    def test_predict_requires_trained_model(self, panel, db):
+        with pytest.raises(RuntimeError):
+            predict_global(db, [1], horizon_days=7)
+
+    def test_train_and_predict_catalog_in_one_call(self, panel, db):
+        summary = train_global_model(db, medication_ids=list(panel))
+        assert summary["n_series"] == 6
+        assert summary["metrics"]["mape"] < 20
+
+        results, errors = predict_global(db, list(panel) + [99], horizon_days=14)
+        assert set(results) == set(panel) and 99 in errors
+        for med_id, result in results.items():
+            assert len(result["dates"]) == len(result["values"]) == 14
+            assert np.all(result["lower_ci"] <= result["upper_ci"])
+            # Misma escala que la serie del medicamento
+            assert 0.5 < result["values"].mean() / panel[med_id].mean() < 2
+            assert result["parameters"]["model_version"] == summary["version"]
+
+    def test_registry_stores_catalog_artifact(self, panel, db):
+        train_global_model(db, medication_ids=list(panel))
+        row = db.exec(select(ForecastModelArtifact).where(ForecastModelArtifact.model_type == "global")).one()
+        assert row.medication_id is None
+
+        # Otro nodo (cache local vacia) lo recupera del registro
+        forecast_service.model_cache.clear()
+        result = run_global_forecast(db, 3, horizon_days=7)
+        assert result["model_type"] == "global"
+        assert result["metrics"]["validation"] == "global_holdout_28d"
+
+    def test_simulation_without_paths_is_deterministic(self, panel):
+        class Persist:
+            def predict(self, X):
+                return X[:, 0]  # lag_1
+
+        histories = np.arange(56, dtype=float).reshape(2, 28)
+        dates = pd.DatetimeIndex(["2025-03-01", "2025-03-05"])
+        point, lower, upper = _simulate(Persist(), histories, dates, 5)
+        assert lower is None and upper is None
+        np.testing.assert_allclose(point, np.repeat(histories[:, -1:], 5, axis=1))
+
+    def test_local_cache_serves_model_without_registry(self, panel, db, monkeypatch):
+        monkeypatch.setattr(forecast_service, "_MODEL_REGISTRY", False)
+        summary = train_global_model(db, medication_ids=list(panel))
+        assert db.exec(select(ForecastModelArtifact)).first() is None
+
+        version, artifact = global_forecast_service.load_global_model(db)
+        assert version == summary["version"] and artifact is not None
+        results, _ = predict_global(db, [1], horizon_days=7)
+        assert results[1]["parameters"]["model_version"] == summary["version"]
+
+    def test_catalog_runs_are_keyed_for_the_result_cache(self, panel, db, monkeypatch):
+        meds = [Medication(name=f"GlobalCatalog {i}", stock=1000, unit="units", price=1.0) for i in range(2)]
+        db.add_all(meds)
+        db.commit()
+        by_id = {med.id: panel[i + 1] for i, med in enumerate(meds)}
+        monkeypatch.setattr(global_forecast_service, "_load_panel",
+                            lambda db, ids, months_back: {i: by_id[i] for i in ids if i in by_id})
+        monkeypatch.setattr(forecast_service, "get_consumption_series",
+                            lambda db, med_id, months_back=24, freq="D": by_id[med_id])
+        try:
+            train_global_model(db, medication_ids=list(by_id))
+            statuses = forecast_catalog_global(db, horizon_days=30, medication_ids=list(by_id))
+            assert {s["status"] for s in statuses} == {"success"}
+
+            for med_id, series in by_id.items():
+                run = db.get(ForecastRun, next(s["run_id"] for s in statuses if s["medication_id"] == med_id))
+                assert (run.horizon_days, run.fitted_horizon_days) == (30, fit_horizon(30))
+                assert (run.months_back, run.series_hash) == (24, forecast_service._series_hash(series))
+                # Un horizonte mayor se sirve del run nocturno sin reajustar
+                cached, data, _ = get_cached_forecast(db, med_id, "global", 90, 24)
+                assert cached is not None and cached.id == run.id and len(data["dates"]) == 90
+        finally:
+            for run in db.exec(select(ForecastRun).where(ForecastRun.medication_id.in_(list(by_id)))).all():
+                db.delete(run)
+            for med in meds:
+                db.delete(med)
+            db.commit()
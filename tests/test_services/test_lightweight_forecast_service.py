@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.factory import ForecastModelFactory
+from src.services import forecast_service
+from src.services.lightweight_forecast_service import (
+    LIGHTWEIGHT_MODELS,
+    croston_matrix,
+    forecast_matrix,
+    holt_winters_matrix,
+    seasonal_naive_matrix,
+)
+
+
+@pytest.fixture()
+def weekly():
+    rng = np.random.default_rng(0)
+    t = np.arange(210)
+    return 20 + 5 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 1, (3, 210))
+
+
+@pytest.fixture()
+def intermittent():
+    rng = np.random.default_rng(1)
+    return rng.poisson(0.2, (4, 180)) * rng.integers(1, 6, (4, 180))
+
+
+class TestCroston:
+    @pytest.mark.parametrize("variant", ["croston", "sba", "tsb"])
+    def test_shapes_and_interval_order(self, intermittent, variant):
+        fc = croston_matrix(intermittent, 30, variant=variant)
+        assert fc["values"].shape == fc["lower"].shape == fc["upper"].shape == (4, 30)
+        assert np.all(fc["lower"] <= fc["values"]) and np.all(fc["values"] <= fc["upper"])
+        assert np.all(fc["lower"] >= 0)
+
+    def test_sba_deflates_croston(self, intermittent):
+        croston = croston_matrix(intermittent, 7, variant="croston")["values"]
+        sba = croston_matrix(intermittent, 7, variant="sba")["values"]
+        np.testing.assert_allclose(sba, croston * (1 - 0.1 / 2))
+
+    def test_tsb_decays_after_demand_stops(self):
+        y = np.concatenate([np.full(60, 5.0), np.zeros(60)])
+        tsb = croston_matrix(y, 7, variant="tsb")["values"][0, 0]
+        croston = croston_matrix(y, 7, variant="croston")["values"][0, 0]
+        assert tsb < croston
+
+    def test_matrix_matches_row_by_row(self, intermittent):
+        batch = croston_matrix(intermittent, 14, variant="sba")["values"]
+        for i, row in enumerate(intermittent):
+            np.testing.assert_allclose(batch[i], croston_matrix(row, 14, variant="sba")["values"][0])
+
+
+class TestSeasonalModels:
+    def test_seasonal_naive_repeats_last_week(self, weekly):
+        fc = seasonal_naive_matrix(weekly, 14)
+        np.testing.assert_allclose(fc["values"][:, :7], np.maximum(weekly[:, -7:], 0))
+        np.testing.assert_allclose(fc["values"][:, 7:], fc["values"][:, :7])
+
+    def test_holt_winters_tracks_weekly_pattern(self, weekly):
+        train, test = weekly[:, :-28], weekly[:, -28:]
+        fc = holt_winters_matrix(train, 28)
+        wmape = np.abs(test - fc["values"]).sum() / test.sum() * 100
+        assert wmape < 10
+        assert np.all(np.diff(fc["upper"] - fc["lower"], axis=1) >= -1e-9)
+
+    def test_too_short_series_rejected(self):
+        with pytest.raises(ValueError):
+            holt_winters_matrix(np.ones(10), 7)
+
+
+class TestRegistration:
+    def test_unknown_kernel(self):
+        with pytest.raises(ValueError):
+            forecast_matrix("lstm", np.ones(30), 7)
+
+    def test_models_registered_in_factory(self):
+        available = ForecastModelFactory.available_models()
+        for name in ("arima", "prophet", "ensemble", *LIGHTWEIGHT_MODELS):
+            assert name in available
+        assert ForecastModelFactory.create("sba").__wrapped__ is LIGHTWEIGHT_MODELS["sba"]
+
+    def test_result_has_forecast_service_shape(self, monkeypatch, weekly):
+        series = pd.Series(weekly[0], index=pd.date_range("2025-01-01", periods=210, freq="D"))
+        monkeypatch.setattr(forecast_service, "get_consumption_series", lambda *a, **k: series)
+        result = LIGHTWEIGHT_MODELS["holt_winters"](None, 1, horizon_days=30)
+        assert result["model_type"] == "holt_winters"
+        assert len(result["dates"]) == len(result["values"]) == len(result["upper_ci"]) == 30
+        assert result["dates"][0] == series.index[-1] + pd.Timedelta(days=1)
+        assert result["metrics"]["n_folds"] == 5
+        assert isinstance(result["parameters"]["alpha"], float)